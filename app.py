@@ -9,33 +9,47 @@ Flask Web 应用 - 文献检索系统
 from flask import Flask, render_template, Response, request, jsonify
 import json
 import time
-import threading
 import logging
 import sys
 import os
 from datetime import datetime
-from queue import Queue
 
 # 导入 PubMed 搜索相关函数
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from pubmed import search_pubmed, fetch_details, parse_record, ENABLE_FULLTEXT_EXTRACTION
+from pubmed import (search_pubmed, fetch_details, parse_record, refine_record_with_full_text, refill_incomplete_rows,
+                    resolve_countries_for_articles, get_full_text_analysis, get_free_status, ENABLE_FULLTEXT_EXTRACTION)
+from src.config import PROGRESSIVE_REFINEMENT, PREFETCH_CONFIG, LOG_STREAM_CONFIG, JOB_RUNNER_CONFIG, setup_logging
+from src.log_pipeline import add_log_handler, flush_logs, get_log_pipeline_statistics
+from src.prefetcher import Prefetcher, fulltext_cache
+from src.job_manager import job_registry, job_runner, current_job, LOG_LEVELS
+from src.cancellation import OperationCancelled
 
-# 配置日志 - 启用调试模式
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - [%(name)s:%(lineno)d] - %(message)s')
+# 配置日志 - 异步输出，级别由日志配置档（PUBMED_LOG_PROFILE）决定
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # 创建自定义日志处理器，将日志发送到前端
 class FrontendLogHandler(logging.Handler):
-    def __init__(self, queue):
+    """
+    把日志路由到产生它的搜索任务（current_job），写入该任务的有界日志缓冲区；
+    不属于任何任务的日志不转发，过长的日志（如完整的API响应内容）截断。
+    在日志监听线程中执行，current_job 取自日志产生时的上下文
+    """
+    def __init__(self, max_message_length=2000):
         super().__init__()
-        self.queue = queue
         self.encoding = 'utf-8'
+        self.max_message_length = max_message_length
     
     def emit(self, record):
+        job = current_job.get()
+        if job is None:
+            return
         try:
             # 格式化日志记录
             message = self.format(record)
-            timestamp = datetime.now().strftime('%H:%M:%S')
+            if len(message) > self.max_message_length:
+                message = message[:self.max_message_length] + f"...（已截断，共 {len(message)} 字符）"
+            timestamp = datetime.fromtimestamp(record.created).strftime('%H:%M:%S')
             
             # 根据日志级别映射到前端使用的级别
             level_map = {
@@ -60,26 +74,34 @@ class FrontendLogHandler(logging.Handler):
                 }
             }
             
-            # 将日志添加到队列
-            self.queue.put(log_data)
+            # 将日志添加到任务的日志缓冲区（与搜索数据共用事件ID，保持先后顺序）
+            job.emit(log_data)
             
         except Exception as e:
             print(f"日志处理器出错: {e}")
 
-# 创建全局线程安全队列
-log_queue = Queue()
+# SSE心跳间隔（秒）：没有事件时定期发送注释行，避免代理因空闲断开连接
+SSE_HEARTBEAT_INTERVAL = 15
+
+# 客户端订阅时未指定日志级别时推送的最低级别；日志按该周期合并为一个SSE帧
+DEFAULT_CLIENT_LOG_LEVEL = LOG_STREAM_CONFIG.get('default_client_level', 'info')
+LOG_FLUSH_INTERVAL = LOG_STREAM_CONFIG.get('flush_interval', 0.25)
+
+# 单个任务的最大结果数；结果保存在服务端，前端按页读取
+MAX_RESULTS_LIMIT = JOB_RUNNER_CONFIG.get('max_results_limit', 5000)
+RESULTS_PAGE_SIZE = JOB_RUNNER_CONFIG.get('page_size', 100)
+RESULTS_MAX_PAGE_SIZE = JOB_RUNNER_CONFIG.get('max_page_size', 500)
 
 # 创建前端日志处理器实例
-frontend_handler = FrontendLogHandler(log_queue)
-frontend_handler.setLevel(logging.DEBUG)
+frontend_handler = FrontendLogHandler(LOG_STREAM_CONFIG.get('max_message_length', 2000))
+frontend_handler.setLevel(LOG_STREAM_CONFIG.get('capture_level', 'DEBUG'))
 
 # 设置日志格式
 formatter = logging.Formatter('%(asctime)s - %(levelname)s - [%(name)s:%(lineno)d] - %(message)s')
 frontend_handler.setFormatter(formatter)
 
-# 为根日志记录器添加前端处理器
-root_logger = logging.getLogger()
-root_logger.addHandler(frontend_handler)
+# 前端处理器在日志监听线程中执行，不占用搜索任务线程
+add_log_handler(frontend_handler)
 
 # 设置Flask应用的日志级别
 logging.getLogger('flask').setLevel(logging.INFO)  # Flask自身日志设为INFO避免过多噪音
@@ -88,48 +110,27 @@ logging.getLogger('flask').setLevel(logging.INFO)  # Flask自身日志设为INFO
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'  # 生产环境请使用更强的密钥
 
-# 全局变量存储搜索状态
-search_status = {
-    'is_running': False,
-    'current_keyword': '',
-    'logs': [],
-    'results': []
-}
-
-def add_log(message, level='info'):
-    """添加日志到全局状态"""
-    timestamp = datetime.now().strftime('%H:%M:%S')
-    log_entry = {
-        'timestamp': timestamp,
-        'level': level,
-        'message': message
-    }
-    search_status['logs'].append(log_entry)
-    logger.info(f"[{timestamp}] {message}")
-
-def process_search(keyword, max_results=20, enable_fulltext=True, data_queue=None, model='gpt-5-mini'):
+def process_search(job):
     """
-    实际的 PubMed 搜索过程，将结果和日志放入队列
+    实际的 PubMed 搜索过程，将结果和日志发送到任务的事件队列
     
     Args:
-        keyword: 搜索关键词
-        max_results: 最大结果数量 (1-100)
-        enable_fulltext: 是否启用全文搜索
-        data_queue: 用于传递搜索结果和日志的队列
+        job: 搜索任务，参数包括:
+            keyword: 搜索关键词
+            max_results: 最大结果数量 (1-MAX_RESULTS_LIMIT)
+            enable_fulltext: 是否启用全文搜索
+            model: AI模型
     """
-    def add_log(message, level='info'):
-        """将日志添加到队列"""
-        timestamp = datetime.now().strftime('%H:%M:%S')
-        log_data = {
-            'type': 'log',
-            'content': {
-                'timestamp': timestamp,
-                'level': level,
-                'message': message
-            }
-        }
-        data_queue.put(log_data)
+    keyword = job.params['keyword']
+    max_results = job.params.get('max_results', 20)
+    enable_fulltext = job.params.get('enable_fulltext', True)
+    model = job.params.get('model', 'gpt-5-mini')
+    add_log = job.log
     
+    # 任务执行器已设置 current_job，本线程（及任务图等派生的上下文）中的日志都路由到该任务
+    job.start()
+    prefetcher = None
+    error = None
     try:
         # 记录搜索配置
         add_log(f"🔍 搜索配置 - 关键词: {keyword}")
@@ -159,66 +160,107 @@ def process_search(keyword, max_results=20, enable_fulltext=True, data_queue=Non
         
         add_log(f"✅ 成功获取 {len(articles)} 篇文献详情，开始解析数据...")
         
+        # 批量识别第一作者机构的国家（去重后统一处理），结果在逐篇解析时直接使用
+        add_log("🌍 正在批量识别作者机构国家...")
+        countries = resolve_countries_for_articles(articles)
+        add_log(f"🌍 国家识别完成: {len(countries)}/{len(articles)} 篇")
+        
         # 3. 解析数据 - 逐条处理并放入队列
+        # 渐进模式：先只基于摘要快速提取并立即输出该行，全文分析完成后再通过 row_update 更新该行
+        progressive = enable_fulltext and PROGRESSIVE_REFINEMENT
         results_count = 0
         fulltext_success_count = 0
         paid_count = 0
         failed_count = 0
         ai_success_count = 0
+        processed = []
+        
+        def start_prefetcher(pmids, load):
+            """在处理第i篇时后台预取后续文献的全文（或免费状态），网络请求与模型调用重叠，输出顺序不变"""
+            if not PREFETCH_CONFIG.get("enabled", True):
+                return None
+            return Prefetcher(
+                pmids,
+                load,
+                lookahead=PREFETCH_CONFIG.get("lookahead", 3),
+                max_workers=PREFETCH_CONFIG.get("max_workers", 3),
+                cache=fulltext_cache,
+                should_continue=lambda: job.is_running
+            )
+        
+        # 渐进模式的摘要阶段不检查全文，全文预取留给第二阶段（随全文阶段的游标前进）
+        if not progressive:
+            prefetcher = start_prefetcher(
+                [str(article['MedlineCitation'].get('PMID', '')) for article in articles],
+                get_full_text_analysis if enable_fulltext else get_free_status
+            )
+        
+        def report_fulltext_status(i, data):
+            """统计并实时显示单篇文献的全文和AI处理状态"""
+            nonlocal fulltext_success_count, paid_count, failed_count, ai_success_count
+            free_status = data.get('免费全文状态', '未检查')
+            if free_status == '免费':
+                fulltext_success_count += 1
+                add_log(f"  📤 文献 {i+1} 检测到免费全文，开始内容提取...", 'info')
+            elif free_status == '付费':
+                paid_count += 1
+                add_log(f"  💰 文献 {i+1} 仅付费全文，跳过免费内容", 'warning')
+            else:
+                failed_count += 1
+                add_log(f"  ⚠️ 文献 {i+1} 免费状态检查失败: {free_status}", 'warning')
+            
+            # 实时显示AI处理状态
+            if data.get('AI提取状态') == '成功':
+                ai_success_count += 1
+                add_log(f"  🤖 文献 {i+1} AI提取完成", 'success')
+            elif data.get('AI提取状态') == '失败':
+                add_log(f"  ❌ 文献 {i+1} AI提取失败", 'error')
+        
+        def send_row_update(data, fields):
+            """把已输出行的更新字段发送给前端"""
+            job.emit({
+                'type': 'row_update',
+                'content': {'PMID': str(data.get('PMID', '')), 'fields': {field: data[field] for field in fields}}
+            })
         
         for i, article in enumerate(articles):
             # 检查是否需要停止搜索（在处理过程中检查）
-            if not search_status['is_running']:
+            if not job.is_running:
                 add_log("⏹️ 搜索被用户中断", 'warning')
                 add_log(f"📊 已处理 {results_count} 篇文献", 'info')
                 break
             
             add_log(f"⚙️ 正在处理文献 {i+1}/{len(articles)}...")
+            if prefetcher:
+                prefetcher.advance(i)
             
             try:
                 # 解析单篇文献
-                data = parse_record(article, enable_fulltext, target_model=model)
+                pmid = str(article['MedlineCitation'].get('PMID', ''))
+                data = parse_record(article, enable_fulltext, target_model=model, resolved_country=countries.get(pmid),
+                                    quick=progressive)
                 results_count += 1
+                processed.append((i, article, data))
                 
-                # 实时显示全文处理状态
-                if enable_fulltext:
-                    free_status = data.get('免费全文状态', '未检查')
-                    if free_status == '免费':
-                        fulltext_success_count += 1
-                        add_log(f"  📤 文献 {i+1} 检测到免费全文，开始内容提取...", 'info')
-                    elif free_status == '付费':
-                        paid_count += 1
-                        add_log(f"  💰 文献 {i+1} 仅付费全文，跳过免费内容", 'warning')
-                    else:
-                        failed_count += 1
-                        add_log(f"  ⚠️ 文献 {i+1} 免费状态检查失败: {free_status}", 'warning')
-                
-                # 实时显示AI处理状态
-                if enable_fulltext:  # 只有启用了全文提取才会进行AI提取
-                    if data.get('AI提取状态') == '成功':
-                        ai_success_count += 1
-                        add_log(f"  🤖 文献 {i+1} AI提取完成", 'success')
-                    elif data.get('AI提取状态') == '失败':
-                        add_log(f"  ❌ 文献 {i+1} AI提取失败", 'error')
+                # 实时显示全文处理状态（渐进模式在全文阶段统计）
+                if enable_fulltext and not progressive:
+                    report_fulltext_status(i, data)
                 
                 # 立即将数据行放入队列
                 row_data = {
                     'type': 'row',
                     'content': data
                 }
-                data_queue.put(row_data)
+                job.emit(row_data)
                 
                 # 显示处理进度汇总
                 add_log(f"✅ 文献 {i+1} 处理完成: {data.get('标题', 'N/A')[:50]}...")
                 
-                if enable_fulltext:
+                if enable_fulltext and not progressive:
                     add_log(f"  📊 处理进度 - 全文: {fulltext_success_count}/{results_count}, AI: {ai_success_count}/{results_count}", 'info')
                 
-                # 短暂停顿以允许用户中断
-                time.sleep(0.1)
-                
                 # 立即检查停止状态（快速响应）
-                if not search_status['is_running']:
+                if not job.is_running:
                     add_log("⏹️ 搜索被用户中断", 'warning')
                     add_log(f"📊 已处理 {results_count} 篇文献", 'info')
                     break
@@ -229,6 +271,34 @@ def process_search(keyword, max_results=20, enable_fulltext=True, data_queue=Non
                 logger.error(error_msg)
                 continue
         
+        # 渐进模式第二阶段：逐篇检查并提取全文，用全文结果更新已输出的行
+        if progressive and job.is_running and processed:
+            add_log(f"📄 摘要结果已全部输出，开始全文分析并更新 {len(processed)} 篇文献...")
+            prefetcher = start_prefetcher([str(data.get('PMID', '')) for _, _, data in processed], get_full_text_analysis)
+            for done, (i, article, data) in enumerate(processed, 1):
+                if not job.is_running:
+                    add_log("⏹️ 搜索被用户中断", 'warning')
+                    break
+                if prefetcher:
+                    prefetcher.advance(done - 1)
+                try:
+                    changes = refine_record_with_full_text(data, article, target_model=model)
+                    report_fulltext_status(i, data)
+                    if changes:
+                        send_row_update(data, changes)
+                    add_log(f"  📊 处理进度 - 全文: {fulltext_success_count}/{done}, AI: {ai_success_count}/{done}", 'info')
+                except Exception as e:
+                    error_msg = f"全文分析第 {i+1} 篇文献时出错: {str(e)}"
+                    add_log(error_msg, 'error')
+                    logger.error(error_msg)
+        
+        # 只针对仍缺失的字段补提取，补全的字段同样通过 row_update 更新
+        if job.is_running and processed:
+            refilled = refill_incomplete_rows([data for _, _, data in processed], articles, enable_fulltext,
+                                              target_model=model, on_update=send_row_update)
+            if refilled:
+                add_log(f"🔁 已补全 {refilled} 篇文献的缺失字段", 'info')
+        
         # 搜索完成 - 显示详细汇总
         add_log(f"🎉 搜索完成！共处理 {results_count} 篇文献", 'success')
         
@@ -246,94 +316,134 @@ def process_search(keyword, max_results=20, enable_fulltext=True, data_queue=Non
             
             add_log(f"🔍 搜索任务完成，用户可查看结果表格", 'success')
         
+    except OperationCancelled:
+        # 取消令牌已中断进行中的请求和重试，任务的密钥额度、请求名额和连接随即释放
+        add_log("⏹️ 搜索被用户中断，进行中的请求已取消", 'warning')
     except Exception as e:
-        error_msg = f"搜索过程中发生错误: {str(e)}"
-        add_log(error_msg, 'error')
-        logger.error(error_msg)
+        error = f"搜索过程中发生错误: {str(e)}"
+        add_log(error, 'error')
+        logger.error(error)
     finally:
-        search_status['is_running'] = False
-        # 发送结束信号
-        end_data = {'type': 'end'}
-        data_queue.put(end_data)
+        if prefetcher:
+            prefetcher.stop()
+        # 等待任务的日志写入缓冲区后再记录任务结果并发送结束信号
+        flush_logs()
+        job.finish(error)
 
-@app.route('/')
-def index():
-    """主页面路由"""
-    return render_template('index.html')
+def sse_event(data, event_id=None):
+    """格式化一条SSE数据事件；带事件ID时客户端可据此断线续传"""
+    payload = f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    if event_id is None:
+        return payload
+    return f"id: {event_id}\n{payload}"
 
-@app.route('/stream_search')
-def stream_search():
-    """流式搜索响应路由 - 使用实际的 PubMed 搜索"""
-    keyword = request.args.get('keyword', '')
-    max_results = request.args.get('max_results', default=20, type=int)
-    enable_fulltext = request.args.get('enable_fulltext', default='true').lower() == 'true'
-    model = request.args.get('model', default='gpt-5-mini')
+def parse_search_params(source):
+    """
+    从请求参数中解析搜索参数
+    
+    Args:
+        source: 请求参数字典（查询参数或JSON请求体）
+    
+    Returns:
+        (参数字典, 错误信息)，参数无效时参数字典为None
+    """
+    keyword = str(source.get('keyword') or '')
+    try:
+        max_results = int(source.get('max_results', 20))
+    except (TypeError, ValueError):
+        return None, '最大结果数量必须是整数'
+    enable_fulltext = str(source.get('enable_fulltext', 'true')).lower() == 'true'
+    model = source.get('model') or 'gpt-5-mini'
     # 参数验证
     if not keyword:
-        return jsonify({'error': '缺少关键词参数'}), 400
+        return None, '缺少关键词参数'
     
-    if max_results < 1 or max_results > 100:
-        return jsonify({'error': '最大结果数量必须在1-100之间'}), 400
+    if max_results < 1 or max_results > MAX_RESULTS_LIMIT:
+        return None, f'最大结果数量必须在1-{MAX_RESULTS_LIMIT}之间'
     
-    # 重置搜索状态
-    global search_status
-    search_status = {
-        'is_running': True,
-        'current_keyword': keyword,
+    return {
+        'keyword': keyword,
         'max_results': max_results,
         'enable_fulltext': enable_fulltext,
-        'logs': [],
-        'results': []
-    }
+        'model': model
+    }, None
+
+def get_client_log_level():
+    """读取客户端订阅的最低日志级别（log_level 查询参数）"""
+    level = (request.args.get('log_level') or DEFAULT_CLIENT_LOG_LEVEL).lower()
+    return level if level in LOG_LEVELS else DEFAULT_CLIENT_LOG_LEVEL
+
+def coalesce_events(events):
+    """
+    把连续的日志事件合并为一个 'logs' 帧，其他事件原样保留
+    
+    Args:
+        events: 按事件ID排序的 (事件ID, 事件) 列表
     
+    Returns:
+        (帧的事件ID, 帧) 列表；合并帧的ID取其中最后一条日志的ID
+    """
+    frames = []
+    for event_id, event in events:
+        if event.get('type') == 'log':
+            if frames and frames[-1][1].get('type') == 'logs':
+                frames[-1][1]['content'].append(event['content'])
+                frames[-1] = (event_id, frames[-1][1])
+            else:
+                frames.append((event_id, {'type': 'logs', 'content': [event['content']]}))
+        else:
+            frames.append((event_id, event))
+    return frames
+
+def get_last_event_id():
+    """读取客户端最后收到的事件ID（Last-Event-ID 请求头或 last_event_id 查询参数）"""
+    value = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0
+    try:
+        return max(0, int(value))
+    except ValueError:
+        return 0
+
+def stream_job_events(job, last_event_id=0, announce_job=False, log_level=DEFAULT_CLIENT_LOG_LEVEL):
+    """
+    以SSE流的形式发送任务事件，从 last_event_id 之后开始（重连时先重放错过的事件）
+    
+    Args:
+        job: 搜索任务
+        last_event_id: 客户端最后收到的事件ID
+        announce_job: 是否先发送任务ID事件（兼容 /stream_search）
+        log_level: 推送给该客户端的最低日志级别
+    """
     def generate():
-        """生成流式响应"""
-        # 创建用于搜索数据的队列
-        data_queue = Queue()
-        
-        # 创建并启动搜索线程
-        search_thread = threading.Thread(
-            target=process_search,
-            args=(keyword, max_results, enable_fulltext, data_queue, model),
-            daemon=True
-        )
-        search_thread.start()
+        """
+        生成流式响应：阻塞等待任务的新事件，没有事件时发送心跳；连接断开不影响任务本身。
+        连续的日志合并为一个 'logs' 帧，只有日志时按刷新周期攒批发送，数据行立即发送。
+        """
+        if announce_job:
+            yield sse_event({'type': 'job', 'content': {'job_id': job.job_id}})
         
+        cursor = last_event_id
+        last_flush = 0.0
         try:
             while True:
-                # 检查是否需要停止搜索
-                if not search_status['is_running']:
-                    # 发送用户停止信号
-                    stop_data = {
-                        'type': 'stopped',
-                        'content': {'message': '搜索已停止'}
-                    }
-                    yield f"data: {json.dumps(stop_data, ensure_ascii=False)}\n\n"
-                    break
-                
-                # 从数据队列获取数据
-                if not data_queue.empty():
-                    data = data_queue.get()
-                    
-                    # 检查是否搜索结束
-                    if data.get('type') == 'end':
-                        yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
-                        # 发送剩余的Python日志
-                        while not log_queue.empty():
-                            log = log_queue.get()
-                            yield f"data: {json.dumps(log, ensure_ascii=False)}\n\n"
-                        break
-                    
-                    # 发送数据
-                    yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+                latest, events = job.wait_events(cursor, timeout=SSE_HEARTBEAT_INTERVAL, min_log_level=log_level)
+                if latest <= cursor:
+                    # SSE注释行，前端会忽略
+                    yield ": heartbeat\n\n"
+                    continue
                 
-                # 从日志队列获取并发送日志
-                while not log_queue.empty():
-                    log = log_queue.get()
-                    yield f"data: {json.dumps(log, ensure_ascii=False)}\n\n"
+                # 只有日志时等到刷新周期结束，把这段时间内的日志合并成一帧
+                wait = last_flush + LOG_FLUSH_INTERVAL - time.monotonic()
+                if wait > 0 and all(data.get('type') == 'log' for _, data in events):
+                    time.sleep(wait)
+                    latest, events = job.wait_events(cursor, timeout=0, min_log_level=log_level)
                 
-                # 短暂睡眠避免CPU占用过高
-                time.sleep(0.05)
+                for frame_id, data in coalesce_events(events):
+                    yield sse_event(data, frame_id)
+                    # 搜索结束或被用户停止
+                    if data.get('type') in ('end', 'stopped'):
+                        return
+                cursor = latest
+                last_flush = time.monotonic()
                 
         except Exception as e:
             logger.error(f"流式搜索出错: {e}")
@@ -341,7 +451,7 @@ def stream_search():
                 'type': 'error',
                 'content': {'message': f'搜索过程中发生错误: {str(e)}'}
             }
-            yield f"data: {json.dumps(error_data, ensure_ascii=False)}\n\n"
+            yield sse_event(error_data)
     
     return Response(
         generate(),
@@ -349,11 +459,97 @@ def stream_search():
         headers={
             'Cache-Control': 'no-cache',
             'Connection': 'keep-alive',
+            'X-Accel-Buffering': 'no',  # 禁止反向代理缓冲事件流
             'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Cache-Control'
+            'Access-Control-Allow-Headers': 'Cache-Control, Last-Event-ID'
         }
     )
 
+@app.route('/')
+def index():
+    """主页面路由"""
+    return render_template('index.html', max_results_limit=MAX_RESULTS_LIMIT)
+
+def job_queue_full_response():
+    """搜索任务已饱和时的响应：HTTP 429 并附带建议的重试等待时间"""
+    retry_after = job_runner.retry_after()
+    response = jsonify({
+        'error': f'当前搜索任务过多，请约 {retry_after} 秒后重试',
+        'retry_after': retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """创建后台搜索任务，返回任务ID；任务在后台线程池中执行，与本次请求无关"""
+    params, error = parse_search_params(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({'error': error}), 400
+    
+    job = job_runner.submit(process_search, params)
+    if job is None:
+        return job_queue_full_response()
+    return jsonify({'success': True, 'job_id': job.job_id}), 201
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """任务事件流：支持 Last-Event-ID，断线重连后从上次收到的事件之后续传"""
+    job = job_registry.get(job_id)
+    if job is None:
+        return jsonify({'error': f'任务不存在: {job_id}'}), 404
+    return stream_job_events(job, get_last_event_id(), log_level=get_client_log_level())
+
+@app.route('/jobs/<job_id>/results')
+def job_results(job_id):
+    """
+    分页读取任务结果
+    
+    查询参数: offset（起始位置）、limit（行数）、sort（排序字段，前缀 "-" 表示降序，默认按产生顺序）
+    """
+    job = job_registry.get(job_id)
+    if job is None:
+        return jsonify({'error': f'任务不存在: {job_id}'}), 404
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(max(1, int(request.args.get('limit', RESULTS_PAGE_SIZE))), RESULTS_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'offset 和 limit 必须是整数'}), 400
+    sort = request.args.get('sort') or None
+    try:
+        page = job.results.page(offset, limit, sort)
+    except KeyError:
+        return jsonify({'error': f'无法按该字段排序: {sort}'}), 400
+    page['job_id'] = job.job_id
+    page['status'] = job.status
+    return jsonify(page)
+
+@app.route('/jobs/<job_id>/logs')
+def job_logs(job_id):
+    """下载任务的完整日志（纯文本，可用 log_level 查询参数指定最低级别）"""
+    job = job_registry.get(job_id)
+    if job is None:
+        return jsonify({'error': f'任务不存在: {job_id}'}), 404
+    level = (request.args.get('log_level') or '').lower()
+    return Response(
+        job.iter_log_lines(level if level in LOG_LEVELS else None),
+        mimetype='text/plain; charset=utf-8',
+        headers={'Content-Disposition': f'attachment; filename=job-{job.job_id}.log'}
+    )
+
+@app.route('/stream_search')
+def stream_search():
+    """流式搜索响应路由（兼容接口）：创建后台任务并直接返回其事件流"""
+    params, error = parse_search_params(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    job = job_runner.submit(process_search, params)
+    if job is None:
+        return job_queue_full_response()
+    return stream_job_events(job, announce_job=True, log_level=get_client_log_level())
+
 @app.route('/search', methods=['POST'])
 def search():
     """搜索接口（可选的同步接口）"""
@@ -373,22 +569,42 @@ def search():
 
 @app.route('/status')
 def status():
-    """获取当前搜索状态"""
-    return jsonify(search_status)
-
-
+    """获取搜索任务状态：指定 job_id 时返回该任务，否则返回所有任务"""
+    job_id = request.args.get('job_id')
+    if not job_id:
+        return jsonify({
+            'jobs': [job.to_dict() for job in job_registry.list_jobs()],
+            'runner': job_runner.get_statistics(),
+            'logging': get_log_pipeline_statistics()
+        })
+    
+    job = job_registry.get(job_id)
+    if job is None:
+        return jsonify({'error': f'任务不存在: {job_id}'}), 404
+    return jsonify(job.to_dict())
 
 @app.route('/stop_search', methods=['POST'])
 def stop_search():
-    """停止搜索"""
-    search_status['is_running'] = False
-    add_log("搜索已手动停止", 'warning')
-    return jsonify({'success': True, 'message': '搜索已停止'})
+    """停止指定的搜索任务"""
+    data = request.get_json(silent=True) or {}
+    job_id = data.get('job_id') or request.args.get('job_id')
+    if not job_id:
+        return jsonify({'error': '缺少任务ID'}), 400
+    
+    job = job_registry.get(job_id)
+    if job is None:
+        return jsonify({'error': f'任务不存在: {job_id}'}), 404
+    
+    # 取消标志会立即通知该任务的流式连接，不必等待搜索线程处理完当前文献
+    if job.cancel():
+        logger.info(f"搜索任务 {job_id} 已手动停止")
+    return jsonify({'success': True, 'message': '搜索已停止', 'job_id': job_id})
 
 if __name__ == '__main__':
     print("🚀 启动 Flask 应用...")
     print("📱 访问地址: http://localhost:5001")
     print("🔍 搜索接口: POST /search")
     print("📡 流式接口: GET /stream_search?keyword=关键词")
+    print("🧵 后台任务: POST /jobs，事件流: GET /jobs/<job_id>/events，结果分页: GET /jobs/<job_id>/results，完整日志: GET /jobs/<job_id>/logs")
     
     app.run(debug=True, host='0.0.0.0', port=5001, threaded=True)
\ No newline at end of file
@@ -6,11 +6,26 @@ import requests
 import json
 import time
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from bs4 import BeautifulSoup
 
 # 导入AI提取器
-from src.ai_extractor import extract_info_with_ai
+from src.ai_extractor import extract_info_with_ai, extract_info_cascade, reextract_missing_fields, ai_extractor
+# 导入离线国家识别器和持久化国家缓存
+from src.country_resolver import resolve_country
+from src.country_cache import country_cache, affiliation_cache_key
+# 导入全文缓存（预取线程和处理线程共用）
+from src.prefetcher import fulltext_cache
+from src.fulltext_extractor import extract_block_text
+# 导入任务依赖图和规则提取器（parse_record 内互不依赖的步骤并发执行）
+from src.task_graph import TaskGraph
+from src.data_parser import data_parser
+# 导入优先级调度器（AI请求和HTTP请求优先服务Web界面的交互式搜索）
+from src.priority_scheduler import llm_scheduler, http_scheduler, set_work_priority, BATCH
+# 导入协作式取消（Web任务被停止时立即中断进行中的请求和重试）
+from src.cancellation import OperationCancelled, check_cancelled, call_cancellable
+from src.pubmed_scraper import read_entrez
+from src.config import setup_logging
 
 # 导入增强版PubMed抓取器
 try:
@@ -37,241 +52,28 @@ SEARCH_TERM = """
 MAX_RESULTS = 100 
 
 # ================= AI API配置 =================
-# 多种API端点尝试
-API_ENDPOINTS = [
-    "https://api.gptgod.online/v1/chat/completions",
-    "https://api.minimax.chat/v1/text/chatcompletion_v2",
-    "https://api.deepseek.com/v1/chat/completions"
-]
-
-# API密钥池配置 - 多个密钥用于提高请求成功率
-API_KEYS_POOL = [
-    "sk-1wLZqqkXDT9shZzgTqNRc0wNB6K4Kmu1t0kov0KA5I3auqVf",  # 主密钥
-    "sk-19GhS2EHMvZJZrm4LYdL94KrAfIb5ckAhwH7Btcorg23zh8H",  # 备用密钥1
-    "sk-t0WZJnqINXX2LnRvPIvRvhMLIcfYtZ76UvOjHf82IGPcYRj1",  # 备用密钥2
-]
+# API端点、密钥池及其限额配置统一在 src/config.py 中维护
+from src.config import API_ENDPOINTS, API_KEYS_POOL, API_KEY_POOL_CONFIG, EXTRACTION_CASCADE_CONFIG, REEXTRACTION_CONFIG
 
 # 向后兼容 - 保留原有单密钥配置
 API_KEY = API_KEYS_POOL[0]
 
-# API密钥池管理配置
-API_KEY_POOL_CONFIG = {
-    "max_failure_count": 3,        # 最大失败次数，超过后暂时禁用密钥
-    "disable_duration": 300,       # 密钥禁用时长（秒），5分钟
-    "success_reset_threshold": 2,  # 成功次数阈值，重置失败计数
-    "enable_key_rotation": True,   # 启用密钥轮换
-    "log_key_usage": True          # 是否记录密钥使用情况（不记录具体密钥内容）
-}
+# 国家识别缓存配置见 src/config.py（COUNTRY_CACHE_PATH 等），由 src.country_cache 统一管理
 
-# 国家识别缓存配置
-COUNTRY_CACHE = {}  # 简单内存缓存
-COUNTRY_CACHE_MAX_SIZE = 1000
-COUNTRY_CACHE_TTL = 3600  # 1小时过期
+COUNTRY_BATCH_SIZE = 50  # 批量国家识别时单次AI请求包含的机构数上限
+EFETCH_BATCH_SIZE = 200  # 获取文献详情时单次请求的PMID数上限（结果数较多时分批获取）
 
 ENABLE_WEB_SEARCH = True  # 是否启用web search功能
 REQUEST_DELAY = 2.0  # API请求间隔（秒），避免429错误
 
-# 配置日志 - 启用调试模式
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - [%(name)s:%(lineno)d] - %(message)s')
+# 配置日志 - 异步输出，级别由日志配置档（PUBMED_LOG_PROFILE）决定
+setup_logging()
 logger = logging.getLogger(__name__)
 
-# 设置特定模块的日志级别
-logging.getLogger('pubmed').setLevel(logging.DEBUG)
-logging.getLogger('requests').setLevel(logging.WARNING)  # 减少第三方库的日志噪音
-
 # ================= API密钥池管理器 =================
-class APIKeyPoolManager:
-    """
-    API密钥池管理器 - 提供密钥的动态管理、自动轮换和状态监控功能
-    """
-    
-    def __init__(self, api_keys: list, config: dict):
-        """
-        初始化API密钥池管理器
-        
-        Args:
-            api_keys: API密钥列表
-            config: 配置字典
-        """
-        self.api_keys = api_keys
-        self.config = config
-        self.current_key_index = 0
-        self.key_states = {}
-        
-        # 初始化每个密钥的状态
-        for i, key in enumerate(api_keys):
-            key_id = f"key_{i+1}"  # 使用key_1, key_2等作为密钥标识符
-            self.key_states[key_id] = {
-                "key": key,
-                "failure_count": 0,
-                "success_count": 0,
-                "is_disabled": False,
-                "disabled_until": None,
-                "last_used": None,
-                "total_requests": 0,
-                "total_successes": 0
-            }
-    
-    def get_available_key(self) -> Optional[str]:
-        """
-        获取下一个可用的API密钥
-        
-        Returns:
-            可用的API密钥，如果所有密钥都不可用则返回None
-        """
-        if not self.config.get("enable_key_rotation", True):
-            return self.api_keys[0] if self.api_keys else None
-            
-        attempts = 0
-        max_attempts = len(self.api_keys)
-        
-        while attempts < max_attempts:
-            key_id = f"key_{self.current_key_index + 1}"
-            state = self.key_states[key_id]
-            
-            # 检查密钥是否被禁用
-            if self._is_key_disabled(state):
-                # 尝试下一个密钥
-                self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-                attempts += 1
-                continue
-                
-            # 密钥可用
-            return state["key"]
-        
-        # 所有密钥都不可用
-        logger.error("所有API密钥都不可用")
-        return None
-    
-    def _is_key_disabled(self, key_state: dict) -> bool:
-        """
-        检查密钥是否被禁用
-        
-        Args:
-            key_state: 密钥状态字典
-            
-        Returns:
-            布尔值，表示密钥是否被禁用
-        """
-        if not key_state["is_disabled"]:
-            return False
-            
-        # 检查禁用时间是否已过
-        if key_state["disabled_until"] and time.time() > key_state["disabled_until"]:
-            # 重新启用密钥
-            key_state["is_disabled"] = False
-            key_state["disabled_until"] = None
-            logger.info(f"密钥重新启用")
-            return False
-            
-        return True
-    
-    def report_success(self, key: str):
-        """
-        报告API请求成功
-        
-        Args:
-            key: 使用的API密钥
-        """
-        key_id = self._get_key_id(key)
-        if key_id and key_id in self.key_states:
-            state = self.key_states[key_id]
-            state["success_count"] += 1
-            state["total_successes"] += 1
-            state["last_used"] = time.time()
-            
-            # 如果有失败记录，重置失败计数
-            if state["failure_count"] > 0:
-                state["failure_count"] = max(0, state["failure_count"] - 1)
-            
-            # 记录密钥使用情况
-            if self.config.get("log_key_usage", True):
-                logger.debug(f"密钥 {key_id} 请求成功，累计成功: {state['total_successes']}")
-    
-    def report_failure(self, key: str, error_type: str = "unknown"):
-        """
-        报告API请求失败
-        
-        Args:
-            key: 使用的API密钥
-            error_type: 错误类型
-        """
-        key_id = self._get_key_id(key)
-        if key_id and key_id in self.key_states:
-            state = self.key_states[key_id]
-            state["failure_count"] += 1
-            state["total_requests"] += 1
-            state["last_used"] = time.time()
-            
-            # 检查是否需要禁用密钥
-            max_failures = self.config.get("max_failure_count", 3)
-            if state["failure_count"] >= max_failures:
-                self._disable_key(key_id, error_type)
-            
-            # 记录密钥使用情况
-            if self.config.get("log_key_usage", True):
-                logger.warning(f"密钥 {key_id} 请求失败 ({error_type})，失败次数: {state['failure_count']}")
-    
-    def _disable_key(self, key_id: str, reason: str):
-        """
-        禁用密钥
-        
-        Args:
-            key_id: 密钥标识符
-            reason: 禁用原因
-        """
-        disable_duration = self.config.get("disable_duration", 300)
-        state = self.key_states[key_id]
-        
-        state["is_disabled"] = True
-        state["disabled_until"] = time.time() + disable_duration
-        
-        logger.warning(f"密钥 {key_id} 因失败次数过多被临时禁用，原因: {reason}，禁用时长: {disable_duration}秒")
-    
-    def _get_key_id(self, key: str) -> Optional[str]:
-        """
-        根据密钥获取密钥标识符
-        
-        Args:
-            key: API密钥
-            
-        Returns:
-            密钥标识符，如果找不到返回None
-        """
-        for key_id, state in self.key_states.items():
-            if state["key"] == key:
-                return key_id
-        return None
-    
-    def get_key_statistics(self) -> dict:
-        """
-        获取所有密钥的统计信息
-        
-        Returns:
-            包含统计信息的字典
-        """
-        stats = {}
-        for key_id, state in self.key_states.items():
-            stats[key_id] = {
-                "is_disabled": state["is_disabled"],
-                "failure_count": state["failure_count"],
-                "success_count": state["success_count"],
-                "total_requests": state["total_requests"],
-                "total_successes": state["total_successes"],
-                "success_rate": state["total_successes"] / max(1, state["total_requests"]),
-                "last_used": state["last_used"]
-            }
-        return stats
-    
-    def rotate_key(self):
-        """
-        轮换到下一个密钥
-        """
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-        logger.debug(f"密钥轮换到索引: {self.current_key_index}")
-
-# 创建全局API密钥池管理器实例
-api_key_pool = APIKeyPoolManager(API_KEYS_POOL, API_KEY_POOL_CONFIG)
+# 与 src 模块共用同一个线程安全的密钥池实例，RPM/TPM额度在所有调用方之间共享
+from src.api_key_manager import APIKeyPoolManager, api_key_pool, estimate_tokens
+from src.circuit_breaker import circuit_breakers
 
 # ================= 主程序配置 =================
 # 全局配置
@@ -280,28 +82,26 @@ ENABLE_FULLTEXT_EXTRACTION = False  # 是否启用全文提取功能
 
 def search_pubmed(query, max_results=20):
     """在PubMed中搜索并返回ID列表"""
-    print(f"正在搜索: {query.strip()}...")
+    logger.debug("正在搜索: %s...", query.strip())
     try:
-        handle = Entrez.esearch(db="pubmed", term=query, retmax=max_results, sort="relevance")
-        record = Entrez.read(handle)
-        handle.close()
+        record = read_entrez(Entrez.esearch, db="pubmed", term=query, retmax=max_results, sort="relevance")
         return record["IdList"]
     except Exception as e:
-        print(f"搜索失败: {e}")
+        logger.warning("搜索失败: %s", e)
         return []
 
 def fetch_details(id_list):
-    """根据ID获取文献详细信息"""
-    print(f"正在获取 {len(id_list)} 篇文献的详细信息...")
-    ids = ",".join(id_list)
-    try:
-        handle = Entrez.efetch(db="pubmed", id=ids, retmode="xml")
-        records = Entrez.read(handle)
-        handle.close()
-        return records['PubmedArticle']
-    except Exception as e:
-        print(f"获取详情失败: {e}")
-        return []
+    """根据ID获取文献详细信息（大量ID时分批请求）"""
+    logger.debug("正在获取 %s 篇文献的详细信息...", len(id_list))
+    articles = []
+    for start in range(0, len(id_list), EFETCH_BATCH_SIZE):
+        ids = ",".join(id_list[start:start + EFETCH_BATCH_SIZE])
+        try:
+            records = read_entrez(Entrez.efetch, db="pubmed", id=ids, retmode="xml")
+            articles.extend(records['PubmedArticle'])
+        except Exception as e:
+            logger.warning("获取详情失败: %s", e)
+    return articles
 
 def extract_sample_size(abstract_text):
     """
@@ -325,8 +125,153 @@ def extract_sample_size(abstract_text):
             return match.group(1)
     return "需人工确认"
 
-def parse_record(article, enable_fulltext=False, target_model=None):
-    """解析单篇文献，映射到目标表格列"""
+def _apply_full_text_analysis(data: Dict, pmid: str) -> Optional[str]:
+    """
+    检查并提取免费全文，更新 data 中的全文状态字段
+    
+    Returns:
+        成功提取时返回用于AI分析的全文内容（标题/摘要/正文），否则返回None
+    """
+    try:
+        logger.debug("🔍 正在检查PMID %s 的全文可用性...", pmid)
+        logger.debug("📡 发送免费全文检测请求...")
+
+        # 使用全文分析功能
+        fulltext_analysis = get_full_text_analysis(pmid)
+
+        # 更新免费全文状态字段
+        if fulltext_analysis.get('is_free'):
+            links_count = len(fulltext_analysis.get('links', []))
+            data['免费全文状态'] = "免费"
+            data['免费全文链接数'] = links_count
+            data['全文提取状态'] = "可获取" if fulltext_analysis.get('extraction_success', False) else "获取失败"
+            logger.debug("✅ 发现免费全文: %s 个链接", links_count)
+            logger.debug("🎯 免费全文来源: %s", fulltext_analysis.get('source', 'unknown'))
+
+            if fulltext_analysis.get('extraction_success', False):
+                logger.debug("📥 免费全文内容提取成功")
+            else:
+                logger.debug("⚠️ 免费全文内容提取失败")
+
+            # 如果成功提取到全文内容，将其与摘要合并用于AI提取
+            if fulltext_analysis.get('extraction_success', False):
+                extracted_content = fulltext_analysis.get('extracted_content', {})
+                full_text_parts = []
+
+                if extracted_content.get('title'):
+                    full_text_parts.append(f"标题: {extracted_content['title']}")
+                    logger.debug("📄 提取到标题: %s...", extracted_content['title'][:50])
+                if extracted_content.get('abstract'):
+                    full_text_parts.append(f"摘要: {extracted_content['abstract']}")
+                    logger.debug("📄 提取到摘要: %s 字符", len(extracted_content['abstract']))
+                if extracted_content.get('body_text'):
+                    # 截取前2000字符避免过长
+                    body_text = extracted_content['body_text'][:2000]
+                    full_text_parts.append(f"正文: {body_text}")
+                    logger.debug("📄 提取到正文: %s 字符 (截取2000字符)", len(extracted_content['body_text']))
+
+                if full_text_parts:
+                    return "\n\n".join(full_text_parts)
+
+        elif fulltext_analysis.get('debug_info', {}).get('availability_error'):
+            # 检查过程出错，无法确认是否付费
+            data['免费全文状态'] = "检查失败"
+            data['免费全文链接数'] = 0
+            data['全文提取状态'] = "检查失败"
+            logger.debug("⚠️ 免费全文检查出错: %s", fulltext_analysis['debug_info']['availability_error'])
+        else:
+            data['免费全文状态'] = "付费"
+            data['免费全文链接数'] = 0
+            data['全文提取状态'] = "不可获取"
+            if fulltext_analysis.get('extraction_success', False):
+                logger.debug("✅ 原文网页全文获取成功")
+            else:
+                logger.debug("❌ 付费文献，原文获取失败")
+
+    except Exception as e:
+        logger.error(f"处理PMID {pmid} 全文分析时出错: {e}")
+        data['免费全文状态'] = "检查失败"
+        data['免费全文链接数'] = 0
+        data['全文提取状态'] = "检查失败"
+        logger.debug("❌ 付费文献，原文获取失败")
+    return None
+
+
+def _is_conclusive_analysis(analysis: Dict[str, any]) -> bool:
+    """全文分析结果是否可以缓存：全文提取成功，或确认没有免费全文（检查过程中没有出错）"""
+    if analysis.get('extraction_success'):
+        return True
+    return not analysis.get('is_free') and not analysis.get('debug_info', {}).get('availability_error')
+
+
+def get_full_text_analysis(pmid: str) -> Dict[str, any]:
+    """
+    获取PMID的全文分析结果（经全文缓存，预取线程和处理线程共用同一次抓取）
+
+    网络错误或全文提取失败的结果不写入缓存：全文缓存在各任务之间共享，
+    一次临时故障不应让该文献在之后的任务中一直显示为付费或提取失败。
+    """
+    return fulltext_cache.get_or_load(f"analysis:{pmid}", lambda: analyze_pmid_with_full_text(pmid),
+                                      cacheable=_is_conclusive_analysis)
+
+
+def _availability_errors(availability: Dict[str, any]) -> List[str]:
+    """全文可用性检查中出错的原因（包括增强版scraper各检测方法的错误）"""
+    errors = [availability['error']] if availability.get('error') else []
+    errors.extend(result['error'] for result in availability.get('method_results', []) if result.get('error'))
+    return errors
+
+
+def _check_free_status(pmid: str) -> Dict[str, any]:
+    """检查全文可用性，返回全文状态字段（检查出错且未确认免费时为"检查失败"）"""
+    availability = None
+    if ENHANCED_SCRAPER_AVAILABLE:
+        # 使用增强版scraper检查
+        enhanced_scraper = EnhancedPubMedScraper()
+        availability = enhanced_scraper.check_fulltext_comprehensive(pmid)
+    if not availability:
+        # 回退到传统方法
+        availability = check_full_text_availability(pmid)
+    is_free = bool(availability.get('is_free'))
+    if not is_free and _availability_errors(availability):
+        return {'免费全文状态': "检查失败", '免费全文链接数': 0, '全文提取状态': "检查失败"}
+    return {
+        '免费全文状态': "免费" if is_free else "付费",
+        '免费全文链接数': 1 if is_free else 0,
+        '全文提取状态': "未尝试"
+    }
+
+
+def get_free_status(pmid: str) -> Dict[str, any]:
+    """获取PMID的全文状态字段（经全文缓存，检查失败的结果不缓存）"""
+    return fulltext_cache.get_or_load(f"status:{pmid}", lambda: _check_free_status(pmid),
+                                      cacheable=lambda status: status['免费全文状态'] in ("免费", "付费"))
+
+
+def _apply_free_status_check(data: Dict, pmid: str):
+    """未启用全文提取时，只检查全文可用性并更新 data 中的全文状态字段"""
+    try:
+        if pmid:
+            data.update(get_free_status(pmid))
+    except Exception as e:
+        logger.error(f"检查全文状态时出错: {e}")
+        data['免费全文状态'] = "检查失败"
+        data['免费全文链接数'] = 0
+        data['全文提取状态'] = "检查失败"
+
+
+# 由AI提取结果填充的表格列（翻译标题和国家单独处理）
+AI_ROW_FIELDS = ['研究对象', '样本量', '推荐补充剂量/用法', '作用机理', '摘要主要内容', '结论摘要', '数据收集年份']
+
+
+def parse_record(article, enable_fulltext=False, target_model=None, resolved_country=None, quick=False):
+    """
+    解析单篇文献，映射到目标表格列
+    
+    resolved_country 为任务级预处理（resolve_countries_for_articles）得到的国家，
+    提供时不再单独识别国家；quick 为True时跳过全文检查，只基于摘要快速提取，
+    之后可用 refine_record_with_full_text 以全文结果更新
+    """
     data = {}
     medline = article['MedlineCitation']
     article_data = medline['Article']
@@ -343,11 +288,9 @@ def parse_record(article, enable_fulltext=False, target_model=None):
 
     # 2. 数据收集年份 (通过AI提取) - 稍后从AI提取结果获取，先设为默认值
     data['数据收集年份'] = "需AI提取"
+    data['国家'] = "需人工确认"
 
-    # 3. 国家 (尝试从作者机构提取，通常取第一作者)
-    data['国家'] = extract_country_from_affiliation(article_data)
-
-    # 4. 研究类型 (从PublicationTypeList提取)
+    # 3. 研究类型 (从PublicationTypeList提取)
     try:
         pt_list = [pt.title() for pt in article_data.get('PublicationTypeList', [])]
         if "Meta-Analysis" in pt_list:
@@ -362,15 +305,7 @@ def parse_record(article, enable_fulltext=False, target_model=None):
     except:
         data['研究类型'] = "N/A"
 
-    # 5. 研究对象 & 6. 样本量
-    abstract_text = ""
-    if 'Abstract' in article_data and 'AbstractText' in article_data['Abstract']:
-        # AbstractText 有时是列表（分段摘要），有时是字符串
-        abs_content = article_data['Abstract']['AbstractText']
-        if isinstance(abs_content, list):
-            abstract_text = " ".join([str(item) for item in abs_content])
-        else:
-            abstract_text = str(abs_content)
+    abstract_text = _get_abstract_text(article_data)
     
     # 额外信息方便核对
     data['标题'] = article_data.get('ArticleTitle', '')
@@ -378,131 +313,104 @@ def parse_record(article, enable_fulltext=False, target_model=None):
     
     # 获取标题
     article_title = article_data.get('ArticleTitle', '')
+    affiliation = _clean_affiliation(_get_first_author_affiliation(article_data))
     
     # 初始化免费全文状态字段
     data['免费全文状态'] = "未检查"
     data['免费全文链接数'] = 0
     data['全文提取状态'] = "未尝试"
     
-    # 首先检查和提取免费全文内容（如果启用）
-    fulltext_analysis = None
-    combined_text = abstract_text  # 默认只使用摘要
-    
-    if enable_fulltext and data['PMID']:
-        try:
-            print(f"  🔍 正在检查PMID {data['PMID']} 的全文可用性...")
-            print(f"    📡 发送免费全文检测请求...")
-            
-            # 使用全文分析功能
-            fulltext_analysis = analyze_pmid_with_full_text(data['PMID'])
-            
-            # 更新免费全文状态字段
-            if fulltext_analysis.get('is_free'):
-                links_count = len(fulltext_analysis.get('links', []))
-                data['免费全文状态'] = "免费"
-                data['免费全文链接数'] = links_count
-                data['全文提取状态'] = "可获取" if fulltext_analysis.get('extraction_success', False) else "获取失败"
-                print(f"  ✅ 发现免费全文: {links_count} 个链接")
-                print(f"    🎯 免费全文来源: {fulltext_analysis.get('source', 'unknown')}")
-                
-                if fulltext_analysis.get('extraction_success', False):
-                    print(f"    📥 免费全文内容提取成功")
-                else:
-                    print(f"    ⚠️ 免费全文内容提取失败")
-                
-                # 如果成功提取到全文内容，将其与摘要合并用于AI提取
-                if fulltext_analysis.get('extraction_success', False):
-                    extracted_content = fulltext_analysis.get('extracted_content', {})
-                    full_text_parts = []
-                    
-                    if extracted_content.get('title'):
-                        full_text_parts.append(f"标题: {extracted_content['title']}")
-                        print(f"    📄 提取到标题: {extracted_content['title'][:50]}...")
-                    if extracted_content.get('abstract'):
-                        full_text_parts.append(f"摘要: {extracted_content['abstract']}")
-                        print(f"    📄 提取到摘要: {len(extracted_content['abstract'])} 字符")
-                    if extracted_content.get('body_text'):
-                        # 截取前2000字符避免过长
-                        body_text = extracted_content['body_text'][:2000]
-                        full_text_parts.append(f"正文: {body_text}")
-                        print(f"    📄 提取到正文: {len(extracted_content['body_text'])} 字符 (截取2000字符)")
-                    
-                    if full_text_parts:
-                        full_text_content = "\n\n".join(full_text_parts)
-                        combined_text = f"{abstract_text}\n\n【全文内容】\n{full_text_content}"
-                        print("  📄 检测到免费全文，已将全文内容加入AI分析")
-                
-            else:
-                data['免费全文状态'] = "付费"
-                data['免费全文链接数'] = 0
-                data['全文提取状态'] = "不可获取"
-                if fulltext_analysis.get('extraction_success', False):
-                    print(f"  ✅ 原文网页全文获取成功")
-                else:
-                    print(f"  ❌ 付费文献，原文获取失败")
-                
-        except Exception as e:
-            logger.error(f"处理PMID {data['PMID']} 全文分析时出错: {e}")
-            data['免费全文状态'] = "检查失败"
-            data['免费全文链接数'] = 0
-            data['全文提取状态'] = "检查失败"
-            print(f"  ❌ 付费文献，原文获取失败")
-    else:
+    # 4. 国家、免费全文、规则提取和AI提取组成任务图：互不依赖的步骤并发执行，
+    #    只有基于摘要+全文的AI提取需要等待全文获取（quick 模式的全文状态由 refine_record_with_full_text 稍后更新）
+    wait_for_fulltext = enable_fulltext and not quick and bool(data['PMID'])
+    use_cascade = EXTRACTION_CASCADE_CONFIG.get("enabled")
+
+    def resolve_offline_country():
+        """国家：先用离线词典识别第一作者机构，有歧义的再随AI主提取请求一并识别；返回 (国家, 交给AI的机构)"""
+        if resolved_country:
+            return resolved_country, None
+        if affiliation:
+            country_resolution = resolve_country(affiliation)
+            if not country_resolution['ambiguous']:
+                logger.debug("离线词典识别国家: %s (%s)", country_resolution['country'], ', '.join(country_resolution['evidence']))
+                return country_resolution['country'], None
+        return "需人工确认", affiliation
+
+    def check_fulltext():
+        """检查免费全文状态（启用全文提取时同时获取全文内容）；返回 (全文状态字段, 全文内容)"""
+        status = {}
+        if quick:
+            status['免费全文状态'] = "检查中"
+            status['全文提取状态'] = "待提取"
+            return status, None
+        if wait_for_fulltext:
+            full_text_content = _apply_full_text_analysis(status, data['PMID'])
+            if full_text_content:
+                logger.debug("📄 检测到免费全文，已将全文内容加入AI分析")
+            return status, full_text_content
         # 如果未启用全文提取，使用传统方法检查全文可用性
-        try:
-            pmid = data['PMID']
-            if pmid and ENHANCED_SCRAPER_AVAILABLE:
-                # 使用增强版scraper检查
-                enhanced_scraper = EnhancedPubMedScraper()
-                enhanced_result = enhanced_scraper.check_fulltext_comprehensive(pmid)
-                if enhanced_result:
-                    data['免费全文状态'] = enhanced_result.get('free_status', '未检查')
-                    data['免费全文链接数'] = enhanced_result.get('free_links_count', 0)
-                    data['全文提取状态'] = enhanced_result.get('extraction_status', '未尝试')
-                else:
-                    # 回退到传统方法
-                    is_free = check_full_text_availability(pmid)
-                    data['免费全文状态'] = "免费" if is_free else "付费"
-                    data['免费全文链接数'] = 1 if is_free else 0
-                    data['全文提取状态'] = "未尝试"
-            elif pmid:
-                # 使用传统方法
-                is_free = check_full_text_availability(pmid)
-                data['免费全文状态'] = "免费" if is_free else "付费"
-                data['免费全文链接数'] = 1 if is_free else 0
-                data['全文提取状态'] = "未尝试"
-        except Exception as e:
-            logger.error(f"检查全文状态时出错: {e}")
-            data['免费全文状态'] = "检查失败"
-            data['免费全文链接数'] = 0
-            data['全文提取状态'] = "检查失败"
+        _apply_free_status_check(status, data['PMID'])
+        return status, None
 
-    # 使用AI统一提取信息（现在包含全文内容，如果可用）
-    logger.info(f"开始使用AI提取研究信息 (模型: {target_model})...")
-    
-    # 根据是否有全文内容决定提示词
-    if data['免费全文状态'] == "免费" and fulltext_analysis and fulltext_analysis.get('extraction_success', False):
-        print("  🤖 正在将摘要+全文内容发给AI询问中...")
-        print("  📄 已集成免费全文内容到AI分析中...")
-        print(f"    📊 AI输入长度: {len(combined_text)} 字符")
-    else:
-        print("  🤖 正在将摘要发给AI询问中...")
-        print(f"    📊 AI输入长度: {len(combined_text)} 字符")
-    
-    ai_extracted = extract_info_with_ai(combined_text, article_title, target_model=target_model)
-    print("  📥 AI数据已返回")
-    logger.info(f"AI提取结果：{ai_extracted}")
+    def run_ai_extraction(country, rules=None, fulltext=None):
+        """使用AI统一提取信息（有全文内容时基于摘要+全文）"""
+        _, ai_affiliation = country
+        full_text_content = fulltext[1] if fulltext else None
+        combined_text = abstract_text  # 默认只使用摘要
+        logger.debug("开始使用AI提取研究信息 (模型: %s)...", target_model)
+        
+        # 根据是否有全文内容决定提示词
+        if full_text_content:
+            # 如果成功提取到全文内容，将其与摘要合并用于AI提取
+            combined_text = f"{abstract_text}\n\n【全文内容】\n{full_text_content}"
+            logger.debug("🤖 正在将摘要+全文内容发给AI询问中...")
+            logger.debug("📄 已集成免费全文内容到AI分析中...")
+        else:
+            logger.debug("🤖 正在将摘要发给AI询问中...")
+        logger.debug("📊 AI输入长度: %s 字符", len(combined_text))
+        
+        # 分级提取：规则能可靠得到的字段不发给模型，小模型补全其余字段，仍不完整才升级到大模型
+        if use_cascade:
+            ai_extracted = extract_info_cascade(combined_text, article_title, target_model=target_model,
+                                                affiliation=ai_affiliation, rule_results=rules)
+        else:
+            ai_extracted = extract_info_with_ai(combined_text, article_title, target_model=target_model,
+                                                affiliation=ai_affiliation)
+        logger.debug("📥 AI数据已返回")
+        logger.debug("AI提取结果：%s", ai_extracted)
+        return ai_extracted
+
+    graph = TaskGraph()
+    graph.add('country', resolve_offline_country)
+    graph.add('fulltext', check_fulltext)
+    ai_deps = ['country']
+    if use_cascade:
+        # 规则提取只依赖摘要，与全文获取并行
+        graph.add('rules', lambda: data_parser.extract_with_confidence(abstract_text, article_title or ""))
+        ai_deps.append('rules')
+    if wait_for_fulltext:
+        ai_deps.append('fulltext')
+    graph.add('ai', run_ai_extraction, deps=ai_deps)
+    results = graph.run()
+
+    data.update(results['fulltext'][0])
+    data['国家'], ai_affiliation = results['country']
+    ai_extracted = results['ai']
+    
+    # 离线词典无法确定时，国家优先取主提取请求的结果，仍无效才单独发起国家识别
+    if ai_affiliation:
+        ai_country = ai_extracted.get('国家', '')
+        if ai_country and ai_country not in ["未明确说明", "需人工确认"]:
+            data['国家'] = ai_country
+            _update_country_cache(affiliation, ai_country)
+        else:
+            data['国家'] = extract_country_from_affiliation(article_data)
     
     # 更新数据字段（包括标题翻译）
     data['原文标题'] = ai_extracted.get('原文标题', article_title or "无标题")
     data['翻译标题'] = ai_extracted.get('翻译标题', "翻译失败")
-    data['研究对象'] = ai_extracted.get('研究对象', "需人工确认")
-    data['样本量'] = ai_extracted.get('样本量', "需人工确认")
-    data['推荐补充剂量/用法'] = ai_extracted.get('推荐补充剂量/用法', "需人工确认")
-    data['作用机理'] = ai_extracted.get('作用机理', "需人工确认")
-    data['摘要主要内容'] = ai_extracted.get('摘要主要内容', "需人工确认")
-    data['结论摘要'] = ai_extracted.get('结论摘要', "需人工确认")  # 从AI提取结果中获取中文结论摘要
-    data['数据收集年份'] = ai_extracted.get('数据收集年份', "需人工确认")  # 从AI提取结果中获取数据收集年份
+    for field in AI_ROW_FIELDS:
+        data[field] = ai_extracted.get(field, "需人工确认")
     
     # 9. 证据等级 (基于研究类型预判)
     if "Meta-Analysis" in data['研究类型']:
@@ -514,6 +422,96 @@ def parse_record(article, enable_fulltext=False, target_model=None):
 
     return data
 
+def refine_record_with_full_text(data: Dict, article, target_model=None) -> Dict:
+    """
+    渐进式结果的第二阶段：为 quick 模式生成的行检查并提取免费全文，
+    获取到全文时基于摘要+全文重新提取，用有效的新结果覆盖原有字段
+    
+    Args:
+        data: parse_record(quick=True) 生成的行（原地更新）
+        article: 对应的原始文献记录
+        target_model: 指定的模型
+    
+    Returns:
+        发生变化的字段及新值
+    """
+    before = dict(data)
+    article_data = article['MedlineCitation']['Article']
+    full_text_content = _apply_full_text_analysis(data, data['PMID']) if data.get('PMID') else None
+
+    if full_text_content:
+        combined_text = f"{_get_abstract_text(article_data)}\n\n【全文内容】\n{full_text_content}"
+        logger.debug("🤖 正在将摘要+全文内容发给AI询问中... (%s 字符)", len(combined_text))
+        # 国家已在第一阶段确定，这里不再传入作者机构
+        extract = extract_info_cascade if EXTRACTION_CASCADE_CONFIG.get("enabled") else extract_info_with_ai
+        ai_extracted = extract(combined_text, article_data.get('ArticleTitle', ''), target_model=target_model)
+        for field in ['翻译标题'] + AI_ROW_FIELDS:
+            value = ai_extracted.get(field)
+            if value and value not in ("未明确说明", "需人工确认", "翻译失败"):
+                data[field] = value
+
+    return {field: value for field, value in data.items() if before.get(field) != value}
+
+
+def _get_abstract_text(article_data: Dict) -> str:
+    """获取文献摘要文本（AbstractText 有时是列表（分段摘要），有时是字符串）"""
+    if 'Abstract' in article_data and 'AbstractText' in article_data['Abstract']:
+        abs_content = article_data['Abstract']['AbstractText']
+        if isinstance(abs_content, list):
+            return " ".join([str(item) for item in abs_content])
+        return str(abs_content)
+    return ""
+
+
+def refill_incomplete_rows(rows: List[Dict], articles: List[Dict], enable_fulltext: bool = False,
+                           target_model: str = None, on_update=None) -> int:
+    """
+    主任务结束后的补提取：只针对仍缺失的字段重新提取并合并回结果行
+
+    启用全文提取且该文献全文可获取时，重新获取正文并只附上与缺失字段相关的段落；
+    否则只使用摘要。
+    
+    Args:
+        rows: parse_record 生成的结果行（原地更新）
+        articles: 与结果行对应的原始文献记录
+        enable_fulltext: 是否使用全文段落
+        target_model: 指定的模型
+        on_update: 行被补全后的回调，参数为 (行, 补全的字段列表)
+    
+    Returns:
+        被补全的行数
+    """
+    if not REEXTRACTION_CONFIG.get("enabled", True):
+        return 0
+
+    articles_by_pmid = {str(article['MedlineCitation'].get('PMID', '')): article for article in articles}
+    updated_count = 0
+    for row in rows:
+        missing = ai_extractor.find_missing_fields(row)
+        article = articles_by_pmid.get(str(row.get('PMID', '')))
+        if not missing or article is None:
+            continue
+
+        article_data = article['MedlineCitation']['Article']
+        full_text = None
+        if enable_fulltext and row.get('全文提取状态') == "可获取":
+            try:
+                fulltext_analysis = get_full_text_analysis(str(row['PMID']))
+                full_text = fulltext_analysis.get('extracted_content', {}).get('body_text')
+            except Exception as e:
+                logger.error(f"补提取时获取PMID {row['PMID']} 全文失败: {e}")
+
+        merged = reextract_missing_fields(row, _get_abstract_text(article_data), article_data.get('ArticleTitle', ''),
+                                          full_text=full_text, target_model=target_model)
+        filled = [field for field in missing if merged.get(field) != row.get(field)]
+        if filled:
+            row.update(merged)
+            updated_count += 1
+            if on_update:
+                on_update(row, filled)
+    return updated_count
+
+
 def extract_country_from_affiliation(article_data: Dict) -> str:
     """
     从作者机构信息中提取国家名称 - 基于GPT AI的简化实现
@@ -529,40 +527,39 @@ def extract_country_from_affiliation(article_data: Dict) -> str:
         if 'AuthorList' not in article_data or not article_data['AuthorList']:
             logger.warning("没有找到作者信息，返回需人工确认")
             return "需人工确认"
-            
-        first_author = article_data['AuthorList'][0]
         
-        # 获取机构信息
-        affiliation = ""
-        if 'AffiliationInfo' in first_author and first_author['AffiliationInfo']:
-            affiliation = first_author['AffiliationInfo'][0].get('Affiliation', '')
-        elif 'Affiliation' in first_author:
-            affiliation = first_author['Affiliation']
+        # 获取第一作者机构信息
+        affiliation = _get_first_author_affiliation(article_data)
         
         if not affiliation:
             logger.warning("没有找到机构信息，返回需人工确认")
             return "需人工确认"
         
         # 清理机构信息用于缓存键
-        clean_affiliation = affiliation.replace('\n', ' ').replace('\r', ' ').strip()
-        
-        # 检查缓存
-        cache_key = f"{hash(clean_affiliation)}_{len(clean_affiliation)}"
-        if cache_key in COUNTRY_CACHE:
-            cached_result, cache_time = COUNTRY_CACHE[cache_key]
-            if time.time() - cache_time < COUNTRY_CACHE_TTL:
-                logger.debug(f"从缓存获取国家信息: {cached_result}")
-                return cached_result
-        
-        # 使用AI进行国家识别
+        clean_affiliation = _clean_affiliation(affiliation)
+        
+        # 检查缓存（按规范化机构信息的内容哈希查找）
+        cached_result = country_cache.get(clean_affiliation)
+        if cached_result:
+            logger.debug("从缓存获取国家信息: %s", cached_result)
+            return cached_result
+        
+        # 第一层：离线词典识别，结果明确时无需请求AI
+        resolution = resolve_country(clean_affiliation)
+        if not resolution['ambiguous']:
+            logger.debug("离线词典识别国家: %s", resolution['country'])
+            _update_country_cache(clean_affiliation, resolution['country'])
+            return resolution['country']
+        
+        # 第二层：有歧义或无证据的机构交给AI识别
         ai_result = _extract_country_with_ai(clean_affiliation)
         
         if ai_result and ai_result != "需人工确认":
             # 更新缓存
-            _update_country_cache(cache_key, ai_result)
+            _update_country_cache(clean_affiliation, ai_result)
             return ai_result
         
-        # 回退到简单的关键词匹配
+        # 回退到离线词典的最佳猜测
         logger.info("AI识别失败，使用回退机制")
         return _fallback_country_extraction(clean_affiliation)
         
@@ -570,6 +567,141 @@ def extract_country_from_affiliation(article_data: Dict) -> str:
         logger.error(f"提取国家信息时出错: {e}")
         return "需人工确认"
 
+def resolve_countries_for_articles(articles: List[Dict]) -> Dict[str, str]:
+    """
+    任务级国家识别预处理：对一批文献的第一作者机构去重后统一识别
+    
+    依次使用持久化缓存、离线词典，剩余有歧义的机构合并为一次批量AI请求，
+    结果在逐篇解析之前通过 parse_record 的 resolved_country 参数传入
+    
+    Args:
+        articles: fetch_details 返回的文献列表
+        
+    Returns:
+        PMID -> 国家名称 的字典，未能识别的文献不在其中
+    """
+    # 1. 收集并按规范化机构信息去重
+    pmids_by_key = {}
+    affiliation_by_key = {}
+    for article in articles:
+        try:
+            medline = article['MedlineCitation']
+            pmid = str(medline.get('PMID', ''))
+            affiliation = _clean_affiliation(_get_first_author_affiliation(medline['Article']))
+        except Exception as e:
+            logger.debug("预处理国家信息时跳过一篇文献: %s", e)
+            continue
+        if not pmid or not affiliation:
+            continue
+        key = affiliation_cache_key(affiliation)
+        pmids_by_key.setdefault(key, []).append(pmid)
+        affiliation_by_key.setdefault(key, affiliation)
+    
+    # 2. 缓存和离线词典
+    country_by_key = {}
+    pending_keys = []
+    for key, affiliation in affiliation_by_key.items():
+        cached = country_cache.get(affiliation)
+        if cached:
+            country_by_key[key] = cached
+            continue
+        resolution = resolve_country(affiliation)
+        if not resolution['ambiguous']:
+            country_by_key[key] = resolution['country']
+            _update_country_cache(affiliation, resolution['country'])
+            continue
+        pending_keys.append(key)
+    
+    # 3. 剩余机构合并为批量AI请求
+    for start in range(0, len(pending_keys), COUNTRY_BATCH_SIZE):
+        batch_keys = pending_keys[start:start + COUNTRY_BATCH_SIZE]
+        batch_results = _extract_countries_with_ai_batch([affiliation_by_key[key] for key in batch_keys])
+        for key, country in zip(batch_keys, batch_results):
+            if country and country != "需人工确认":
+                country_by_key[key] = country
+                _update_country_cache(affiliation_by_key[key], country)
+    
+    logger.info(f"国家预处理完成: {len(articles)} 篇文献, {len(affiliation_by_key)} 个不同机构, "
+                f"{len(pending_keys)} 个需要AI识别, {len(country_by_key)} 个已识别")
+    
+    return {
+        pmid: country_by_key[key]
+        for key, pmids in pmids_by_key.items() if key in country_by_key
+        for pmid in pmids
+    }
+
+def _extract_countries_with_ai_batch(affiliations: List[str]) -> List[str]:
+    """
+    使用一次AI请求识别多个机构所属国家
+    
+    Args:
+        affiliations: 机构信息列表
+        
+    Returns:
+        与输入顺序一致的国家名称列表，无法识别的为"需人工确认"
+    """
+    if not affiliations:
+        return []
+    
+    numbered = "\n".join(f"{i + 1}. {affiliation}" for i, affiliation in enumerate(affiliations))
+    prompt = f"""请判断以下每条作者机构信息所属的国家。
+
+机构信息：
+{numbered}
+
+要求：
+1. 使用标准中文国家名称（如"美国"而非"USA"，"中国"而非"China"）
+2. 无法确定的填"需人工确认"
+3. 只返回JSON对象，键为机构编号，值为国家名称，例如 {{"1": "美国", "2": "中国"}}，不要解释
+"""
+    
+    results = ["需人工确认"] * len(affiliations)
+    try:
+        content = _call_ai_api(prompt, "country_extraction_batch", max_tokens=20 * len(affiliations) + 50)
+        json_match = re.search(r'\{.*\}', content or "", re.DOTALL)
+        if not json_match:
+            logger.warning("批量国家识别未返回有效JSON")
+            return results
+        
+        parsed = json.loads(json_match.group(0))
+        for index_str, country in parsed.items():
+            try:
+                index = int(index_str) - 1
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < len(results) and isinstance(country, str) and country.strip():
+                results[index] = country.strip()
+        logger.info(f"批量AI国家识别完成: {sum(1 for r in results if r != '需人工确认')}/{len(results)}")
+    except Exception as e:
+        logger.error(f"批量AI国家识别失败: {e}")
+    
+    return results
+
+def _get_first_author_affiliation(article_data: Dict) -> str:
+    """
+    获取第一作者的机构信息
+    
+    Args:
+        article_data: 从PubMed获取的文章数据
+        
+    Returns:
+        机构信息字符串，没有时返回空字符串
+    """
+    author_list = article_data.get('AuthorList') or []
+    if not author_list:
+        return ""
+    
+    first_author = author_list[0]
+    if 'AffiliationInfo' in first_author and first_author['AffiliationInfo']:
+        return str(first_author['AffiliationInfo'][0].get('Affiliation', ''))
+    if 'Affiliation' in first_author:
+        return str(first_author['Affiliation'])
+    return ""
+
+def _clean_affiliation(affiliation: str) -> str:
+    """清理机构信息中的换行符"""
+    return affiliation.replace('\n', ' ').replace('\r', ' ').strip()
+
 def _extract_country_with_ai(affiliation: str) -> str:
     """
     使用GPT AI从机构信息中提取国家名称
@@ -609,7 +741,7 @@ def _extract_country_with_ai(affiliation: str) -> str:
 
 def _fallback_country_extraction(affiliation: str) -> str:
     """
-    回退机制：简单的关键词匹配提取国家
+    回退机制：采用离线词典识别的最高分国家（即使存在歧义）
     
     Args:
         affiliation: 机构信息字符串
@@ -617,46 +749,22 @@ def _fallback_country_extraction(affiliation: str) -> str:
     Returns:
         国家名称字符串
     """
-    # 简化的中文国家关键词映射
-    country_keywords = {
-        "美国": ["USA", "US", "America", "United States", "American", "USA.", "US.", "New York", "California", "Harvard", "Yale", "Stanford", "MIT"],
-        "中国": ["China", "Chinese", "Beijing", "Shanghai", "Guangzhou", "Tsinghua", "Peking", "Chinese Academy"],
-        "英国": ["UK", "Britain", "England", "Scotland", "Wales", "London", "Oxford", "Cambridge", "Imperial College"],
-        "德国": ["Germany", "German", "Deutschland", "Berlin", "Munich", "Heidelberg"],
-        "日本": ["Japan", "Japanese", "Tokyo", "Osaka", "Kyoto", "Tohoku", "Osaka University", "University of Tokyo"],
-        "澳大利亚": ["Australia", "Australian", "Sydney", "Melbourne", "Monash", "University of Sydney"],
-        "加拿大": ["Canada", "Canadian", "Toronto", "Montreal", "McGill", "University of Toronto"],
-        "法国": ["France", "French", "Paris", "Sorbonne"],
-        "意大利": ["Italy", "Italian", "Rome", "Milan", "University of Bologna"],
-        "西班牙": ["Spain", "Spanish", "Barcelona", "Madrid"],
-        "荷兰": ["Netherlands", "Dutch", "Amsterdam", "Rotterdam"],
-        "韩国": ["Korea", "Korean", "Seoul", "KAIST", "SNU"],
-        "印度": ["India", "Indian", "Mumbai", "Delhi", "IIT"],
-        "新加坡": ["Singapore", "Singaporean", "NUS", "NTU"],
-        "台湾": ["Taiwan", "Taiwanese", "Taipei"],
-        "香港": ["Hong Kong"],
-        "巴西": ["Brazil", "Brazilian"],
-        "墨西哥": ["Mexico", "Mexican"]
-    }
-    
-    affiliation_upper = affiliation.upper()
-    
-    for country, keywords in country_keywords.items():
-        for keyword in keywords:
-            if keyword.upper() in affiliation_upper:
-                logger.info(f"回退机制识别国家: {country} (匹配关键词: {keyword})")
-                return country
+    resolution = resolve_country(affiliation)
+    if resolution['country']:
+        logger.info(f"回退机制识别国家: {resolution['country']} (匹配: {', '.join(resolution['evidence'])})")
+        return resolution['country']
     
     logger.info("回退机制也未能识别国家，返回需人工确认")
     return "需人工确认"
 
-def _call_ai_api(prompt: str, context: str) -> str:
+def _call_ai_api(prompt: str, context: str, max_tokens: int = 100) -> str:
     """
     调用AI API的简化接口
     
     Args:
         prompt: 提示词
         context: 上下文标识
+        max_tokens: 返回的最大token数
         
     Returns:
         AI返回的文本
@@ -674,19 +782,36 @@ def _call_ai_api(prompt: str, context: str) -> str:
         max_retries_per_config = 2
         max_total_retries = 6
         
+        # 预留的token额度：提示词 + 最大输出
+        estimated_tokens = estimate_tokens(prompt) + max_tokens
+        # 按各路径的预期完成时间调整模型尝试顺序
+        model_configs = api_key_pool.rank_models(model_configs)
+
         total_attempts = 0
         for model, endpoint in model_configs:
             if total_attempts >= max_total_retries:
                 break
                 
+            breaker = circuit_breakers.get(endpoint, model)
             for retry in range(max_retries_per_config):
+                check_cancelled()
                 total_attempts += 1
                 if total_attempts >= max_total_retries:
                     break
+
+                # 先向熔断器申请再预留密钥额度：端点熔断时直接换下一个模型，不占用其他端点需要的额度
+                if not breaker.allow_request():
+                    logger.warning(f"模型 {model} 的端点已熔断，跳过 ({context})")
+                    break
                     
-                # 获取可用密钥
-                api_key = api_key_pool.get_available_key()
+                # 获取可用密钥（额度不足时等待最早恢复的密钥）
+                try:
+                    api_key = api_key_pool.get_available_key(estimated_tokens, endpoint=endpoint, model=model)
+                except OperationCancelled:
+                    breaker.release()
+                    raise
                 if not api_key:
+                    breaker.release()
                     logger.error("没有可用的API密钥")
                     return ""
                 
@@ -704,27 +829,59 @@ def _call_ai_api(prompt: str, context: str) -> str:
                                 'content': prompt
                             }
                         ],
-                        'max_tokens': 100,
+                        'max_tokens': max_tokens,
                         'temperature': 0.1
                     }
-                    
-                    response = requests.post(endpoint, headers=headers, json=payload, timeout=30)
+
+                    # 排队、发送和清理放在同一个 try/finally 中：排队时被取消也会归还熔断探测名额和密钥额度
+                    ticket = None
+                    request_started = None
+                    response = None
+                    cancelled = False
+                    try:
+                        ticket = llm_scheduler.acquire()
+                        api_key_pool.start_request(api_key, endpoint, model)
+                        request_started = time.monotonic()
+                        response = call_cancellable(requests.post, endpoint, headers=headers, json=payload, timeout=30)
+                    except OperationCancelled:
+                        cancelled = True
+                        raise
+                    finally:
+                        if ticket is not None:
+                            llm_scheduler.release(ticket)
+                        if request_started is None:
+                            # 请求未发出，归还全部预留额度
+                            breaker.release()
+                            api_key_pool.release_reservation(api_key, requests=1, tokens=estimated_tokens)
+                        elif cancelled:
+                            # 任务被取消，不计入熔断和路由统计；已发出的请求只归还token额度
+                            breaker.release()
+                            api_key_pool.abandon_request(api_key, endpoint, model)
+                            api_key_pool.release_reservation(api_key, tokens=estimated_tokens)
+                        else:
+                            breaker.record_result(response.status_code if response is not None else None)
+                            api_key_pool.finish_request(api_key, endpoint, model, time.monotonic() - request_started,
+                                                        response is not None and response.status_code == 200)
+                    api_key_pool.observe_rate_limit_headers(api_key, response.headers)
                     
                     if response.status_code == 200:
                         data = response.json()
                         if 'choices' in data and len(data['choices']) > 0:
                             content = data['choices'][0]['message']['content'].strip()
-                            api_key_pool.report_success(api_key)
-                            logger.debug(f"AI API调用成功 ({context})")
+                            usage = data.get('usage') or {}
+                            api_key_pool.report_success(api_key, usage.get('total_tokens'), estimated_tokens)
+                            logger.debug("AI API调用成功 (%s)", context)
                             return content
                         else:
                             api_key_pool.report_failure(api_key, "invalid_response")
                     elif response.status_code == 429:
-                        # 限流错误，使用指数退避
-                        wait_time = (2 ** retry) + random.uniform(0, 1)
-                        logger.warning(f"API限流，等待 {wait_time:.1f} 秒")
-                        time.sleep(wait_time)
-                        api_key_pool.report_failure(api_key, "rate_limit")
+                        # 限流错误：让该密钥按 Retry-After 冷却，下一次循环由密钥池选择其他密钥
+                        retry_after = response.headers.get('Retry-After')
+                        try:
+                            retry_after = float(retry_after) if retry_after is not None else None
+                        except ValueError:
+                            retry_after = None
+                        api_key_pool.report_rate_limited(api_key, retry_after)
                         continue
                     elif response.status_code in [401, 403]:
                         # 认证错误，切换密钥
@@ -755,24 +912,17 @@ def _call_ai_api(prompt: str, context: str) -> str:
         logger.error(f"调用AI API时出错: {e}")
         return ""
 
-def _update_country_cache(key: str, country: str):
+def _update_country_cache(affiliation: str, country: str):
     """
     更新国家识别缓存
     
     Args:
-        key: 缓存键
+        affiliation: 机构信息
         country: 国家名称
     """
     try:
-        # 检查缓存大小限制
-        if len(COUNTRY_CACHE) >= COUNTRY_CACHE_MAX_SIZE:
-            # 删除最旧的条目（简单实现：删除第一个）
-            oldest_key = next(iter(COUNTRY_CACHE))
-            del COUNTRY_CACHE[oldest_key]
-            logger.debug("缓存已满，删除最旧条目")
-        
-        COUNTRY_CACHE[key] = (country, time.time())
-        logger.debug(f"更新国家缓存: {key[:20]}... -> {country}")
+        country_cache.set(affiliation, country)
+        logger.debug("更新国家缓存: %s... -> %s", affiliation[:20], country)
     except Exception as e:
         logger.error(f"更新缓存时出错: {e}")
 
@@ -890,7 +1040,7 @@ def check_full_text_availability(pmid: str) -> Dict[str, any]:
     try:
         # 构建PubMed页面URL
         pubmed_url = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
-        print(f"🔍 正在检查: {pubmed_url}")
+        logger.debug("🔍 正在检查: %s", pubmed_url)
         
         # 获取页面内容，添加更完整的请求头
         headers = {
@@ -902,7 +1052,8 @@ def check_full_text_availability(pmid: str) -> Dict[str, any]:
             'Upgrade-Insecure-Requests': '1',
         }
         
-        response = requests.get(pubmed_url, headers=headers, timeout=15)
+        with http_scheduler.slot():
+            response = call_cancellable(requests.get, pubmed_url, headers=headers, timeout=15)
         response.raise_for_status()
         
         # 解析HTML
@@ -914,7 +1065,7 @@ def check_full_text_availability(pmid: str) -> Dict[str, any]:
             href = pmc_free_link.get('href', '')
             if href:
                 full_url = href if href.startswith('http') else f"https://pubmed.ncbi.nlm.nih.gov{href}"
-                print(f"✅ 找到PMC免费全文链接: {full_url}")
+                logger.debug("✅ 找到PMC免费全文链接: %s", full_url)
                 return {
                     "is_free": True,
                     "pmid": pmid,
@@ -940,14 +1091,14 @@ def check_full_text_availability(pmid: str) -> Dict[str, any]:
         
         if full_text_section:
             link_elements = full_text_section.find_all('a', href=True)
-            print(f"📄 在全文链接部分找到 {len(link_elements)} 个链接")
+            logger.debug("📄 在全文链接部分找到 %s 个链接", len(link_elements))
         else:
             # 如果没有专门的全文链接部分，查找所有链接
             link_elements = soup.find_all('a', href=True)
             # 筛选可能相关的链接
             link_elements = [link for link in link_elements if any(keyword in link.get('href', '').lower() 
                                for keyword in ['pmc', 'europepmc', 'full', 'text', 'article'])]
-            print(f"🔗 找到 {len(link_elements)} 个相关链接")
+            logger.debug("🔗 找到 %s 个相关链接", len(link_elements))
         
         # 分析每个链接
         for link in link_elements:
@@ -987,7 +1138,7 @@ def check_full_text_availability(pmid: str) -> Dict[str, any]:
             all_links.append(link_info)
             if is_free:
                 free_links.append(link_info)
-                print(f"✅ 发现免费链接: {text} - {link_info['url']} ({', '.join(free_indicators)})")
+                logger.debug("✅ 发现免费链接: %s - %s (%s)", text, link_info['url'], ', '.join(free_indicators))
         
         # 确定最终结果
         if free_links:
@@ -1013,7 +1164,7 @@ def check_full_text_availability(pmid: str) -> Dict[str, any]:
             }
         
     except requests.RequestException as e:
-        print(f"❌ 网络请求失败: {str(e)}")
+        logger.warning("❌ 网络请求失败: %s", e)
         return {
             "is_free": False,
             "pmid": pmid,
@@ -1021,7 +1172,7 @@ def check_full_text_availability(pmid: str) -> Dict[str, any]:
             "message": "无法获取页面信息"
         }
     except Exception as e:
-        print(f"❌ 解析失败: {str(e)}")
+        logger.warning("❌ 解析失败: %s", e)
         return {
             "is_free": False,
             "pmid": pmid,
@@ -1044,7 +1195,7 @@ def extract_full_text_content(pmid: str, link_url: str = None) -> Dict[str, any]
     try:
         # 如果没有提供链接URL，先检查可用性
         if not link_url:
-            print(f"🔍 自动检测PMID {pmid}的免费全文链接...")
+            logger.debug("🔍 自动检测PMID %s的免费全文链接...", pmid)
             availability = check_full_text_availability(pmid)
             if not availability['is_free']:
                 return {
@@ -1063,9 +1214,9 @@ def extract_full_text_content(pmid: str, link_url: str = None) -> Dict[str, any]
                 }
             
             link_url = free_links[0]['url']
-            print(f"📄 选择免费全文链接: {link_url}")
+            logger.debug("📄 选择免费全文链接: %s", link_url)
         
-        print(f"📖 正在提取PMID {pmid}的全文内容...")
+        logger.debug("📖 正在提取PMID %s的全文内容...", pmid)
         
         # 获取全文页面，使用更完整的请求头
         headers = {
@@ -1077,7 +1228,8 @@ def extract_full_text_content(pmid: str, link_url: str = None) -> Dict[str, any]
             'Upgrade-Insecure-Requests': '1',
         }
         
-        response = requests.get(link_url, headers=headers, timeout=20)
+        with http_scheduler.slot():
+            response = call_cancellable(requests.get, link_url, headers=headers, timeout=20)
         response.raise_for_status()
         
         soup = BeautifulSoup(response.content, 'html.parser')
@@ -1099,7 +1251,7 @@ def extract_full_text_content(pmid: str, link_url: str = None) -> Dict[str, any]
         title_tag = soup.find('title')
         if title_tag:
             content['debug_info']['page_title'] = title_tag.get_text(strip=True)
-            print(f"📄 页面标题: {title_tag.get_text(strip=True)[:100]}...")
+            logger.debug("📄 页面标题: %s...", title_tag.get_text(strip=True)[:100])
         
         # 提取标题 - 多种选择器
         title_selectors = [
@@ -1119,7 +1271,7 @@ def extract_full_text_content(pmid: str, link_url: str = None) -> Dict[str, any]
                 if title_text and len(title_text) > 10:  # 确保标题有意义
                     content['content']['title'] = title_text
                     content['debug_info']['extracted_elements'].append(f"标题: {selector}")
-                    print(f"✅ 提取标题: {title_text[:100]}...")
+                    logger.debug("✅ 提取标题: %s...", title_text[:100])
                     break
         
         # 提取摘要 - 多种选择器策略
@@ -1145,7 +1297,7 @@ def extract_full_text_content(pmid: str, link_url: str = None) -> Dict[str, any]
                 if abstract_text and len(abstract_text) > 50:  # 确保摘要有意义
                     content['content']['abstract'] = abstract_text
                     content['debug_info']['extracted_elements'].append(f"摘要: {selector}")
-                    print(f"✅ 提取摘要: {len(abstract_text)} 字符")
+                    logger.debug("✅ 提取摘要: %s 字符", len(abstract_text))
                     break
         
         # 提取关键词 - 多种位置
@@ -1166,7 +1318,7 @@ def extract_full_text_content(pmid: str, link_url: str = None) -> Dict[str, any]
                 if keywords_text and len(keywords_text) > 5:
                     content['content']['keywords'] = keywords_text
                     content['debug_info']['extracted_elements'].append(f"关键词: {selector}")
-                    print(f"✅ 提取关键词: {keywords_text[:100]}...")
+                    logger.debug("✅ 提取关键词: %s...", keywords_text[:100])
                     break
         
         # 提取作者信息
@@ -1186,7 +1338,7 @@ def extract_full_text_content(pmid: str, link_url: str = None) -> Dict[str, any]
                 if authors_text and len(authors_text) > 10:
                     content['content']['authors'] = authors_text
                     content['debug_info']['extracted_elements'].append(f"作者: {selector}")
-                    print(f"✅ 提取作者信息: {authors_text[:100]}...")
+                    logger.debug("✅ 提取作者信息: %s...", authors_text[:100])
                     break
         
         # 提取正文内容 - 更智能的策略
@@ -1214,12 +1366,12 @@ def extract_full_text_content(pmid: str, link_url: str = None) -> Dict[str, any]
                     for unwanted in body_elem.select(unwanted_selector):
                         unwanted.decompose()
                 
-                # 提取文本
-                body_text = body_elem.get_text(strip=True)
+                # 提取文本（按段落换行，便于按段落挑选相关内容）
+                body_text = extract_block_text(body_elem)
                 if body_text and len(body_text) > 200:  # 确保正文内容有意义
                     content['content']['body_text'] = body_text
                     content['debug_info']['extracted_elements'].append(f"正文: {selector}")
-                    print(f"✅ 提取正文: {len(body_text)} 字符")
+                    logger.debug("✅ 提取正文: %s 字符", len(body_text))
                     break
         
         # 提取参考文献
@@ -1239,7 +1391,7 @@ def extract_full_text_content(pmid: str, link_url: str = None) -> Dict[str, any]
                 if refs_text and len(refs_text) > 50:
                     content['content']['references'] = refs_text
                     content['debug_info']['extracted_elements'].append(f"参考文献: {selector}")
-                    print(f"✅ 提取参考文献: {len(refs_text)} 字符")
+                    logger.debug("✅ 提取参考文献: %s 字符", len(refs_text))
                     break
         
         # 统计提取的元素
@@ -1249,23 +1401,23 @@ def extract_full_text_content(pmid: str, link_url: str = None) -> Dict[str, any]
         if len(content['content']) >= 2:  # 至少提取到标题和摘要
             content['extraction_success'] = True
             content['message'] = f"成功提取{len(content['content'])}个部分的内容"
-            print(f"✅ 全文提取完成，共提取{len(content['content'])}个部分")
+            logger.debug("✅ 全文提取完成，共提取%s个部分", len(content['content']))
         else:
             content['extraction_success'] = False
             content['message'] = f"提取内容不完整，仅获取到{len(content['content'])}个部分"
-            print(f"⚠️ 提取内容不完整，仅获取到{len(content['content'])}个部分")
+            logger.debug("⚠️ 提取内容不完整，仅获取到%s个部分", len(content['content']))
         
         # 如果完全没有提取到内容，提供调试信息
         if not content['content']:
             content['extraction_success'] = False
             content['message'] = "未能提取到任何有效内容"
             content['debug_info']['no_content_reason'] = "页面可能需要特殊处理或链接无效"
-            print(f"❌ 未能提取到任何有效内容")
+            logger.debug("❌ 未能提取到任何有效内容")
         
         return content
         
     except requests.RequestException as e:
-        print(f"❌ 网络请求失败: {str(e)}")
+        logger.warning("❌ 网络请求失败: %s", e)
         return {
             "success": False,
             "pmid": pmid,
@@ -1274,7 +1426,7 @@ def extract_full_text_content(pmid: str, link_url: str = None) -> Dict[str, any]
             "debug_info": {"error_type": "network_error"}
         }
     except Exception as e:
-        print(f"❌ 提取失败: {str(e)}")
+        logger.warning("❌ 提取失败: %s", e)
         return {
             "success": False,
             "pmid": pmid,
@@ -1294,15 +1446,14 @@ def analyze_pmid_with_full_text(pmid: str) -> Dict[str, any]:
     Returns:
         完整的分析结果
     """
-    print(f"\n🔍 开始分析PMID: {pmid}")
-    print("=" * 60)
+    logger.debug("🔍 开始分析PMID: %s", pmid)
     
     # 步骤1：检查全文可用性 - 使用增强版scraper
-    print("步骤1: 检查全文可用性...")
+    logger.debug("步骤1: 检查全文可用性...")
     
     # 优先使用增强版scraper，如果不可用则回退到旧版本
     if ENHANCED_SCRAPER_AVAILABLE:
-        print("🛠️ 使用增强版PubMed抓取器检测免费状态...")
+        logger.debug("🛠️ 使用增强版PubMed抓取器检测免费状态...")
         try:
             enhanced_scraper = EnhancedPubMedScraper()
             enhanced_result = enhanced_scraper.check_fulltext_comprehensive(pmid)
@@ -1314,16 +1465,17 @@ def analyze_pmid_with_full_text(pmid: str) -> Dict[str, any]:
                 'confidence': enhanced_result.get('confidence', 'medium'),
                 'message': f"增强版检测: {enhanced_result.get('consensus', '检测完成')}",
                 'pmcid': enhanced_result.get('pmcid'),
-                'links': []  # 增强版scraper目前不返回详细链接列表
+                'links': [],  # 增强版scraper目前不返回详细链接列表
+                'method_results': enhanced_result.get('method_results', [])
             }
-            print(f"✅ 增强版检测完成: 免费={availability['is_free']}, 置信度={availability['confidence']}")
+            logger.debug("✅ 增强版检测完成: 免费=%s, 置信度=%s", availability['is_free'], availability['confidence'])
             
         except Exception as e:
             logger.warning(f"增强版scraper检测失败，回退到旧版本: {e}")
             availability = check_full_text_availability(pmid)
             availability['source'] = 'fallback_scraper'
     else:
-        print("⚠️ 增强版scraper不可用，使用旧版本检测...")
+        logger.debug("⚠️ 增强版scraper不可用，使用旧版本检测...")
         availability = check_full_text_availability(pmid)
         availability['source'] = 'legacy_scraper'
     
@@ -1344,17 +1496,21 @@ def analyze_pmid_with_full_text(pmid: str) -> Dict[str, any]:
         }
     }
     
+    availability_errors = _availability_errors(availability)
+    if availability_errors:
+        result['debug_info']['availability_error'] = "; ".join(availability_errors)
+
     if not availability.get('is_free', False):
-        print(f"❌ PMID {pmid} 无免费全文: {availability.get('message', '未知原因')}")
+        logger.debug("❌ PMID %s 无免费全文: %s", pmid, availability.get('message', '未知原因'))
         result['debug_info']['no_free_reason'] = availability.get('message', '未知原因')
         result['debug_info']['availability_source'] = availability.get('source', 'unknown')
         return result
     
-    print(f"✅ PMID {pmid} 提供免费全文 (来源: {availability.get('source', 'unknown')})")
+    logger.debug("✅ PMID %s 提供免费全文 (来源: %s)", pmid, availability.get('source', 'unknown'))
     result['debug_info']['extraction_attempted'] = True
     
     # 步骤2：提取全文内容
-    print("\n步骤2: 提取全文内容...")
+    logger.debug("步骤2: 提取全文内容...")
     try:
         full_text = extract_full_text_content(pmid)
         result['full_text_extraction'] = full_text
@@ -1364,50 +1520,49 @@ def analyze_pmid_with_full_text(pmid: str) -> Dict[str, any]:
             result['debug_info']['extraction_details'] = full_text['debug_info']
         
         if full_text.get('extraction_success', False):
-            print(f"✅ 成功提取PMID {pmid}的全文内容")
+            logger.debug("✅ 成功提取PMID %s的全文内容", pmid)
             content_info = full_text.get('content', {})
             result['extraction_success'] = True
             result['extracted_content'] = content_info
             
             # 详细输出提取的内容信息
-            print(f"   📄 标题: {content_info.get('title', 'N/A')[:100]}...")
+            logger.debug("📄 标题: %s...", content_info.get('title', 'N/A')[:100])
             if 'abstract' in content_info:
-                print(f"   📝 摘要: {len(content_info['abstract'])} 字符")
+                logger.debug("📝 摘要: %s 字符", len(content_info['abstract']))
             if 'body_text' in content_info:
-                print(f"   📖 正文: {len(content_info['body_text'])} 字符")
+                logger.debug("📖 正文: %s 字符", len(content_info['body_text']))
             if 'keywords' in content_info:
-                print(f"   🔑 关键词: {len(content_info['keywords'])} 字符")
+                logger.debug("🔑 关键词: %s 字符", len(content_info['keywords']))
             if 'authors' in content_info:
-                print(f"   👥 作者信息: {len(content_info['authors'])} 字符")
+                logger.debug("👥 作者信息: %s 字符", len(content_info['authors']))
             if 'references' in content_info:
-                print(f"   📚 参考文献: {len(content_info['references'])} 字符")
+                logger.debug("📚 参考文献: %s 字符", len(content_info['references']))
             
             # 统计提取的内容部分数
             content_parts = len([k for k, v in content_info.items() if v])
-            print(f"   📊 总计提取了 {content_parts} 个内容部分")
+            logger.debug("📊 总计提取了 %s 个内容部分", content_parts)
             
         else:
-            print(f"❌ PMID {pmid} 全文内容提取失败: {full_text.get('message', '未知错误')}")
+            logger.debug("❌ PMID %s 全文内容提取失败: %s", pmid, full_text.get('message', '未知错误'))
             result['message'] = full_text.get('message', '提取失败')
             
             # 添加错误调试信息
             if 'error' in full_text:
                 result['debug_info']['extraction_error'] = full_text['error']
-                print(f"   🔍 错误详情: {full_text['error']}")
+                logger.debug("🔍 错误详情: %s", full_text['error'])
             
             if 'debug_info' in full_text and 'no_content_reason' in full_text['debug_info']:
                 result['debug_info']['no_content_reason'] = full_text['debug_info']['no_content_reason']
-                print(f"   🔍 失败原因: {full_text['debug_info']['no_content_reason']}")
+                logger.debug("🔍 失败原因: %s", full_text['debug_info']['no_content_reason'])
     
     except Exception as e:
-        print(f"❌ 全文提取过程出错: {str(e)}")
+        logger.warning("❌ 全文提取过程出错: %s", e)
         result['message'] = f"全文提取过程出错: {str(e)}"
         result['debug_info']['extraction_error'] = str(e)
     
-    print(f"\n📊 PMID {pmid} 分析完成")
-    print(f"   - 免费全文: {'是' if result['is_free'] else '否'}")
-    print(f"   - 提取成功: {'是' if result['extraction_success'] else '否'}")
-    print("=" * 60)
+    logger.debug("📊 PMID %s 分析完成", pmid)
+    logger.debug("- 免费全文: %s", '是' if result['is_free'] else '否')
+    logger.debug("- 提取成功: %s", '是' if result['extraction_success'] else '否')
     
     return result
 
@@ -1606,10 +1761,23 @@ def test_api_key_pool():
         test_pool.key_states[key_id]['is_disabled'] = True
         test_pool.key_states[key_id]['disabled_until'] = time.time() + 60
     
-    no_key = test_pool.get_available_key()
+    no_key = test_pool.get_available_key(timeout=0)
     print(f"所有密钥禁用时获取结果: {no_key}")
     assert no_key is None, "应该返回None表示没有可用密钥"
     
+    # 测试8: 每分钟请求数限额
+    print("\n--- 测试8: RPM额度耗尽与限流冷却 ---")
+    rpm_pool = APIKeyPoolManager(test_keys[:1], {**test_config, "requests_per_minute": 2})
+    assert rpm_pool.get_available_key(timeout=0) == test_keys[0]
+    assert rpm_pool.get_available_key(timeout=0) == test_keys[0]
+    assert rpm_pool.get_available_key(timeout=0) is None, "RPM额度耗尽后不应立即返回密钥"
+    wait_start = time.time()
+    assert rpm_pool.get_available_key(timeout=35) == test_keys[0], "应该等待额度恢复后返回密钥"
+    print(f"额度耗尽后等待 {time.time() - wait_start:.1f} 秒获得密钥")
+    
+    rpm_pool.report_rate_limited(test_keys[0], retry_after=1)
+    assert rpm_pool.get_key_statistics()['key_1']['cooling_down'], "429后密钥应进入冷却"
+    
     print("\n" + "=" * 70)
     print("API密钥池测试完成")
     print("=" * 70)
@@ -1717,7 +1885,7 @@ def test_country_processing():
     
     print("\n测试各种国家识别场景...")
     
-    expected_results = ["United States", "China", "Japan", "需人工确认", "需人工确认"]
+    expected_results = ["美国", "中国", "日本", "需人工确认", "需人工确认"]
     
     for i, (article, expected) in enumerate(zip(mock_articles, expected_results)):
         result = extract_country_from_affiliation(article)
@@ -1726,11 +1894,11 @@ def test_country_processing():
         print(f"  状态: {'✓ 通过' if result == expected else '✗ 不匹配'}")
     
     print("\n测试缓存统计信息...")
-    print(f"当前缓存大小: {len(COUNTRY_CACHE)}")
+    print(f"当前缓存统计: {country_cache.get_statistics()}")
     print("✓ 国家处理功能测试完成!")
     
     # 清理缓存
-    COUNTRY_CACHE.clear()
+    country_cache.clear()
     print("缓存已清理")
 
 
@@ -1759,6 +1927,9 @@ if __name__ == "__main__":
         
         print(f"\n开始搜索: {search_term[:100]}...")
         
+        # 命令行运行的是批量任务，AI和HTTP请求让位于Web界面的交互式搜索
+        set_work_priority(BATCH, "pubmed-cli")
+        
         # 1. 搜索
         ids = search_pubmed(search_term, MAX_RESULTS)
         
@@ -1768,11 +1939,18 @@ if __name__ == "__main__":
             # 2. 获取详情
             articles = fetch_details(ids)
             
-            # 3. 解析数据
+            # 3. 批量识别国家，再逐篇解析数据
+            countries = resolve_countries_for_articles(articles)
             results = []
             for i, article in enumerate(articles):
                 print(f"正在处理文献 {i+1}/{len(articles)}...")
-                results.append(parse_record(article))
+                pmid = str(article['MedlineCitation'].get('PMID', ''))
+                results.append(parse_record(article, resolved_country=countries.get(pmid)))
+            
+            # 主任务结束后只针对缺失字段补提取
+            refilled = refill_incomplete_rows(results, articles)
+            if refilled:
+                print(f"🔁 已补全 {refilled} 篇文献的缺失字段")
             
             # 4. 生成表格
             df = pd.DataFrame(results)
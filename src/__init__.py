@@ -7,9 +7,22 @@ PubMed文献分析工具包 - 重构后的模块化版本
 # 导入主要模块
 from src.config import ConfigManager
 from src.api_key_manager import APIKeyPoolManager, api_key_pool
+from src.route_selector import RouteSelector, route_selector
+from src.key_state_store import KeyStateStore
+from src.circuit_breaker import CircuitBreaker, circuit_breakers
+from src.hedging import RequestHedger, request_hedger
 from src.pubmed_scraper import PubMedScraper, search_pubmed, fetch_details
 from src.data_parser import DataParser, extract_info_with_regex, parse_record
-from src.ai_extractor import AIExtractor, extract_info_with_ai
+from src.ai_extractor import AIExtractor, extract_info_with_ai, extract_info_cascade, reextract_missing_fields
+from src.country_resolver import CountryResolver, resolve_country
+from src.country_cache import CountryCache, country_cache
+from src.prefetcher import FullTextCache, Prefetcher, fulltext_cache
+from src.task_graph import TaskGraph
+from src.priority_scheduler import PriorityScheduler, llm_scheduler, http_scheduler, work_priority, INTERACTIVE, BATCH
+from src.cancellation import CancellationToken, OperationCancelled, check_cancelled
+from src.job_manager import SearchJob, JobRegistry, JobRunner, job_registry, job_runner
+from src.result_store import ResultStore
+from src.log_pipeline import ContextQueueHandler, ContextQueueListener, install_queue_logging, add_log_handler
 from src.fulltext_extractor import (
     FullTextExtractor, 
     check_full_text_availability, 
@@ -32,6 +45,13 @@ __all__ = [
     # API密钥管理
     'APIKeyPoolManager',
     'api_key_pool',
+    'RouteSelector',
+    'route_selector',
+    'KeyStateStore',
+    'CircuitBreaker',
+    'circuit_breakers',
+    'RequestHedger',
+    'request_hedger',
     
     # PubMed搜索
     'PubMedScraper',
@@ -46,6 +66,49 @@ __all__ = [
     # AI信息提取
     'AIExtractor',
     'extract_info_with_ai',
+    'extract_info_cascade',
+    'reextract_missing_fields',
+    
+    # 国家识别
+    'CountryResolver',
+    'resolve_country',
+    'CountryCache',
+    'country_cache',
+    
+    # 全文预取
+    'FullTextCache',
+    'Prefetcher',
+    'fulltext_cache',
+    
+    # 任务依赖图
+    'TaskGraph',
+    
+    # 优先级调度
+    'PriorityScheduler',
+    'llm_scheduler',
+    'http_scheduler',
+    'work_priority',
+    'INTERACTIVE',
+    'BATCH',
+    
+    # 协作式取消
+    'CancellationToken',
+    'OperationCancelled',
+    'check_cancelled',
+    
+    # 搜索任务管理
+    'SearchJob',
+    'JobRegistry',
+    'job_registry',
+    'JobRunner',
+    'job_runner',
+    'ResultStore',
+    
+    # 异步日志
+    'ContextQueueHandler',
+    'ContextQueueListener',
+    'install_queue_logging',
+    'add_log_handler',
     
     # 全文提取
     'FullTextExtractor',
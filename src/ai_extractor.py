@@ -3,15 +3,126 @@ AI信息提取模块 - 负责使用AI API从摘要中提取结构化信息
 """
 import json
 import logging
+import threading
 import time
 import requests
 import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 from src.config import ConfigManager
+from src.api_key_manager import api_key_pool as shared_api_key_pool, estimate_tokens
+from src.circuit_breaker import circuit_breakers
+from src.hedging import request_hedger
+from src.priority_scheduler import llm_scheduler
+from src.cancellation import CancellationToken, get_cancellation_token, check_cancelled, cancellable_sleep, call_cancellable
+from src.data_parser import data_parser
 
 logger = logging.getLogger(__name__)
 
 
+# AI提取的字段（顺序即JSON输出顺序）及各字段的提取要求；国家的要求取决于是否提供了作者机构
+EXTRACTION_FIELDS = [
+    "翻译标题", "研究对象", "样本量", "推荐补充剂量/用法", "作用机理",
+    "摘要主要内容", "结论摘要", "国家", "数据收集年份"
+]
+
+FIELD_INSTRUCTIONS = {
+    "研究对象": "**研究对象**：人群特征（如：18-65岁健康成年人，黑人，白人，高加索人，老年人等等，可以是多种人口学描述）。",
+    "样本量": "**样本量**：参与者数量（如：120名参与者）。",
+    "推荐补充剂量/用法": """**推荐补充剂量/用法**：(重中之重的内容！！如：每日30ml MCT油；摘要仅报告含中链甘油三酯的餐相比含长链甘油三酯的餐产热更高，但未给出剂量或用法;
+等能量极低热量饮食（每份578.5 kcal）的配方食物（Adinax）中使用中链甘油三酯，配方中MCT含量为每100克Adinax含8.0克，干预持续4周;
+研究中测试早餐为3.3兆焦，含52克脂质（占能量的58%），中链脂肪酸来源为椰子油；为单次餐饮干预，未提供长期补充方案;
+能量和长链脂肪酸限制，富含中链脂肪酸和碳水化合物的饮食，夜间添加生玉米淀粉;等等；多思考一下，有时不是非常明显)。""",
+    "作用机理": "**作用机理**：(多考虑生化方面的描述，如：通过生酮作用促进脂肪燃烧)。",
+    "摘要主要内容": "**摘要主要内容**：1-2句话概括重点。",
+    "结论摘要": "**结论摘要**：核心结论（**必须中文**）。",
+    "数据收集年份": "**数据收集年份**：具体年份范围，非发表年份。"
+}
+
+FIELD_PLACEHOLDERS = {"翻译标题": "这里填入翻译后的中文标题"}
+
+# 分级提取中必须由AI给出有效内容的字段（规则无法生成），其余字段允许为"未明确说明"
+REQUIRED_FIELDS = ("翻译标题", "摘要主要内容", "结论摘要")
+
+PLACEHOLDER_VALUES = ("未明确说明", "翻译失败", "提取失败", "需人工确认", "需AI提取", "")
+
+# 按字段挑选全文段落时使用的关键词（正则，不区分大小写）
+FIELD_KEYWORDS = {
+    "研究对象": [r"participants?", r"subjects?", r"aged?", r"years? old", r"\bBMI\b", r"healthy", r"overweight",
+              r"obes\w*", r"inclusion", r"eligib\w*", r"women", r"men\b", r"volunteers?"],
+    "样本量": [r"\bn\s*=\s*\d+", r"\d+\s+(?:participants|subjects|patients|volunteers)", r"enrolled", r"recruited",
+            r"randomi[sz]ed", r"total of \d+", r"completed the study", r"dropp?ed out"],
+    "推荐补充剂量/用法": [r"\d+(?:\.\d+)?\s*(?:mg|g|ml|mL|kcal|kJ|MJ)\b", r"dose", r"dosage", r"daily", r"per day",
+                   r"supplement\w*", r"administered", r"intervention", r"oil", r"diet", r"weeks?"],
+    "作用机理": [r"mechanism", r"ketone", r"ketogen\w*", r"oxidation", r"thermogen\w*", r"energy expenditure",
+             r"satiety", r"metabolis\w*", r"lipolysis", r"hormone", r"insulin"],
+    "数据收集年份": [r"\b(?:19|20)\d{2}\b", r"between", r"conducted", r"recruited", r"period", r"data were collected"],
+    "摘要主要内容": [r"aim", r"objective", r"purpose", r"results?", r"significant\w*"],
+    "结论摘要": [r"conclu\w*", r"suggest\w*", r"in summary", r"findings"],
+    "翻译标题": []
+}
+
+
+def select_relevant_passages(text: str, fields: List[str], max_chars: int = 3000, passage_chars: int = 600) -> str:
+    """
+    从全文中挑选与指定字段最相关的段落
+
+    先按段落（过长时再按句子）切分为不超过 passage_chars 的片段，按字段关键词的命中数打分，
+    取得分最高的片段直到达到 max_chars，并按原文顺序拼接。
+
+    Args:
+        text: 全文正文
+        fields: 需要补全的字段
+        max_chars: 返回内容的最大字符数
+        passage_chars: 单个片段的最大字符数
+
+    Returns:
+        相关段落（以空行分隔），没有相关内容时返回空字符串
+    """
+    if not text:
+        return ""
+    patterns = [re.compile(keyword, re.IGNORECASE) for field in fields for keyword in FIELD_KEYWORDS.get(field, [])]
+    if not patterns:
+        return ""
+
+    passages = []
+    for paragraph in re.split(r"\n+", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        current = ""
+        for sentence in re.split(r"(?<=[.!?。；;])\s+", paragraph):
+            if current and len(current) + len(sentence) + 1 > passage_chars:
+                passages.append(current)
+                current = ""
+            current = f"{current} {sentence}".strip()
+        if current:
+            passages.append(current[:passage_chars * 2])
+
+    scored = []
+    for index, passage in enumerate(passages):
+        score = sum(len(pattern.findall(passage)) for pattern in patterns)
+        if score:
+            scored.append((score, index))
+
+    selected = []
+    total = 0
+    for score, index in sorted(scored, key=lambda item: (-item[0], item[1])):
+        if total + len(passages[index]) > max_chars:
+            continue
+        selected.append(index)
+        total += len(passages[index])
+    return "\n\n".join(passages[index] for index in sorted(selected))
+
+
+def _parse_retry_after(response) -> Optional[float]:
+    """解析429响应中的 Retry-After 头（秒）"""
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
 class AIExtractor:
     """AI信息提取器"""
     
@@ -27,11 +138,51 @@ class AIExtractor:
         ]
         self.request_delay = self.config.get('request_delay', 1.0)
         self.max_retries_per_config = 3
+        self.cascade_config = self.config.get('extraction_cascade_config', {}) or {}
+        self.cascade_stats = {"articles": 0, "rule_fields": 0, "model_calls": {}, "incomplete": 0}
+        self._cascade_lock = threading.Lock()
+        self.reextraction_config = self.config.get('reextraction_config', {}) or {}
     
-    def build_extraction_prompt(self, abstract_text: str, title: str = None) -> str:
-        """构建包含标题翻译的AI提取提示词"""
+    def build_extraction_prompt(self, abstract_text: str, title: str = None, affiliation: str = None,
+                                fields: Optional[List[str]] = None) -> str:
+        """
+        构建包含标题翻译的AI提取提示词（提供作者机构时同时识别国家）
+
+        Args:
+            abstract_text: 摘要（或摘要+全文）文本
+            title: 英文标题
+            affiliation: 第一作者机构
+            fields: 只提取这些字段（分级提取时用于补全缺失字段），None表示提取全部字段
+        """
         # 使用 json.dumps 确保标题中的引号等特殊字符被正确转义，避免破坏 Prompt 结构
         safe_title = title if title else "未提供标题"
+        fields = [field for field in (fields or EXTRACTION_FIELDS) if field in EXTRACTION_FIELDS]
+        
+        # 有第一作者机构信息时，国家直接根据机构判断，省去单独的国家识别请求
+        if affiliation:
+            affiliation_section = f"""
+**第一作者机构：**
+{affiliation}
+"""
+            country_rule = '**国家**：根据第一作者机构判断，只填标准中文国家名称（如：美国、中国，而非USA、China），不含城市；无法确定请填"未明确说明"。'
+        else:
+            affiliation_section = ""
+            country_rule = "**国家**：仅国家名称（如：美国、中国），不含城市。"
+
+        tasks = []
+        if "翻译标题" in fields:
+            tasks.append("""**翻译标题**：将英文标题翻译成专业的中文标题。
+   - 必须准确、学术、通顺。
+   - 如果未提供标题，请填"无标题"。""")
+        info_rules = [
+            f"   - {country_rule if field == '国家' else FIELD_INSTRUCTIONS[field]}"
+            for field in fields if field != "翻译标题"
+        ]
+        if info_rules:
+            tasks.append('**提取摘要信息**：从摘要中提取以下信息（如果未提及请标注"未明确说明"）：\n' + "\n".join(info_rules))
+        task_section = "\n\n".join(f"{index}. {task}" for index, task in enumerate(tasks, 1))
+
+        json_example = ",\n".join(f'  "{field}": "{FIELD_PLACEHOLDERS.get(field, "内容...")}"' for field in fields)
         
         return f"""
 请分析以下英文学术文献的标题和摘要，并提取相关信息。
@@ -41,44 +192,48 @@ class AIExtractor:
 
 **摘要原文：**
 {abstract_text}
-
+{affiliation_section}
 **任务要求：**
 
-1. **翻译标题**：将英文标题翻译成专业的中文标题。
-   - 必须准确、学术、通顺。
-   - 如果未提供标题，请填"无标题"。
-
-2. **提取摘要信息**：从摘要中提取以下信息（如果未提及请标注"未明确说明"）：
-   - **研究对象**：人群特征（如：18-65岁健康成年人，黑人，白人，高加索人，老年人等等，可以是多种人口学描述）。
-   - **样本量**：参与者数量（如：120名参与者）。
-   - **推荐补充剂量/用法**：(重中之重的内容！！如：每日30ml MCT油；摘要仅报告含中链甘油三酯的餐相比含长链甘油三酯的餐产热更高，但未给出剂量或用法;
-等能量极低热量饮食（每份578.5 kcal）的配方食物（Adinax）中使用中链甘油三酯，配方中MCT含量为每100克Adinax含8.0克，干预持续4周;
-研究中测试早餐为3.3兆焦，含52克脂质（占能量的58%），中链脂肪酸来源为椰子油；为单次餐饮干预，未提供长期补充方案;
-能量和长链脂肪酸限制，富含中链脂肪酸和碳水化合物的饮食，夜间添加生玉米淀粉;等等；多思考一下，有时不是非常明显)。
-   - **作用机理**：(多考虑生化方面的描述，如：通过生酮作用促进脂肪燃烧)。
-   - **摘要主要内容**：1-2句话概括重点。
-   - **结论摘要**：核心结论（**必须中文**）。
-   - **国家**：仅国家名称（如：美国、中国），不含城市。
-   - **数据收集年份**：具体年份范围，非发表年份。
+{task_section}
 
 **请严格按照以下JSON格式直接返回结果（不要包含Markdown代码块标记）：**
 
 {{
-  "翻译标题": "这里填入翻译后的中文标题",
-  "研究对象": "内容...",
-  "样本量": "内容...", 
-  "推荐补充剂量/用法": "内容...",
-  "作用机理": "内容...",
-  "摘要主要内容": "内容...",
-  "结论摘要": "内容...",
-  "国家": "内容...",
-  "数据收集年份": "内容..."
+{json_example}
 }}
 """
 # 注意：我在JSON示例中去掉了 "原文标题"，因为我们已经有这个数据了，不需要AI重复，节省Token并减少错误。
 
-    def extract_with_retry(self, api_key: str, api_base_url: str, model_name: str, prompt: str, max_retries: int = 3) -> Optional[Dict[str, str]]:
-        """带重试机制的API调用"""
+    def extract_with_retry(self, api_key: str, api_base_url: str, model_name: str, prompt: str, max_retries: int = 3,
+                           api_key_pool=None, estimated_tokens: int = 0, session: Optional[requests.Session] = None,
+                           cancel_token: Optional[CancellationToken] = None,
+                           fields: Optional[List[str]] = None) -> Optional[Dict[str, str]]:
+        """
+        带重试机制的API调用
+
+        传入密钥池时，请求节奏由密钥池的RPM/TPM额度控制：首次请求的额度已在获取密钥时预留，
+        重试前重新预留；成功时按响应中的实际token用量上报，429时让该密钥冷却并立即返回，
+        由调用方换用其他密钥。端点/模型的熔断器打开时立即返回，不再等待超时。
+        对冲请求会传入独立的会话和取消令牌，被取消时立即中断（抛出 OperationCancelled），
+        归还并发名额和未用到的密钥额度，且不计入密钥和端点的失败统计；
+        所属任务被取消时，进行中的请求和重试等待同样立即中断并抛出 OperationCancelled。
+        fields 不为None时只校验并返回这些字段（分级提取补全缺失字段时使用）。
+        """
+        breaker = circuit_breakers.get(api_base_url, model_name)
+        http = session or requests
+
+        token = get_cancellation_token()
+        # 请求在独立线程中执行，任务取消时关闭对冲请求的会话以尽快断开连接
+        close_session = session.close if session is not None else None
+
+        def cancelled() -> bool:
+            return (cancel_token is not None and cancel_token.is_cancelled) or token.is_cancelled
+
+        def release_unused(sent: bool):
+            # 被取消的请求用不到预留的额度：未发出时归还请求数和token，已发出时只归还token
+            if api_key_pool:
+                api_key_pool.release_reservation(api_key, requests=0 if sent else 1, tokens=estimated_tokens)
         # 移除search_status检查，避免在测试环境中出现问题
         
         headers = {
@@ -99,10 +254,20 @@ class AIExtractor:
         }
         
         for attempt in range(max_retries):
-            logger.debug(f"第 {attempt + 1} 次尝试调用 API: {model_name} at {api_base_url}")
+            if cancelled():
+                # 首次请求的额度由调用方在获取密钥时预留
+                if attempt == 0:
+                    release_unused(False)
+                check_cancelled()
+                return None
+            logger.debug("第 %s 次尝试调用 API: %s at %s", attempt + 1, model_name, api_base_url)
             
             try:
-                time.sleep(self.request_delay)
+                if not api_key_pool:
+                    cancellable_sleep(self.request_delay)
+                elif attempt > 0 and not api_key_pool.acquire_key(api_key, estimated_tokens):
+                    logger.warning("等待密钥额度超时，放弃当前密钥")
+                    return None
                 
                 # 确保API端点有效
                 if not api_base_url or not api_base_url.startswith('http'):
@@ -113,55 +278,98 @@ class AIExtractor:
                 if not api_key or api_key == 'default':
                     logger.error("API密钥无效")
                     continue
+
+                if not breaker.allow_request():
+                    logger.warning(f"端点已熔断，跳过: {model_name} at {api_base_url}")
+                    return None
                     
                 # 如果是某些不支持 response_format 的旧模型接口，可能需要移除该字段
+                # 并发名额优先分配给交互式任务；排队时间不计入该路径的延迟。
+                # 排队也放在 try/finally 中，排队时被取消同样归还熔断探测名额和密钥额度
+                ticket = None
+                request_started = None
                 response = None
                 try:
-                    logger.debug(f"发送API请求到 {api_base_url}，模型: {model_name}")
-                    response = requests.post(api_base_url, headers=headers, json=payload, timeout=20)
-                    logger.debug(f"API响应状态码: {response.status_code}")
-                    logger.debug(f"API响应内容: {response.text[:300]}...")
-                except requests.exceptions.ConnectionError:
-                    logger.error(f"无法连接到API端点: {api_base_url}")
-                    # 如果请求失败，尝试移除 response_format 再次请求 (兼容性处理)
-                    if "response_format" in payload:
-                        del payload["response_format"]
-                        try:
-                            logger.debug(f"移除response_format后再次尝试请求")
-                            response = requests.post(api_base_url, headers=headers, json=payload, timeout=20)
-                            logger.debug(f"移除response_format后响应状态码: {response.status_code}")
-                        except requests.exceptions.ConnectionError:
-                            logger.error(f"移除response_format后仍无法连接到API端点: {api_base_url}")
+                    ticket = llm_scheduler.acquire()
+                    if api_key_pool:
+                        api_key_pool.start_request(api_key, api_base_url, model_name)
+                    request_started = time.monotonic()
+                    try:
+                        logger.debug("发送API请求到 %s，模型: %s", api_base_url, model_name)
+                        response = call_cancellable(http.post, api_base_url, headers=headers, json=payload, timeout=20,
+                                                    on_cancel=close_session, cancel_token=cancel_token)
+                        logger.debug("API响应状态码: %s", response.status_code)
+                        logger.debug("API响应内容: %s...", response.text[:300])
+                    except requests.exceptions.ConnectionError:
+                        if cancelled():
+                            return None
+                        logger.error(f"无法连接到API端点: {api_base_url}")
+                        # 如果请求失败，尝试移除 response_format 再次请求 (兼容性处理)
+                        if "response_format" in payload:
+                            del payload["response_format"]
+                            try:
+                                logger.debug("移除response_format后再次尝试请求")
+                                response = call_cancellable(http.post, api_base_url, headers=headers, json=payload,
+                                                            timeout=20, on_cancel=close_session,
+                                                            cancel_token=cancel_token)
+                                logger.debug("移除response_format后响应状态码: %s", response.status_code)
+                            except requests.exceptions.ConnectionError:
+                                logger.error(f"移除response_format后仍无法连接到API端点: {api_base_url}")
+                                continue
+                        else:
                             continue
-                    else:
+                    except requests.exceptions.Timeout:
+                        logger.error(f"API请求超时: {api_base_url}")
                         continue
-                except requests.exceptions.Timeout:
-                    logger.error(f"API请求超时: {api_base_url}")
-                    continue
-                except requests.exceptions.RequestException as e:
-                    logger.error(f"API请求异常: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    continue
+                    except requests.exceptions.RequestException as e:
+                        logger.error(f"API请求异常: {e}")
+                        import traceback
+                        traceback.print_exc()
+                        continue
+                finally:
+                    if ticket is not None:
+                        llm_scheduler.release(ticket)
+                    if request_started is None:
+                        # 请求未发出，不影响熔断和路由统计
+                        breaker.release()
+                        release_unused(False)
+                    elif cancelled():
+                        # 被取消（对冲落败或任务停止），不影响熔断和路由统计
+                        breaker.release()
+                        if api_key_pool:
+                            api_key_pool.abandon_request(api_key, api_base_url, model_name)
+                            release_unused(True)
+                    else:
+                        breaker.record_result(response.status_code if response is not None else None)
+                        # 记录本次请求的延迟和结果，供路由选择器估算预期完成时间
+                        if api_key_pool:
+                            api_key_pool.finish_request(api_key, api_base_url, model_name, time.monotonic() - request_started,
+                                                        response is not None and response.status_code == 200)
 
                 if response is None:
                     continue
                     
+                if api_key_pool:
+                    api_key_pool.observe_rate_limit_headers(api_key, response.headers)
+
                 if response.status_code == 200:
                     try:
                         result = response.json()
+                        if api_key_pool:
+                            usage = result.get('usage') or {}
+                            api_key_pool.report_success(api_key, usage.get('total_tokens'), estimated_tokens)
                         ai_content = result['choices'][0]['message']['content']
-                        logger.debug(f"AI响应内容: {ai_content[:300]}...")
+                        logger.debug("AI响应内容: %s...", ai_content[:300])
                         
                         # 更加鲁棒的 JSON 提取逻辑
                         try:
                             # 尝试直接解析
-                            return self._parse_json(ai_content)
+                            return self._parse_json(ai_content, fields)
                         except json.JSONDecodeError:
                             # 如果失败，尝试提取代码块 ```json ... ``` 或 { ... }
                             json_match = re.search(r'\{.*\}', ai_content, re.DOTALL)
                             if json_match:
-                                return self._parse_json(json_match.group(0))
+                                return self._parse_json(json_match.group(0), fields)
                             else:
                                 logger.warning(f"无法从响应中提取JSON: {ai_content[:100]}...")
                                 continue
@@ -172,13 +380,19 @@ class AIExtractor:
                         continue
                         
                 elif response.status_code == 429:
+                    if api_key_pool:
+                        api_key_pool.report_rate_limited(api_key, _parse_retry_after(response))
+                        logger.warning("请求频率过高，切换密钥")
+                        return None
                     wait_time = self.request_delay * (2 ** attempt)
                     logger.warning(f"请求频率过高，等待{wait_time}秒后重试")
-                    time.sleep(wait_time)
+                    cancellable_sleep(wait_time)
                     continue
                 elif response.status_code in [401, 403]:
                     logger.error(f"API密钥无效或权限不足，状态码: {response.status_code}")
                     logger.error(f"错误响应: {response.text[:200]}...")
+                    if api_key_pool:
+                        api_key_pool.report_failure(api_key, "auth")
                     return None
                 elif response.status_code >= 500:
                     logger.error(f"API服务器错误，状态码: {response.status_code}")
@@ -191,21 +405,66 @@ class AIExtractor:
                     continue
                     
             except Exception as e:
+                if cancelled():
+                    return None
                 logger.error(f"提取过程错误: {e}")
                 import traceback
                 traceback.print_exc()
-                time.sleep(self.request_delay)
+                cancellable_sleep(self.request_delay)
                 continue
         
+        if api_key_pool and not cancelled():
+            api_key_pool.report_failure(api_key, "failed")
         return None
+
+    def _extract_with_hedging(self, api_key: str, api_base_url: str, model_name: str, prompt: str,
+                              api_key_pool, estimated_tokens: int,
+                              fields: Optional[List[str]] = None) -> Optional[Dict[str, str]]:
+        """
+        执行一次提取；启用对冲且该模型已有足够延迟样本时，超过p90延迟未返回则用另一个密钥发出对冲请求
+
+        对冲时主请求和对冲请求都只尝试一次，落败的一方立即取消；重试由调用方换密钥进行。
+
+        Args:
+            api_key: 主请求使用的API密钥
+            api_base_url: API端点
+            model_name: 模型名称
+            prompt: 提示词
+            api_key_pool: 密钥池
+            estimated_tokens: 预留的token数
+            fields: 只提取这些字段，None表示全部字段
+
+        Returns:
+            提取结果，失败时返回None
+        """
+        delay = request_hedger.hedge_delay(api_base_url, model_name) if api_key_pool else None
+        if delay is None:
+            return self.extract_with_retry(api_key, api_base_url, model_name, prompt,
+                                           api_key_pool=api_key_pool, estimated_tokens=estimated_tokens,
+                                           fields=fields)
+
+        def make_request(key: str):
+            def request(cancel_token, session):
+                return self.extract_with_retry(key, api_base_url, model_name, prompt, max_retries=1,
+                                               api_key_pool=api_key_pool, estimated_tokens=estimated_tokens,
+                                               session=session, cancel_token=cancel_token, fields=fields)
+            return request
+
+        def start_hedge():
+            # 只使用立即可用的其他密钥，不为对冲请求等待额度
+            hedge_key = api_key_pool.get_available_key(estimated_tokens, timeout=0, endpoint=api_base_url,
+                                                       model=model_name, exclude_keys=[api_key])
+            return make_request(hedge_key) if hedge_key else None
+
+        return request_hedger.run(make_request(api_key), delay, start_hedge)
     
-    def _parse_json(self, json_str: str) -> Dict[str, str]:
+    def _parse_json(self, json_str: str, fields: Optional[List[str]] = None) -> Dict[str, str]:
         """内部JSON解析辅助函数"""
         data = json.loads(json_str)
-        return self.validate_extracted_data(data)
+        return self.validate_extracted_data(data, fields)
 
-    def validate_extracted_data(self, data: Dict[str, str]) -> Dict[str, str]:
-        """验证和清理提取的数据"""
+    def validate_extracted_data(self, data: Dict[str, str], fields: Optional[List[str]] = None) -> Dict[str, str]:
+        """验证和清理提取的数据（指定 fields 时只处理这些字段）"""
         validated = {}
         
         # 定义字段映射，处理AI可能返回的异形Key
@@ -222,6 +481,8 @@ class AIExtractor:
         }
 
         for target_key, possible_keys in key_mapping.items():
+            if fields is not None and target_key not in fields:
+                continue
             value = "未明确说明"
             # 尝试所有可能的Key
             for k in possible_keys:
@@ -233,7 +494,7 @@ class AIExtractor:
             validated[target_key] = value
 
         # 特殊处理：如果翻译标题失败，暂时标记，稍后在主函数用原文填充或重试
-        if validated["翻译标题"] == "未明确说明":
+        if validated.get("翻译标题") == "未明确说明":
              validated["翻译标题"] = "翻译失败"
 
         return validated
@@ -253,81 +514,300 @@ class AIExtractor:
             "数据收集年份": "需人工确认"
         }
     
-    def extract_info_with_ai(self, abstract_text: str, title: str = None, api_key_pool=None, target_model: str = None) -> Dict[str, str]:
+    def _resolve_model_configs(self, target_model: str = None) -> List[tuple]:
+        """
+        确定要使用的 (模型, 端点) 列表：指定 target_model 时只包含该模型，否则为默认的回退列表
+
+        Args:
+            target_model: 指定的模型名称
+
+        Returns:
+            (模型名称, 端点) 列表
+        """
+        if not target_model:
+            return list(self.model_configs)
+
+        # 根据模型名称推断 Endpoint (简单映射逻辑)
+        endpoint = self.api_endpoints[0] # 默认为 GPTGod
+        
+        # 如果是 DeepSeek 或 GLM，可能需要切换到其他 Endpoint (根据你原代码的 api_endpoints 列表)
+        # 假设 api_endpoints[0] 是 GPTGod, [2] 是 DeepSeek 官方或兼容接口
+        if "deepseek" in target_model.lower() or "glm" in target_model.lower():
+             if len(self.api_endpoints) > 2:
+                 endpoint = self.api_endpoints[2]
+        
+        # 构造单次尝试的配置
+        return [(target_model, endpoint)]
+
+    def _extract_with_model(self, model_name: str, api_base_url: str, prompt: str, api_key_pool,
+                            estimated_tokens: int, fields: Optional[List[str]] = None) -> Optional[Dict[str, str]]:
+        """
+        使用指定模型提取信息（含密钥获取、熔断检查和重试）
+
+        Args:
+            model_name: 模型名称
+            api_base_url: API端点
+            prompt: 提示词
+            api_key_pool: 密钥池，None时使用配置中的第一个密钥
+            estimated_tokens: 预留的token数
+            fields: 只提取这些字段，None表示全部字段
+
+        Returns:
+            提取结果，该模型的所有尝试都失败时返回None
+        """
+        logger.debug("尝试使用模型: %s, URL: %s", model_name, api_base_url)
+        
+        # 确定模型对应的API类型 (用于选择 Key)
+        api_type = 'deepseek' if 'deepseek' in model_name.lower() else 'openai'
+        
+        breaker = circuit_breakers.get(api_base_url, model_name)
+        for attempt in range(self.max_retries_per_config):
+            check_cancelled()
+            # 端点熔断时直接换下一个模型，不再占用密钥额度
+            if breaker.is_open():
+                logger.warning(f"模型 {model_name} 的端点已熔断，跳过")
+                return None
+
+            # 获取密钥逻辑...
+            current_api_key = None
+            try:
+                if api_key_pool:
+                    current_api_key = api_key_pool.get_available_key(estimated_tokens, endpoint=api_base_url, model=model_name)
+                else:
+                    api_keys = self.config.get(f'api_keys_{api_type}', self.config.get('api_keys_pool', ['default']))
+                    current_api_key = api_keys[0] if api_keys else 'default'
+            except Exception as e:
+                logger.error(f"获取密钥出错: {e}")
+                continue
+
+            if not current_api_key: continue
+
+            # 执行提取（成功、失败和限流由 extract_with_retry 上报给密钥池）
+            extracted_data = self._extract_with_hedging(current_api_key, api_base_url, model_name, prompt,
+                                                        api_key_pool, estimated_tokens, fields)
+            
+            if extracted_data:
+                logger.debug("成功提取信息: %s", model_name)
+                return extracted_data
+            logger.debug("使用模型 %s 提取失败", model_name)
+        return None
+    
+    def extract_info_with_ai(self, abstract_text: str, title: str = None, api_key_pool=None, target_model: str = None, affiliation: str = None) -> Dict[str, str]:
         """主入口函数"""
         if not abstract_text or abstract_text.strip() == "":
             return self.get_fallback_data_with_title(title)
         
-        # 1. 构建 Prompt
-        prompt = self.build_extraction_prompt(abstract_text, title)
+        # 1. 构建 Prompt（附带作者机构，国家随同一次请求返回）
+        prompt = self.build_extraction_prompt(abstract_text, title, affiliation)
+        # 预留的token额度：提示词 + 最大输出
+        estimated_tokens = estimate_tokens(prompt) + 1500
         
-        print(f"  🤖 AI模型开始分析 (目标模型: {target_model or '默认'})...")
-        logger.debug(f"使用的提示词: {prompt[:300]}...")
+        logger.debug("🤖 AI模型开始分析 (目标模型: %s)...", target_model or '默认')
+        logger.debug("使用的提示词: %s...", prompt[:300])
         
-        # 2. 确定要使用的模型配置列表
-        # 如果指定了 target_model，我们构造一个只包含该模型的列表
-        if target_model:
-            # 根据模型名称推断 Endpoint (简单映射逻辑)
-            endpoint = self.api_endpoints[0] # 默认为 GPTGod
-            
-            # 如果是 DeepSeek 或 GLM，可能需要切换到其他 Endpoint (根据你原代码的 api_endpoints 列表)
-            # 假设 api_endpoints[0] 是 GPTGod, [2] 是 DeepSeek 官方或兼容接口
-            if "deepseek" in target_model.lower() or "glm" in target_model.lower():
-                 if len(self.api_endpoints) > 2:
-                     endpoint = self.api_endpoints[2]
-            
-            # 构造单次尝试的配置
-            current_model_configs = [(target_model, endpoint)]
-        else:
-            # 如果没指定，使用默认的回退列表
-            current_model_configs = self.model_configs
+        # 2. 确定要使用的模型配置列表；未指定模型时按各路径的预期完成时间排序
+        current_model_configs = self._resolve_model_configs(target_model)
+        if not target_model and api_key_pool:
+            current_model_configs = api_key_pool.rank_models(current_model_configs)
 
         # 3. 遍历模型尝试提取
         for model_name, api_base_url in current_model_configs:
-            logger.debug(f"尝试使用模型: {model_name}, URL: {api_base_url}")
-            
-            # 确定模型对应的API类型 (用于选择 Key)
-            api_type = 'deepseek' if 'deepseek' in model_name.lower() else 'openai'
-            
-            for attempt in range(self.max_retries_per_config):
-                # ... 这里的重试逻辑和 Key 获取逻辑保持原样 ...
-                # (为节省篇幅省略，只需将原有的循环体内容放在这里即可)
-                
-                # 获取密钥逻辑...
-                current_api_key = None
-                try:
-                    if api_key_pool:
-                        current_api_key = api_key_pool.get_available_key()
-                    else:
-                        api_keys = self.config.get(f'api_keys_{api_type}', self.config.get('api_keys_pool', ['default']))
-                        current_api_key = api_keys[0] if api_keys else 'default'
-                except Exception as e:
-                    logger.error(f"获取密钥出错: {e}")
-                    continue
-
-                if not current_api_key: continue
-
-                # 执行提取
-                extracted_data = self.extract_with_retry(current_api_key, api_base_url, model_name, prompt)
-                
-                if extracted_data:
-                    extracted_data["原文标题"] = title if title else "无标题"
-                    
-                    if api_key_pool:
-                        api_key_pool.report_success(current_api_key)
-                    logger.info(f"成功提取信息: {model_name}")
-                    return extracted_data
-                else:
-                    logger.debug(f"使用模型 {model_name} 提取失败")
-                    if api_key_pool:
-                        api_key_pool.report_failure(current_api_key, "failed")
+            extracted_data = self._extract_with_model(model_name, api_base_url, prompt, api_key_pool, estimated_tokens)
+            if extracted_data:
+                extracted_data["原文标题"] = title if title else "无标题"
+                return extracted_data
         
         logger.warning("所有AI提取尝试均失败")
         return self.get_fallback_data_with_title(title)
 
+    @staticmethod
+    def _is_missing(value: Optional[str]) -> bool:
+        """字段值是否为缺失/占位内容"""
+        return value is None or value.strip() in PLACEHOLDER_VALUES
+
+    def _cascade_tiers(self, target_model: str = None) -> List[tuple]:
+        """
+        确定分级提取的 (模型, 端点) 列表（按成本从低到高）
+
+        指定 target_model 时把它作为最高一级：默认列表中排在它之前的更便宜的模型先执行，
+        不在默认列表中的模型之前只加最小的一级。
+
+        Args:
+            target_model: 用户选择的模型名称
+
+        Returns:
+            (模型名称, 端点) 列表
+        """
+        if not target_model:
+            return list(self.model_configs)
+        names = [model_name for model_name, _ in self.model_configs]
+        cheaper = self.model_configs[:names.index(target_model)] if target_model in names else self.model_configs[:1]
+        return list(cheaper) + self._resolve_model_configs(target_model)
+
+    def extract_info_cascade(self, abstract_text: str, title: str = None, api_key_pool=None,
+                             target_model: str = None, affiliation: str = None,
+                             rule_results: Optional[Dict[str, tuple]] = None) -> Dict[str, str]:
+        """
+        分级提取：先用规则提取器，再用小模型只补全缺失字段，仍不完整时才升级到更大的模型
+
+        规则提取结果置信度达到阈值的字段直接采用，不再发给模型；每一级模型只请求
+        上一级之后仍缺失的字段。翻译标题、摘要主要内容、结论摘要无法由规则得到，
+        必须有模型给出有效内容；其余字段允许为"未明确说明"（文献本身未提及）。
+
+        Args:
+            abstract_text: 摘要（或摘要+全文）文本
+            title: 英文标题
+            api_key_pool: 密钥池
+            target_model: 指定模型时作为最高一级，更便宜的模型先执行
+            affiliation: 第一作者机构（提供时由模型判断国家）
+            rule_results: 已并行算好的规则提取结果（DataParser.extract_with_confidence），None时在此计算
+
+        Returns:
+            与 extract_info_with_ai 相同格式的提取结果
+        """
+        if not abstract_text or abstract_text.strip() == "":
+            return self.get_fallback_data_with_title(title)
+
+        threshold = self.cascade_config.get("rule_confidence_threshold", 0.8)
+        result: Dict[str, str] = {}
+
+        # 1. 规则提取：只采用置信度足够高的字段
+        if rule_results is None:
+            rule_results = data_parser.extract_with_confidence(abstract_text, title or "")
+        for field, (value, confidence) in rule_results.items():
+            if field in EXTRACTION_FIELDS and confidence >= threshold and not self._is_missing(value):
+                result[field] = value
+        rule_fields = list(result)
+
+        # 没有作者机构时国家由单独的国家识别流程处理，不交给模型
+        wanted = [field for field in EXTRACTION_FIELDS if affiliation or field != "国家"]
+        pending = [field for field in wanted if field not in result]
+
+        # 2. 按成本从低到高逐级调用模型，每级只请求仍缺失的字段
+        answered = set()
+        tiers_used = []
+        for model_name, api_base_url in self._cascade_tiers(target_model):
+            if not pending:
+                break
+            prompt = self.build_extraction_prompt(abstract_text, title, affiliation, fields=pending)
+            estimated_tokens = estimate_tokens(prompt) + 1500
+            logger.debug("🤖 %s 补全 %s 个字段...", model_name, len(pending))
+            extracted = self._extract_with_model(model_name, api_base_url, prompt, api_key_pool, estimated_tokens, pending)
+            if not extracted:
+                continue
+            tiers_used.append(model_name)
+            for field, value in extracted.items():
+                if not self._is_missing(value) or field not in result:
+                    result[field] = value
+                answered.add(field)
+            # 已由模型回答过的非必需字段即使是"未明确说明"也不再升级
+            pending = [field for field in pending
+                       if self._is_missing(result.get(field)) and (field in REQUIRED_FIELDS or field not in answered)]
+
+        with self._cascade_lock:
+            self.cascade_stats["articles"] += 1
+            self.cascade_stats["rule_fields"] += len(rule_fields)
+            for model_name in tiers_used:
+                self.cascade_stats["model_calls"][model_name] = self.cascade_stats["model_calls"].get(model_name, 0) + 1
+            if pending:
+                self.cascade_stats["incomplete"] += 1
+
+        logger.debug("分级提取完成: 规则字段 %s, 使用模型 %s, 仍缺失 %s", rule_fields, tiers_used or '无', pending)
+
+        if not tiers_used and any(field in REQUIRED_FIELDS for field in pending):
+            logger.warning("所有AI提取尝试均失败")
+            fallback = self.get_fallback_data_with_title(title)
+            fallback.update(result)
+            return fallback
+
+        data = {field: result.get(field, "未明确说明") for field in EXTRACTION_FIELDS}
+        if self._is_missing(data["翻译标题"]):
+            data["翻译标题"] = "翻译失败"
+        data["原文标题"] = title if title else "无标题"
+        return data
+
+    def find_missing_fields(self, row: Dict[str, str], include_country: bool = False) -> List[str]:
+        """
+        找出结果行中仍为"未明确说明"/"需人工确认"等占位内容的AI字段
+
+        Args:
+            row: 已有的提取结果或表格行
+            include_country: 是否检查国家（国家通常由离线词典和国家识别流程处理）
+
+        Returns:
+            缺失的字段列表（按 EXTRACTION_FIELDS 的顺序）
+        """
+        return [field for field in EXTRACTION_FIELDS
+                if (include_country or field != "国家") and field in row and self._is_missing(str(row[field]))]
+
+    def reextract_missing_fields(self, row: Dict[str, str], abstract_text: str, title: str = None,
+                                 full_text: str = None, api_key_pool=None, target_model: str = None,
+                                 affiliation: str = None, fields: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        只针对缺失字段重新提取，并把结果合并回已有的行
+
+        提示词只包含缺失字段的要求；提供全文时附上与这些字段最相关的全文段落，
+        而不是整篇正文。已有的有效值不会被覆盖。
+
+        Args:
+            row: 已有的提取结果或表格行
+            abstract_text: 摘要文本
+            title: 英文标题
+            full_text: 全文正文（可选）
+            api_key_pool: 密钥池
+            target_model: 指定模型时只使用该模型
+            affiliation: 第一作者机构（提供时同时补全国家）
+            fields: 要补全的字段，None表示自动检测缺失字段
+
+        Returns:
+            合并后的新行（不修改传入的 row）；没有缺失字段或提取失败时内容与原行相同
+        """
+        merged = dict(row)
+        fields = fields if fields is not None else self.find_missing_fields(row, include_country=bool(affiliation))
+        if not fields or not abstract_text or abstract_text.strip() == "":
+            return merged
+
+        text = abstract_text
+        passages = select_relevant_passages(full_text, fields, self.reextraction_config.get("max_passage_chars", 3000))
+        if passages:
+            text = f"{abstract_text}\n\n【全文相关段落】\n{passages}"
+
+        prompt = self.build_extraction_prompt(text, title, affiliation, fields=fields)
+        estimated_tokens = estimate_tokens(prompt) + 1500
+        logger.debug("重新提取缺失字段: %s (输入 %s 字符)", fields, len(text))
+
+        for model_name, api_base_url in self._resolve_model_configs(target_model):
+            extracted = self._extract_with_model(model_name, api_base_url, prompt, api_key_pool, estimated_tokens, fields)
+            if not extracted:
+                continue
+            filled = [field for field, value in extracted.items() if not self._is_missing(value)]
+            for field in filled:
+                merged[field] = extracted[field]
+            logger.debug("补全字段 %s，仍缺失 %s", filled, [field for field in fields if field not in filled])
+            break
+        return merged
+
+    def get_cascade_statistics(self) -> Dict[str, Any]:
+        """获取分级提取统计（处理文献数、规则直接得到的字段数、各模型调用次数、仍不完整的文献数）"""
+        with self._cascade_lock:
+            return {**self.cascade_stats, "model_calls": dict(self.cascade_stats["model_calls"])}
+
 # 全局实例
 ai_extractor = AIExtractor()
 
 # 在文件底部的全局函数
-def extract_info_with_ai(abstract_text: str, title: str = None, target_model: str = None) -> Dict[str, str]:
-    return ai_extractor.extract_info_with_ai(abstract_text, title, target_model=target_model)
\ No newline at end of file
+def extract_info_with_ai(abstract_text: str, title: str = None, target_model: str = None, affiliation: str = None) -> Dict[str, str]:
+    return ai_extractor.extract_info_with_ai(abstract_text, title, api_key_pool=shared_api_key_pool,
+                                             target_model=target_model, affiliation=affiliation)
+
+
+def extract_info_cascade(abstract_text: str, title: str = None, target_model: str = None, affiliation: str = None,
+                         rule_results: Optional[Dict[str, tuple]] = None) -> Dict[str, str]:
+    return ai_extractor.extract_info_cascade(abstract_text, title, api_key_pool=shared_api_key_pool,
+                                             target_model=target_model, affiliation=affiliation, rule_results=rule_results)
+
+
+def reextract_missing_fields(row: Dict[str, str], abstract_text: str, title: str = None, full_text: str = None,
+                             target_model: str = None, affiliation: str = None) -> Dict[str, str]:
+    return ai_extractor.reextract_missing_fields(row, abstract_text, title, full_text, api_key_pool=shared_api_key_pool,
+                                                 target_model=target_model, affiliation=affiliation)
@@ -4,249 +4,743 @@ API密钥管理器
 """
 
 import time
+import sqlite3
 import logging
-from typing import Optional, Dict, Any
+import threading
+from typing import Optional, Dict, Any, List, Tuple
 
 # 导入配置管理器
 from src.config import config_manager
+from src.route_selector import RouteSelector, route_selector
+from src.key_state_store import KeyStateStore, hash_api_key
+from src.priority_scheduler import BATCH, get_work_priority
+from src.cancellation import cancellable_wait
 
 logger = logging.getLogger(__name__)
 
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的token数（用于请求前预留TPM额度）
+
+    英文约4个字符一个token，中文等非ASCII字符约一个字符一个token
+
+    Args:
+        text: 待估算的文本
+
+    Returns:
+        估算的token数
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for char in text if ord(char) > 127)
+    return non_ascii + (len(text) - non_ascii) // 4 + 1
+
+
+class TokenBucket:
+    """
+    令牌桶 - 按固定速率补充额度，用于限制每分钟请求数(RPM)和每分钟token数(TPM)
+
+    非线程安全，由APIKeyPoolManager在持有锁时调用
+    """
+
+    def __init__(self, per_minute: float):
+        """
+        初始化令牌桶
+
+        Args:
+            per_minute: 每分钟额度，<=0 表示不限制
+        """
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self, now: float):
+        """按流逝时间补充额度"""
+        if self.unlimited:
+            return
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def wait_time(self, amount: float, now: float, reserve_ratio: float = 0.0) -> float:
+        """
+        计算获得指定额度需要等待的秒数
+
+        Args:
+            amount: 需要的额度（超过容量时按容量计算，避免永远等不到）
+            now: 当前单调时间
+            reserve_ratio: 为高优先级请求保留、本次请求不能动用的容量比例
+
+        Returns:
+            需要等待的秒数，0表示可以立即获取
+        """
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        amount = min(amount + self.capacity * reserve_ratio, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float, now: float):
+        """扣除额度（允许透支，透支部分会延后后续请求）"""
+        if self.unlimited:
+            return
+        self._refill(now)
+        self.tokens -= amount
+
+    def refund(self, amount: float, now: float):
+        """归还额度（不超过容量）"""
+        if self.unlimited:
+            return
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self, now: float):
+        """清空额度（收到限流响应时使用）"""
+        if self.unlimited:
+            return
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+
+    def sync(self, remaining: float, limit: Optional[float], now: float):
+        """
+        根据服务端返回的剩余额度校准令牌桶
+
+        Args:
+            remaining: 服务端报告的剩余额度
+            limit: 服务端报告的每分钟上限（可选）
+            now: 当前单调时间
+        """
+        if limit and limit > 0:
+            self.capacity = float(limit)
+            self.rate = self.capacity / 60.0
+        if self.unlimited:
+            return
+        self._refill(now)
+        self.tokens = min(self.tokens, float(remaining))
+
+
 class APIKeyPoolManager:
     """
     API密钥池管理器 - 提供密钥的动态管理、自动轮换和状态监控功能
+
+    所有状态修改都在同一把锁（Condition）下进行，可被多个工作线程并发调用。
+    每个密钥有独立的RPM/TPM令牌桶，获取密钥时预留额度，请求完成后按实际用量校正；
+    所有密钥都没有额度时，get_available_key 会等待最早恢复的密钥而不是直接返回None。
+    配置了路由选择器时，按 (密钥, 端点, 模型) 的预期完成时间决定密钥的尝试顺序。
+    配置了共享存储时，健康状态和额度以存储中的数据为准，本地 key_states 只是最近一次读取的副本。
     """
-    
-    def __init__(self, api_keys: list, config: dict):
+
+    def __init__(self, api_keys: list, config: dict, route_selector: Optional[RouteSelector] = None,
+                 state_store: Optional[KeyStateStore] = None):
         """
         初始化API密钥池管理器
-        
+
         Args:
             api_keys: API密钥列表
             config: 配置字典
+            route_selector: 路由选择器，为None时按轮换顺序选择密钥
+            state_store: 跨进程共享的密钥状态存储，为None时状态仅保存在本进程内存中
         """
         self.api_keys = api_keys
         self.config = config
+        self.route_selector = route_selector
+        self.state_store = state_store
         self.current_key_index = 0
         self.key_states = {}
-        
+        self._key_ids = {}
+        self._condition = threading.Condition(threading.RLock())
+
         # 初始化每个密钥的状态
         for i, key in enumerate(api_keys):
             key_id = f"key_{i+1}"  # 使用key_1, key_2等作为密钥标识符
-            self.key_states[key_id] = {
-                "key": key,
-                "failure_count": 0,
-                "success_count": 0,
-                "is_disabled": False,
-                "disabled_until": None,
-                "last_used": None,
-                "total_requests": 0,
-                "total_successes": 0
-            }
-        
+            self.key_states[key_id] = self._new_key_state(key)
+            self._key_ids[key] = key_id
+
+        if self.state_store:
+            self.state_store.ensure_keys(
+                [hash_api_key(key) for key in api_keys],
+                self.config.get("requests_per_minute", 0),
+                self.config.get("tokens_per_minute", 0)
+            )
+            self._refresh_states()
+
         logger.info(f"API密钥池管理器已初始化，共 {len(api_keys)} 个密钥")
-    
-    def get_available_key(self) -> Optional[str]:
+
+    def _new_key_state(self, key: str) -> dict:
+        """创建密钥的初始状态"""
+        return {
+            "key": key,
+            "failure_count": 0,
+            "success_count": 0,
+            "is_disabled": False,
+            "disabled_until": None,
+            "cooldown_until": None,
+            "last_used": None,
+            "total_requests": 0,
+            "total_successes": 0,
+            "total_tokens": 0,
+            "rate_limited_count": 0,
+            "rpm_bucket": TokenBucket(self.config.get("requests_per_minute", 0)),
+            "tpm_bucket": TokenBucket(self.config.get("tokens_per_minute", 0))
+        }
+
+    def get_available_key(self, estimated_tokens: int = 0, timeout: Optional[float] = None,
+                          endpoint: Optional[str] = None, model: Optional[str] = None,
+                          exclude_keys: Optional[List[str]] = None) -> Optional[str]:
         """
-        获取下一个可用的API密钥
-        
+        获取下一个可用的API密钥，并为本次请求预留RPM/TPM额度
+
+        Args:
+            estimated_tokens: 本次请求预计消耗的token数
+            timeout: 最长等待秒数，None时使用配置的 max_wait_seconds，0表示不等待
+            endpoint: 请求的API端点（与model一起用于按预期完成时间选择密钥）
+            model: 请求的模型名称
+            exclude_keys: 不参与选择的密钥（如对冲请求需要避开主请求使用的密钥）
+
         Returns:
-            可用的API密钥，如果所有密钥都不可用则返回None
+            可用的API密钥，如果在等待时间内都没有可用密钥则返回None
         """
+        if not self.api_keys:
+            return None
+
+        excluded_ids = {self._get_key_id(key) for key in exclude_keys or []}
+
         if not self.config.get("enable_key_rotation", True):
-            return self.api_keys[0] if self.api_keys else None
-            
-        attempts = 0
-        max_attempts = len(self.api_keys)
-        
-        while attempts < max_attempts:
-            key_id = f"key_{self.current_key_index + 1}"
-            state = self.key_states[key_id]
-            
-            # 检查密钥是否被禁用
-            if self._is_key_disabled(state):
-                # 尝试下一个密钥
-                self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-                attempts += 1
-                continue
-                
-            # 密钥可用
-            return state["key"]
-        
-        # 所有密钥都不可用
-        logger.error("所有API密钥都不可用")
-        return None
-    
+            if self.api_keys[0] in (exclude_keys or []):
+                return None
+            return self.acquire_key(self.api_keys[0], estimated_tokens, timeout)
+
+        if timeout is None:
+            timeout = self.config.get("max_wait_seconds", 60)
+        deadline = time.monotonic() + timeout
+
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                earliest_wait = None
+
+                for key_id in self._candidate_order(endpoint, model):
+                    if key_id in excluded_ids:
+                        continue
+                    wait = self._try_reserve(key_id, estimated_tokens, now)
+                    if wait is None:
+                        continue
+                    if wait == 0:
+                        # 下次从该密钥的下一个开始轮换：预期完成时间相同的密钥轮流承担请求
+                        self.current_key_index = int(key_id.rsplit("_", 1)[1]) % len(self.api_keys)
+                        return self.key_states[key_id]["key"]
+                    earliest_wait = wait if earliest_wait is None else min(earliest_wait, wait)
+
+                remaining = deadline - now
+                if earliest_wait is None or remaining <= 0 or earliest_wait > remaining:
+                    # 所有密钥都不可用
+                    logger.error("所有API密钥都不可用")
+                    return None
+
+                logger.debug("密钥额度不足，等待 %.2f 秒", earliest_wait)
+                cancellable_wait(self._condition, earliest_wait)
+
+    def _candidate_order(self, endpoint: Optional[str], model: Optional[str]) -> List[str]:
+        """按轮换顺序列出密钥标识符，配置了路由选择器时再按预期完成时间排序"""
+        key_ids = [
+            f"key_{(self.current_key_index + offset) % len(self.api_keys) + 1}"
+            for offset in range(len(self.api_keys))
+        ]
+        if self.route_selector and endpoint and model:
+            key_ids = self.route_selector.rank_keys(key_ids, endpoint, model)
+        return key_ids
+
+    def rank_models(self, model_configs: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """
+        按预期完成时间对 (模型, 端点) 配置排序，只考虑未被禁用的密钥
+
+        Args:
+            model_configs: (模型名称, 端点) 列表
+
+        Returns:
+            排序后的模型配置列表，未配置路由选择器时原样返回
+        """
+        if not self.route_selector:
+            return list(model_configs)
+        self._refresh_states()
+        with self._condition:
+            key_ids = [key_id for key_id, state in self.key_states.items() if not self._is_key_disabled(state)]
+        return self.route_selector.rank_models(model_configs, key_ids)
+
+    def start_request(self, key: str, endpoint: str, model: str):
+        """
+        记录请求开始（用于路由选择器统计进行中的请求数）
+
+        Args:
+            key: 使用的API密钥
+            endpoint: API端点
+            model: 模型名称
+        """
+        key_id = self._get_key_id(key)
+        if key_id and self.route_selector:
+            self.route_selector.begin(key_id, endpoint, model)
+
+    def finish_request(self, key: str, endpoint: str, model: str, latency: float, success: bool):
+        """
+        记录请求结束，更新该路径的延迟和错误率
+
+        Args:
+            key: 使用的API密钥
+            endpoint: API端点
+            model: 模型名称
+            latency: 请求耗时（秒）
+            success: 请求是否成功
+        """
+        key_id = self._get_key_id(key)
+        if key_id and self.route_selector:
+            self.route_selector.record(key_id, endpoint, model, latency, success)
+
+    def abandon_request(self, key: str, endpoint: str, model: str):
+        """
+        记录请求被主动取消（不计入延迟和错误率统计）
+
+        Args:
+            key: 使用的API密钥
+            endpoint: API端点
+            model: 模型名称
+        """
+        key_id = self._get_key_id(key)
+        if key_id and self.route_selector:
+            self.route_selector.cancel(key_id, endpoint, model)
+
+    def acquire_key(self, key: str, estimated_tokens: int = 0, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        等待指定密钥有可用额度并预留（用于同一密钥上的重试）
+
+        Args:
+            key: API密钥
+            estimated_tokens: 本次请求预计消耗的token数
+            timeout: 最长等待秒数，None时使用配置的 max_wait_seconds
+
+        Returns:
+            该密钥，超时或密钥不可用时返回None
+        """
+        key_id = self._get_key_id(key)
+        if not key_id:
+            return key
+
+        if timeout is None:
+            timeout = self.config.get("max_wait_seconds", 60)
+        deadline = time.monotonic() + timeout
+
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                wait = self._try_reserve(key_id, estimated_tokens, now)
+                if wait == 0:
+                    return key
+                if wait is None or wait > deadline - now:
+                    return None
+                cancellable_wait(self._condition, wait)
+
+    def _reserve_ratio(self) -> float:
+        """当前工作项不能动用的额度比例：批量任务为交互式任务保留一部分RPM/TPM额度"""
+        priority_class, _ = get_work_priority()
+        if priority_class == BATCH:
+            return self.config.get("batch_reserve_ratio", 0.0)
+        return 0.0
+
+    def _try_reserve(self, key_id: str, estimated_tokens: int, now: float) -> Optional[float]:
+        """
+        检查密钥是否可用，可用时预留额度（持有锁时调用）
+
+        Returns:
+            0表示已预留，正数表示需等待的秒数，None表示在可预期的时间内不可用
+        """
+        state = self.key_states[key_id]
+        reserve_ratio = self._reserve_ratio()
+        if self.state_store:
+            wait = self.state_store.try_reserve(hash_api_key(state["key"]), estimated_tokens, reserve_ratio)
+            if wait == 0:
+                state["total_requests"] += 1
+                state["last_used"] = time.time()
+                state["cooldown_until"] = None
+            return wait
+
+        wait = self._wait_time(state, estimated_tokens, now, reserve_ratio)
+        if wait == 0:
+            self._reserve(state, estimated_tokens, now)
+        return wait
+
+    def _refresh_states(self):
+        """从共享存储读取所有密钥的最新状态到本地副本"""
+        if not self.state_store:
+            return
+        rows = self.state_store.get_states([hash_api_key(key) for key in self.api_keys])
+        with self._condition:
+            for state in self.key_states.values():
+                row = rows.get(hash_api_key(state["key"]))
+                if row:
+                    self._apply_row(state, row)
+
+    def _apply_row(self, state: dict, row: dict):
+        """将共享存储中的一行状态复制到本地副本（冷却时间换算为单调时钟）"""
+        for field in ("failure_count", "success_count", "disabled_until", "total_requests",
+                      "total_successes", "total_tokens", "rate_limited_count", "last_used"):
+            state[field] = row[field]
+        state["is_disabled"] = bool(row["is_disabled"])
+        cooldown_until = row["cooldown_until"]
+        state["cooldown_until"] = time.monotonic() + (cooldown_until - time.time()) if cooldown_until else None
+
+    def _wait_time(self, state: dict, estimated_tokens: int, now: float, reserve_ratio: float = 0.0) -> Optional[float]:
+        """
+        计算密钥恢复可用还需等待的秒数（持有锁时调用）
+
+        Args:
+            reserve_ratio: 为高优先级请求保留、本次请求不能动用的容量比例
+
+        Returns:
+            0表示立即可用，None表示在可预期的时间内不可用
+        """
+        if self._is_key_disabled(state):
+            disabled_until = state["disabled_until"]
+            if not disabled_until:
+                return None
+            return max(0.0, disabled_until - time.time())
+
+        waits = [
+            state["rpm_bucket"].wait_time(1, now, reserve_ratio),
+            state["tpm_bucket"].wait_time(estimated_tokens, now, reserve_ratio)
+        ]
+        if state["cooldown_until"]:
+            waits.append(max(0.0, state["cooldown_until"] - now))
+        return max(waits)
+
+    def _reserve(self, state: dict, estimated_tokens: int, now: float):
+        """预留一次请求的额度（持有锁时调用）"""
+        state["rpm_bucket"].consume(1, now)
+        state["tpm_bucket"].consume(estimated_tokens, now)
+        state["cooldown_until"] = None
+        state["total_requests"] += 1
+        state["last_used"] = time.time()
+
     def _is_key_disabled(self, key_state: dict) -> bool:
         """
         检查密钥是否被禁用
-        
+
         Args:
             key_state: 密钥状态字典
-            
+
         Returns:
             布尔值，表示密钥是否被禁用
         """
-        if not key_state["is_disabled"]:
-            return False
-            
-        # 检查禁用时间是否已过
-        if key_state["disabled_until"] and time.time() > key_state["disabled_until"]:
-            # 重新启用密钥
-            key_state["is_disabled"] = False
-            key_state["disabled_until"] = None
-            logger.info(f"密钥重新启用")
-            return False
-            
-        return True
-    
-    def report_success(self, key: str):
+        with self._condition:
+            if not key_state["is_disabled"]:
+                return False
+
+            # 检查禁用时间是否已过
+            if key_state["disabled_until"] and time.time() > key_state["disabled_until"]:
+                # 重新启用密钥
+                key_state["is_disabled"] = False
+                key_state["disabled_until"] = None
+                logger.info(f"密钥重新启用")
+                return False
+
+            return True
+
+    def report_success(self, key: str, tokens_used: Optional[int] = None, estimated_tokens: int = 0):
         """
         报告API请求成功
-        
+
+        Args:
+            key: 使用的API密钥
+            tokens_used: 响应中 usage.total_tokens 报告的实际用量
+            estimated_tokens: 获取密钥时预留的token数，用于按实际用量校正TPM额度
+        """
+        key_id = self._get_key_id(key)
+        if not key_id:
+            return
+
+        with self._condition:
+            state = self.key_states[key_id]
+            if self.state_store:
+                self._apply_row(state, self.state_store.record_success(hash_api_key(key), tokens_used, estimated_tokens))
+            else:
+                state["success_count"] += 1
+                state["total_successes"] += 1
+                state["last_used"] = time.time()
+
+                if tokens_used is not None:
+                    state["total_tokens"] += tokens_used
+                    # 预留多了归还，少了补扣
+                    state["tpm_bucket"].consume(tokens_used - estimated_tokens, time.monotonic())
+
+                # 如果有失败记录，重置失败计数
+                if state["failure_count"] > 0:
+                    state["failure_count"] = max(0, state["failure_count"] - 1)
+
+            self._condition.notify_all()
+
+        # 记录密钥使用情况
+        if self.config.get("log_key_usage", True):
+            logger.debug("密钥 %s 请求成功，累计成功: %s", key_id, state['total_successes'])
+
+    def release_reservation(self, key: str, requests: int = 0, tokens: int = 0):
+        """
+        归还预留但未使用的额度（如被取消的对冲请求未发出的请求、未生成的输出token）
+
         Args:
             key: 使用的API密钥
+            requests: 归还的请求数
+            tokens: 归还的token数
         """
         key_id = self._get_key_id(key)
-        if key_id and key_id in self.key_states:
+        if not key_id or not (requests or tokens):
+            return
+
+        with self._condition:
             state = self.key_states[key_id]
-            state["success_count"] += 1
-            state["total_successes"] += 1
-            state["last_used"] = time.time()
-            
-            # 如果有失败记录，重置失败计数
-            if state["failure_count"] > 0:
-                state["failure_count"] = max(0, state["failure_count"] - 1)
-            
-            # 记录密钥使用情况
-            if self.config.get("log_key_usage", True):
-                logger.debug(f"密钥 {key_id} 请求成功，累计成功: {state['total_successes']}")
-    
-    def report_failure(self, key: str, error_type: str = "unknown"):
+            if self.state_store:
+                self.state_store.refund(hash_api_key(key), requests, tokens)
+            else:
+                now = time.monotonic()
+                state["rpm_bucket"].refund(requests, now)
+                state["tpm_bucket"].refund(tokens, now)
+            self._condition.notify_all()
+
+    def report_failure(self, key: str, error_type: str = "unknown", retry_after: Optional[float] = None):
         """
         报告API请求失败
-        
+
         Args:
             key: 使用的API密钥
             error_type: 错误类型
+            retry_after: 限流响应中 Retry-After 给出的等待秒数（仅 rate_limit 使用）
         """
+        if error_type == "rate_limit":
+            self.report_rate_limited(key, retry_after)
+            return
+
         key_id = self._get_key_id(key)
-        if key_id and key_id in self.key_states:
+        if not key_id:
+            return
+
+        with self._condition:
             state = self.key_states[key_id]
-            state["failure_count"] += 1
-            state["total_requests"] += 1
-            state["last_used"] = time.time()
-            
-            # 检查是否需要禁用密钥
             max_failures = self.config.get("max_failure_count", 3)
-            if state["failure_count"] >= max_failures:
-                self._disable_key(key_id, error_type)
-            
-            # 记录密钥使用情况
-            if self.config.get("log_key_usage", True):
-                logger.warning(f"密钥 {key_id} 请求失败 ({error_type})，失败次数: {state['failure_count']}")
-    
+            if self.state_store:
+                was_disabled = state["is_disabled"]
+                self._apply_row(state, self.state_store.record_failure(
+                    hash_api_key(key), max_failures, self.config.get("disable_duration", 300)))
+                if state["is_disabled"] and not was_disabled:
+                    logger.warning(f"密钥 {key_id} 因失败次数过多被临时禁用，原因: {error_type}")
+            else:
+                state["failure_count"] += 1
+                state["last_used"] = time.time()
+
+                # 检查是否需要禁用密钥
+                if state["failure_count"] >= max_failures:
+                    self._disable_key(key_id, error_type)
+
+            self._condition.notify_all()
+
+        # 记录密钥使用情况
+        if self.config.get("log_key_usage", True):
+            logger.warning(f"密钥 {key_id} 请求失败 ({error_type})，失败次数: {state['failure_count']}")
+
+    def report_rate_limited(self, key: str, retry_after: Optional[float] = None):
+        """
+        报告密钥被限流（429），按服务端要求的时间冷却，而不是固定禁用
+
+        Args:
+            key: 使用的API密钥
+            retry_after: Retry-After 秒数，未提供时使用配置的 rate_limit_cooldown
+        """
+        key_id = self._get_key_id(key)
+        if not key_id:
+            return
+
+        cooldown = retry_after if retry_after is not None else self.config.get("rate_limit_cooldown", 20)
+        with self._condition:
+            state = self.key_states[key_id]
+            if self.state_store:
+                # 写入共享存储，其他进程也会避开这个密钥
+                self._apply_row(state, self.state_store.set_cooldown(hash_api_key(key), cooldown))
+            else:
+                now = time.monotonic()
+                state["rate_limited_count"] += 1
+                state["rpm_bucket"].drain(now)
+                state["cooldown_until"] = max(state["cooldown_until"] or 0.0, now + cooldown)
+            self._condition.notify_all()
+
+        logger.warning(f"密钥 {key_id} 被限流，冷却 {cooldown:.1f} 秒")
+
+    def observe_rate_limit_headers(self, key: str, headers: Dict[str, str]):
+        """
+        根据响应头中的限额信息（x-ratelimit-*）校准密钥的令牌桶
+
+        Args:
+            key: 使用的API密钥
+            headers: HTTP响应头
+        """
+        key_id = self._get_key_id(key)
+        if not key_id or not headers:
+            return
+
+        def _header_number(name: str) -> Optional[float]:
+            value = headers.get(name)
+            try:
+                return float(value) if value is not None else None
+            except (TypeError, ValueError):
+                return None
+
+        remaining_requests = _header_number("x-ratelimit-remaining-requests")
+        remaining_tokens = _header_number("x-ratelimit-remaining-tokens")
+        if remaining_requests is None and remaining_tokens is None:
+            return
+
+        if self.state_store:
+            key_hash = hash_api_key(key)
+            if remaining_requests is not None:
+                self.state_store.sync_bucket(key_hash, "rpm", remaining_requests, _header_number("x-ratelimit-limit-requests"))
+            if remaining_tokens is not None:
+                self.state_store.sync_bucket(key_hash, "tpm", remaining_tokens, _header_number("x-ratelimit-limit-tokens"))
+            return
+
+        with self._condition:
+            state = self.key_states[key_id]
+            now = time.monotonic()
+            if remaining_requests is not None:
+                state["rpm_bucket"].sync(remaining_requests, _header_number("x-ratelimit-limit-requests"), now)
+            if remaining_tokens is not None:
+                state["tpm_bucket"].sync(remaining_tokens, _header_number("x-ratelimit-limit-tokens"), now)
+
     def _disable_key(self, key_id: str, reason: str):
         """
         禁用密钥
-        
+
         Args:
             key_id: 密钥标识符
             reason: 禁用原因
         """
         disable_duration = self.config.get("disable_duration", 300)
-        state = self.key_states[key_id]
-        
-        state["is_disabled"] = True
-        state["disabled_until"] = time.time() + disable_duration
-        
+        with self._condition:
+            state = self.key_states[key_id]
+            state["is_disabled"] = True
+            state["disabled_until"] = time.time() + disable_duration
+
         logger.warning(f"密钥 {key_id} 因失败次数过多被临时禁用，原因: {reason}，禁用时长: {disable_duration}秒")
-    
+
     def _get_key_id(self, key: str) -> Optional[str]:
         """
         根据密钥获取密钥标识符
-        
+
         Args:
             key: API密钥
-            
+
         Returns:
             密钥标识符，如果找不到返回None
         """
-        for key_id, state in self.key_states.items():
-            if state["key"] == key:
-                return key_id
-        return None
-    
+        return self._key_ids.get(key)
+
     def get_key_statistics(self) -> dict:
         """
         获取所有密钥的统计信息
-        
+
         Returns:
             包含统计信息的字典
         """
         stats = {}
-        for key_id, state in self.key_states.items():
-            stats[key_id] = {
-                "is_disabled": state["is_disabled"],
-                "failure_count": state["failure_count"],
-                "success_count": state["success_count"],
-                "total_requests": state["total_requests"],
-                "total_successes": state["total_successes"],
-                "success_rate": state["total_successes"] / max(1, state["total_requests"]),
-                "last_used": state["last_used"]
-            }
+        self._refresh_states()
+        with self._condition:
+            now = time.monotonic()
+            for key_id, state in self.key_states.items():
+                stats[key_id] = {
+                    "is_disabled": state["is_disabled"],
+                    "failure_count": state["failure_count"],
+                    "success_count": state["success_count"],
+                    "total_requests": state["total_requests"],
+                    "total_successes": state["total_successes"],
+                    "success_rate": state["total_successes"] / max(1, state["total_requests"]),
+                    "total_tokens": state["total_tokens"],
+                    "rate_limited_count": state["rate_limited_count"],
+                    "cooling_down": bool(state["cooldown_until"] and state["cooldown_until"] > now),
+                    "last_used": state["last_used"]
+                }
         return stats
-    
+
     def rotate_key(self):
         """
         轮换到下一个密钥
         """
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-        logger.debug(f"密钥轮换到索引: {self.current_key_index}")
-    
+        with self._condition:
+            self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
+        logger.debug("密钥轮换到索引: %s", self.current_key_index)
+
     def reset_statistics(self):
         """重置所有密钥的统计信息"""
-        for key_id in self.key_states:
-            self.key_states[key_id] = {
-                "key": self.key_states[key_id]["key"],
-                "failure_count": 0,
-                "success_count": 0,
-                "is_disabled": False,
-                "disabled_until": None,
-                "last_used": None,
-                "total_requests": 0,
-                "total_successes": 0
-            }
+        with self._condition:
+            for key_id in self.key_states:
+                self.key_states[key_id] = self._new_key_state(self.key_states[key_id]["key"])
+            if self.state_store:
+                self.state_store.reset(
+                    [hash_api_key(key) for key in self.api_keys],
+                    self.config.get("requests_per_minute", 0),
+                    self.config.get("tokens_per_minute", 0)
+                )
+            self._condition.notify_all()
         logger.info("所有密钥统计信息已重置")
-    
+
     def get_healthy_keys(self) -> list:
         """
         获取健康的密钥列表（未被禁用的密钥）
-        
+
         Returns:
             健康密钥的列表
         """
         healthy_keys = []
-        for key_id, state in self.key_states.items():
-            if not self._is_key_disabled(state):
-                healthy_keys.append(state["key"])
+        self._refresh_states()
+        with self._condition:
+            for key_id, state in self.key_states.items():
+                if not self._is_key_disabled(state):
+                    healthy_keys.append(state["key"])
         return healthy_keys
-    
+
     def enable_all_keys(self):
         """重新启用所有密钥"""
-        for key_id in self.key_states:
-            self.key_states[key_id]["is_disabled"] = False
-            self.key_states[key_id]["disabled_until"] = None
+        with self._condition:
+            for key_id in self.key_states:
+                self.key_states[key_id]["is_disabled"] = False
+                self.key_states[key_id]["disabled_until"] = None
+            if self.state_store:
+                self.state_store.enable_all([hash_api_key(key) for key in self.api_keys])
+            self._condition.notify_all()
         logger.info("所有密钥已重新启用")
 
 # 创建全局API密钥池管理器实例
 def create_api_key_pool():
     """创建全局API密钥池管理器实例"""
     api_config = config_manager.get_api_config()
+
+    # 共享状态存储不可用时（如只读文件系统）退回到进程内状态
+    state_store = None
+    store_path = api_config.get("state_store_path")
+    if store_path:
+        try:
+            state_store = KeyStateStore(store_path)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"密钥状态共享存储不可用，使用进程内状态: {e}")
+
     return APIKeyPoolManager(
         api_config["keys_pool"],
-        api_config["pool_config"]
+        api_config["pool_config"],
+        route_selector=route_selector,
+        state_store=state_store
     )
 
 # 全局实例
-api_key_pool = create_api_key_pool()
\ No newline at end of file
+api_key_pool = create_api_key_pool()
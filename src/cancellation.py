@@ -0,0 +1,213 @@
+"""
+协作式取消模块
+每个搜索任务持有一个取消令牌，通过 contextvars 传到任务的所有阶段（任务图、预取、对冲线程同样可见）；
+网络请求、重试等待、密钥额度等待和调度排队都会在令牌取消后立即返回，
+停止任务后约一秒内释放其占用的密钥额度、请求名额和连接
+"""
+
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class OperationCancelled(BaseException):
+    """
+    任务已被取消
+
+    继承 BaseException 而不是 Exception：各阶段中大量的 except Exception 容错分支
+    不会把取消当作普通错误吞掉继续重试，取消会一直传到任务的最外层。
+    """
+
+
+class CancellationToken:
+    """
+    取消令牌（线程安全）
+
+    可注册取消回调（如关闭HTTP会话、唤醒等待中的条件变量），取消时在调用 cancel 的线程中执行。
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks: Dict[int, Callable[[], Any]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def cancel(self) -> bool:
+        """
+        取消令牌并执行已注册的回调
+
+        Returns:
+            本次调用是否真正取消了令牌（已取消过时返回False）
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug("取消回调执行出错: %s", e)
+        return True
+
+    @property
+    def is_cancelled(self) -> bool:
+        """令牌是否已被取消"""
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """令牌已取消时抛出 OperationCancelled"""
+        if self._event.is_set():
+            raise OperationCancelled()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待令牌被取消
+
+        Args:
+            timeout: 最长等待秒数
+
+        Returns:
+            令牌是否已被取消
+        """
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback: Callable[[], Any]) -> Callable[[], None]:
+        """
+        注册取消回调；令牌已取消时立即执行
+
+        Args:
+            callback: 回调函数
+
+        Returns:
+            注销该回调的函数
+        """
+        with self._lock:
+            if not self._event.is_set():
+                callback_id = self._next_id
+                self._next_id += 1
+                self._callbacks[callback_id] = callback
+
+                def unregister():
+                    with self._lock:
+                        self._callbacks.pop(callback_id, None)
+                return unregister
+        callback()
+        return lambda: None
+
+
+# 不属于任何任务时使用的令牌（永远不会被取消，相关调用走无额外开销的路径）
+_never_cancelled = CancellationToken()
+
+_current_token: contextvars.ContextVar[Optional[CancellationToken]] = contextvars.ContextVar(
+    "cancellation_token", default=None)
+
+# 执行可取消的阻塞调用（网络请求）的线程池；调用被放弃后由其自身的超时结束
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="cancellable")
+
+
+def set_cancellation_token(token: CancellationToken) -> contextvars.Token:
+    """设置当前上下文的取消令牌"""
+    return _current_token.set(token)
+
+
+def get_cancellation_token() -> CancellationToken:
+    """获取当前上下文的取消令牌，未设置时返回永不取消的令牌"""
+    return _current_token.get() or _never_cancelled
+
+
+def check_cancelled():
+    """当前任务已被取消时抛出 OperationCancelled（用于各阶段和重试循环的检查点）"""
+    get_cancellation_token().raise_if_cancelled()
+
+
+def cancellable_sleep(seconds: float):
+    """
+    可取消的等待，替代重试退避中的 time.sleep
+
+    Args:
+        seconds: 等待秒数
+    """
+    if get_cancellation_token().wait(max(0.0, seconds)):
+        raise OperationCancelled()
+
+
+def cancellable_wait(condition: threading.Condition, timeout: Optional[float] = None) -> bool:
+    """
+    在持有 condition 锁时等待，当前任务被取消时立即唤醒并抛出 OperationCancelled
+
+    Args:
+        condition: 已持有锁的条件变量
+        timeout: 最长等待秒数
+
+    Returns:
+        condition.wait 的返回值
+    """
+    token = get_cancellation_token()
+    token.raise_if_cancelled()
+    if token is _never_cancelled:
+        return condition.wait(timeout)
+
+    def wake():
+        with condition:
+            condition.notify_all()
+
+    unregister = token.on_cancel(wake)
+    try:
+        return condition.wait(timeout)
+    finally:
+        unregister()
+        token.raise_if_cancelled()
+
+
+def call_cancellable(func: Callable[..., Any], *args, on_cancel: Optional[Callable[[], Any]] = None,
+                     cancel_token: Optional[CancellationToken] = None, **kwargs) -> Any:
+    """
+    执行阻塞调用（如HTTP请求），当前任务被取消时立即返回
+
+    调用在独立线程中执行，取消时调用方不再等待；on_cancel 可用于关闭会话以尽快断开连接。
+    cancel_token 是调用方自己的取消令牌（如对冲中落败的一方），与任务令牌任一取消即返回。
+    不属于任何任务且没有 cancel_token 时直接在当前线程执行。
+
+    Args:
+        func: 阻塞函数
+        on_cancel: 取消时执行的清理函数
+        cancel_token: 额外的取消令牌
+
+    Returns:
+        func 的返回值（异常原样抛出）
+    """
+    token = get_cancellation_token()
+    token.raise_if_cancelled()
+    if cancel_token is None:
+        if token is _never_cancelled:
+            return func(*args, **kwargs)
+        tokens = [token]
+    else:
+        cancel_token.raise_if_cancelled()
+        tokens = [t for t in {token, cancel_token} if t is not _never_cancelled]
+
+    done = threading.Event()
+    future = _executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+    future.add_done_callback(lambda _: done.set())
+    unregisters = [t.on_cancel(done.set) for t in tokens]
+    try:
+        done.wait()
+    finally:
+        for unregister in unregisters:
+            unregister()
+    if future.done():
+        return future.result()
+
+    if on_cancel is not None:
+        try:
+            on_cancel()
+        except Exception as e:
+            logger.debug("取消清理执行出错: %s", e)
+    raise OperationCancelled()
@@ -0,0 +1,196 @@
+"""
+熔断器模块
+按 (端点, 模型) 维护熔断器：连续失败达到阈值后熔断（open），所有并发工作线程立即跳过该端点；
+冷却时间过后进入半开状态（half-open），只放行少量探测请求，探测成功则恢复（closed）
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Optional, Tuple, Any
+
+from src.config import config_manager
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    单个端点/模型的熔断器（线程安全）
+
+    只有端点本身的故障（连接失败、超时、5xx）计为失败；
+    429、401/403 等与具体密钥相关的响应不影响熔断状态。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, recovery_timeout: float = 30.0,
+                 half_open_max_probes: int = 1):
+        """
+        初始化熔断器
+
+        Args:
+            name: 熔断器名称（用于日志）
+            failure_threshold: 连续失败多少次后熔断
+            recovery_timeout: 熔断后多久进入半开状态（秒）
+            half_open_max_probes: 半开状态下同时放行的探测请求数
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_probes = half_open_max_probes
+
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.open_count = 0
+        self._lock = threading.Lock()
+
+    def _update_state(self, now: float):
+        """熔断冷却期结束后转为半开状态（持有锁时调用）"""
+        if self.state == STATE_OPEN and now - self.opened_at >= self.recovery_timeout:
+            self.state = STATE_HALF_OPEN
+            self.probes_in_flight = 0
+            logger.info(f"熔断器 {self.name} 进入半开状态，放行探测请求")
+
+    def is_open(self) -> bool:
+        """
+        检查熔断器当前是否拒绝请求（不占用探测名额）
+
+        Returns:
+            熔断中或半开且探测名额已满时返回True
+        """
+        with self._lock:
+            self._update_state(time.monotonic())
+            if self.state == STATE_OPEN:
+                return True
+            return self.state == STATE_HALF_OPEN and self.probes_in_flight >= self.half_open_max_probes
+
+    def allow_request(self) -> bool:
+        """
+        申请发送一次请求；半开状态下会占用一个探测名额，之后必须调用 record_result 归还
+
+        Returns:
+            是否允许发送请求
+        """
+        with self._lock:
+            self._update_state(time.monotonic())
+            if self.state == STATE_CLOSED:
+                return True
+            if self.state == STATE_HALF_OPEN and self.probes_in_flight < self.half_open_max_probes:
+                self.probes_in_flight += 1
+                return True
+            return False
+
+    def record_success(self):
+        """记录一次成功请求"""
+        with self._lock:
+            if self.state == STATE_HALF_OPEN:
+                logger.info(f"熔断器 {self.name} 探测成功，恢复正常")
+            self.state = STATE_CLOSED
+            self.consecutive_failures = 0
+            self.probes_in_flight = 0
+
+    def record_failure(self):
+        """记录一次端点故障"""
+        with self._lock:
+            now = time.monotonic()
+            self.consecutive_failures += 1
+            if self.state == STATE_HALF_OPEN:
+                self._open(now, "探测请求失败")
+            elif self.state == STATE_CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._open(now, f"连续失败 {self.consecutive_failures} 次")
+
+    def release(self):
+        """请求结果与端点健康无关（如429），只归还探测名额"""
+        with self._lock:
+            if self.state == STATE_HALF_OPEN and self.probes_in_flight > 0:
+                self.probes_in_flight -= 1
+
+    def record_result(self, status_code: Optional[int]):
+        """
+        根据HTTP结果更新熔断状态
+
+        Args:
+            status_code: HTTP状态码，请求异常（连接失败、超时）时传None
+        """
+        if status_code is None or status_code >= 500:
+            self.record_failure()
+        elif status_code == 200:
+            self.record_success()
+        else:
+            self.release()
+
+    def _open(self, now: float, reason: str):
+        """熔断（持有锁时调用）"""
+        self.state = STATE_OPEN
+        self.opened_at = now
+        self.probes_in_flight = 0
+        self.open_count += 1
+        logger.warning(f"熔断器 {self.name} 已熔断（{reason}），{self.recovery_timeout} 秒内跳过该端点")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取熔断器状态"""
+        with self._lock:
+            self._update_state(time.monotonic())
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "open_count": self.open_count
+            }
+
+
+class CircuitBreakerRegistry:
+    """按 (端点, 模型) 管理熔断器，同一进程内所有工作线程共用"""
+
+    def __init__(self, config: Optional[dict] = None):
+        """
+        初始化熔断器注册表
+
+        Args:
+            config: 熔断配置字典（见 src.config.CIRCUIT_BREAKER_CONFIG）
+        """
+        self.config = config or {}
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str, model: str) -> CircuitBreaker:
+        """
+        获取 (端点, 模型) 对应的熔断器，不存在时创建
+
+        Args:
+            endpoint: API端点
+            model: 模型名称
+
+        Returns:
+            熔断器实例
+        """
+        with self._lock:
+            breaker = self._breakers.get((endpoint, model))
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    f"{model}@{endpoint}",
+                    failure_threshold=self.config.get("failure_threshold", 3),
+                    recovery_timeout=self.config.get("recovery_timeout", 30),
+                    half_open_max_probes=self.config.get("half_open_max_probes", 1)
+                )
+                self._breakers[(endpoint, model)] = breaker
+            return breaker
+
+    def get_statistics(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有熔断器的状态"""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {breaker.name: breaker.get_statistics() for breaker in breakers.values()}
+
+
+def create_circuit_breakers() -> CircuitBreakerRegistry:
+    """根据配置创建全局熔断器注册表"""
+    return CircuitBreakerRegistry(config_manager.get_api_config().get("circuit_breaker_config"))
+
+
+# 全局实例
+circuit_breakers = create_circuit_breakers()
@@ -3,6 +3,7 @@
 负责管理所有配置信息，包括API端点、模型配置、缓存配置等
 """
 
+import os
 import logging
 from Bio import Entrez
 from typing import Dict, List, Any
@@ -43,7 +44,37 @@ API_KEY_POOL_CONFIG = {
     "disable_duration": 300,       # 密钥禁用时长（秒），5分钟
     "success_reset_threshold": 2,  # 成功次数阈值，重置失败计数
     "enable_key_rotation": True,   # 启用密钥轮换
-    "log_key_usage": True          # 是否记录密钥使用情况（不记录具体密钥内容）
+    "log_key_usage": True,         # 是否记录密钥使用情况（不记录具体密钥内容）
+    "requests_per_minute": 60,     # 每个密钥每分钟请求数上限（0表示不限制）
+    "tokens_per_minute": 60000,    # 每个密钥每分钟token数上限（0表示不限制）
+    "rate_limit_cooldown": 20,     # 收到429且未提供Retry-After时的冷却时长（秒）
+    "max_wait_seconds": 60,        # 所有密钥额度耗尽时最长等待时长（秒）
+    "batch_reserve_ratio": 0.3     # 批量任务不能动用的RPM/TPM额度比例，留给交互式搜索（跨进程生效）
+}
+
+# 路由选择配置 - 按 (密钥, 端点, 模型) 统计延迟和错误率，选择预期完成时间最短的路径
+ROUTE_SELECTOR_CONFIG = {
+    "ewma_alpha": 0.3,             # EWMA平滑系数，越大越偏向最近的请求
+    "default_latency": 5.0,        # 尚无样本的路径的预估延迟（秒）
+    "in_flight_penalty": 0.5,      # 每个进行中请求增加的延迟倍数，用于在密钥间分散负载
+    "error_half_life": 300         # 错误率随时间衰减的半衰期（秒），使故障路径有机会被重新尝试
+}
+
+# 熔断配置 - 按 (端点, 模型) 熔断，端点故障时所有工作线程立即跳过，而不是逐个请求等待超时
+CIRCUIT_BREAKER_CONFIG = {
+    "failure_threshold": 3,        # 连续失败（连接失败、超时、5xx）多少次后熔断
+    "recovery_timeout": 30,        # 熔断后多久放行探测请求（秒）
+    "half_open_max_probes": 1      # 半开状态下同时放行的探测请求数
+}
+
+# 请求对冲配置 - 请求超过该模型近期延迟分位数仍未返回时，用另一个密钥发出相同请求，先返回者胜出
+HEDGING_CONFIG = {
+    "enabled": False,              # 是否启用请求对冲（会增加少量token消耗）
+    "quantile": 0.9,               # 触发对冲的延迟分位数
+    "min_delay": 2.0,              # 对冲等待时间下限（秒）
+    "min_samples": 20,             # 延迟样本数少于该值时不对冲
+    "budget_ratio": 0.1,           # 对冲请求数最多占主请求数的比例
+    "max_workers": 16              # 执行主请求和对冲请求的线程数
 }
 
 # 模型配置
@@ -54,27 +85,120 @@ MODEL_CONFIGS = [
 ]
 
 # ================= 缓存配置 =================
-# 国家识别缓存配置
-COUNTRY_CACHE = {}  # 简单内存缓存
-COUNTRY_CACHE_MAX_SIZE = 1000
-COUNTRY_CACHE_TTL = 3600  # 1小时过期
+# 本地缓存目录（项目根目录下的 .cache）
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+
+# 国家识别缓存配置（持久化到磁盘，多次运行和多个进程共享）
+COUNTRY_CACHE_PATH = os.path.join(CACHE_DIR, "country_cache.json")
+COUNTRY_CACHE_MAX_SIZE = 10000
+COUNTRY_CACHE_TTL = 30 * 24 * 3600  # 30天过期，机构所属国家基本不会变化
+
+# 密钥健康状态和RPM/TPM额度的共享存储（SQLite），CLI、Web工作进程和批处理任务共用；设为None则只在进程内记录
+KEY_STATE_STORE_PATH = os.path.join(CACHE_DIR, "key_state.sqlite3")
+
+# 全文预取配置：处理第i篇文献时在后台预取第i+1..i+lookahead篇的免费状态和全文，
+# 预取结果保存在按内存预算淘汰的内存缓存中
+PREFETCH_CONFIG = {
+    "enabled": True,
+    "lookahead": 3,
+    "max_workers": 3,
+    "memory_budget_mb": 64
+}
 
 # ================= 功能配置 =================
 ENABLE_WEB_SEARCH = True  # 是否启用web search功能
 ENABLE_FULLTEXT_EXTRACTION = False  # 是否启用全文提取功能
+PROGRESSIVE_REFINEMENT = True  # 启用全文提取时先输出仅基于摘要的结果，全文分析完成后再更新该行
 REQUEST_DELAY = 2.0  # API请求间隔（秒），避免429错误
 
+# 分级提取配置：先用正则规则提取，置信度达到阈值的字段不再交给模型；
+# 其余字段先由小模型补全，仍不完整时才升级到更大的模型（按AI提取器的模型回退顺序）
+EXTRACTION_CASCADE_CONFIG = {
+    "enabled": True,
+    "rule_confidence_threshold": 0.8
+}
+
+# 缺失字段补提取配置：主任务结束后只针对缺失字段重新提取，附上与这些字段最相关的全文段落
+REEXTRACTION_CONFIG = {
+    "enabled": True,
+    "max_passage_chars": 3000
+}
+
+# ================= 优先级调度配置 =================
+# Web界面的搜索为交互式优先级，命令行批量提取为批量优先级；
+# AI请求和HTTP请求（NCBI、全文页面）的并发名额优先分配给交互式工作项，同一优先级内按任务公平分配
+PRIORITY_CONFIG = {
+    "default_class": "interactive",  # 未标记优先级的工作项所属类别
+    "llm_max_concurrent": 8,         # 同时进行的AI请求数
+    "http_max_concurrent": 4         # 同时进行的NCBI/全文页面请求数
+}
+
+# ================= 搜索任务配置 =================
+# Web搜索任务由后台线程池执行，与HTTP连接解耦；已结束的任务保留一段时间，供断线重连后续传事件。
+# 所有任务共享NCBI和AI接口的限额，超出并发上限的任务排队，队列满时新任务被拒绝（HTTP 429）
+JOB_RUNNER_CONFIG = {
+    "max_workers": 4,          # 同时运行的搜索任务数
+    "max_pending": 20,         # 排队任务数上限
+    "default_duration": 120,   # 尚无历史数据时预估的单个任务耗时（秒），用于估算排队等待时间
+    "finished_ttl": 3600,      # 已结束任务的保留时间（秒）
+    "max_results_limit": 5000, # Web界面单个任务允许的最大结果数
+    "page_size": 100,          # 结果分页接口的默认每页行数
+    "max_page_size": 500       # 结果分页接口的每页行数上限
+}
+
+# 任务日志推送配置：推送的日志保存在每个任务的有界环形缓冲区中，客户端订阅时选择日志级别，
+# 日志按刷新周期合并为一个SSE帧发送，数据行不等待、立即发送；完整日志另写入任务的日志文件供下载
+LOG_STREAM_CONFIG = {
+    "buffer_size": 2000,              # 每个任务保留的日志条数
+    "capture_level": "DEBUG",         # 写入任务缓冲区的最低日志级别
+    "default_client_level": "info",   # 客户端未指定时推送的最低日志级别
+    "flush_interval": 0.25,           # 日志合并发送的周期（秒）
+    "max_message_length": 2000,       # 单条日志的最大长度，超出部分截断（如完整的API响应内容）
+    "spool_dir": os.path.join(CACHE_DIR, "job_logs")  # 任务完整日志文件目录（供下载，任务清理时删除），None表示不写
+}
+
 # ================= 日志配置 =================
-def setup_logging():
-    """设置日志配置"""
-    # 配置日志 - 启用调试模式
-    logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - [%(name)s:%(lineno)d] - %(message)s')
+# 日志配置档：开发环境输出完整的调试日志（包括请求和响应内容），生产环境只保留 INFO 及以上级别，
+# 调试日志在调用处直接丢弃；通过环境变量 PUBMED_LOG_PROFILE 选择
+LOG_PROFILE = os.environ.get("PUBMED_LOG_PROFILE", "development")
+
+LOGGING_CONFIG = {
+    "format": "%(asctime)s - %(levelname)s - [%(name)s:%(lineno)d] - %(message)s",
+    "queue_size": 10000,       # 异步日志队列长度，队满时丢弃 INFO 及以下级别的日志
+    "profiles": {
+        "development": {
+            "level": "DEBUG",
+            "module_levels": {"pubmed": "DEBUG", "requests": "WARNING", "urllib3": "WARNING"}
+        },
+        "production": {
+            "level": "INFO",
+            "module_levels": {"requests": "WARNING", "urllib3": "WARNING", "werkzeug": "WARNING"}
+        }
+    }
+}
+
+def setup_logging(profile: str = None):
+    """
+    设置日志配置：日志经由队列在独立线程中输出，级别由日志配置档决定（可重复调用）
+
+    Args:
+        profile: 日志配置档名称，默认使用 LOG_PROFILE
+    """
+    from src.log_pipeline import install_queue_logging
+
+    profile = profile or LOG_PROFILE
+    profiles = LOGGING_CONFIG["profiles"]
+    settings = profiles.get(profile, profiles["development"])
+    install_queue_logging(
+        level=settings["level"],
+        log_format=LOGGING_CONFIG["format"],
+        module_levels=settings.get("module_levels"),
+        queue_size=LOGGING_CONFIG["queue_size"]
+    )
     logger = logging.getLogger(__name__)
+    if profile not in profiles:
+        logger.warning(f"未知的日志配置档: {profile}，使用 development")
 
-    # 设置特定模块的日志级别
-    logging.getLogger('pubmed').setLevel(logging.DEBUG)
-    logging.getLogger('requests').setLevel(logging.WARNING)  # 减少第三方库的日志噪音
-    
     return logger
 
 # 默认配置字典
@@ -84,13 +208,26 @@ DEFAULT_CONFIG = {
     "api_endpoints": API_ENDPOINTS,
     "api_keys_pool": API_KEYS_POOL,
     "api_key_pool_config": API_KEY_POOL_CONFIG,
+    "route_selector_config": ROUTE_SELECTOR_CONFIG,
+    "circuit_breaker_config": CIRCUIT_BREAKER_CONFIG,
+    "hedging_config": HEDGING_CONFIG,
+    "key_state_store_path": KEY_STATE_STORE_PATH,
     "model_configs": MODEL_CONFIGS,
-    "country_cache": COUNTRY_CACHE,
+    "country_cache_path": COUNTRY_CACHE_PATH,
     "country_cache_max_size": COUNTRY_CACHE_MAX_SIZE,
     "country_cache_ttl": COUNTRY_CACHE_TTL,
+    "prefetch_config": PREFETCH_CONFIG,
     "enable_web_search": ENABLE_WEB_SEARCH,
     "enable_fulltext_extraction": ENABLE_FULLTEXT_EXTRACTION,
-    "request_delay": REQUEST_DELAY
+    "progressive_refinement": PROGRESSIVE_REFINEMENT,
+    "request_delay": REQUEST_DELAY,
+    "extraction_cascade_config": EXTRACTION_CASCADE_CONFIG,
+    "reextraction_config": REEXTRACTION_CONFIG,
+    "job_runner_config": JOB_RUNNER_CONFIG,
+    "log_stream_config": LOG_STREAM_CONFIG,
+    "priority_config": PRIORITY_CONFIG,
+    "log_profile": LOG_PROFILE,
+    "logging_config": LOGGING_CONFIG
 }
 
 # ================= 配置管理类 =================
@@ -109,12 +246,12 @@ class ConfigManager:
     def set(self, key: str, value: Any):
         """设置配置值"""
         self.config[key] = value
-        self.logger.debug(f"配置已更新: {key} = {value}")
+        self.logger.debug("配置已更新: %s = %s", key, value)
     
     def update(self, config_dict: Dict[str, Any]):
         """批量更新配置"""
         self.config.update(config_dict)
-        self.logger.debug(f"配置已批量更新: {len(config_dict)} 项")
+        self.logger.debug("配置已批量更新: %s 项", len(config_dict))
     
     def get_search_term(self) -> str:
         """获取搜索关键词"""
@@ -130,6 +267,10 @@ class ConfigManager:
             "endpoints": self.get("api_endpoints"),
             "keys_pool": self.get("api_keys_pool"),
             "pool_config": self.get("api_key_pool_config"),
+            "route_config": self.get("route_selector_config"),
+            "circuit_breaker_config": self.get("circuit_breaker_config"),
+            "hedging_config": self.get("hedging_config"),
+            "state_store_path": self.get("key_state_store_path"),
             "model_configs": self.get("model_configs"),
             "request_delay": self.get("request_delay")
         }
@@ -137,16 +278,30 @@ class ConfigManager:
     def get_cache_config(self) -> Dict[str, Any]:
         """获取缓存相关配置"""
         return {
-            "country_cache": self.get("country_cache"),
+            "country_cache_path": self.get("country_cache_path"),
             "country_cache_max_size": self.get("country_cache_max_size"),
-            "country_cache_ttl": self.get("country_cache_ttl")
+            "country_cache_ttl": self.get("country_cache_ttl"),
+            "prefetch_config": self.get("prefetch_config")
         }
     
     def get_feature_config(self) -> Dict[str, Any]:
         """获取功能开关配置"""
         return {
             "enable_web_search": self.get("enable_web_search"),
-            "enable_fulltext_extraction": self.get("enable_fulltext_extraction")
+            "enable_fulltext_extraction": self.get("enable_fulltext_extraction"),
+            "progressive_refinement": self.get("progressive_refinement"),
+            "extraction_cascade_config": self.get("extraction_cascade_config"),
+            "reextraction_config": self.get("reextraction_config"),
+            "priority_config": self.get("priority_config")
+        }
+    
+    def get_job_config(self) -> Dict[str, Any]:
+        """获取搜索任务相关配置"""
+        return {
+            "job_runner_config": self.get("job_runner_config"),
+            "log_stream_config": self.get("log_stream_config"),
+            "log_profile": self.get("log_profile"),
+            "logging_config": self.get("logging_config")
         }
 
 # 全局配置管理器实例
@@ -0,0 +1,326 @@
+"""
+国家识别缓存模块
+提供线程安全、可持久化的国家识别缓存：按规范化后的机构信息生成稳定的内容哈希作为键，
+使用LRU + TTL淘汰，并定期写入磁盘，供多次运行和多个工作进程共享
+"""
+
+import os
+import re
+import json
+import time
+import atexit
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+from typing import Dict, Optional, Any
+
+try:
+    import fcntl
+except ImportError:  # Windows 上没有 fcntl，跨进程保存不加锁
+    fcntl = None
+
+from src.config import config_manager
+
+logger = logging.getLogger(__name__)
+
+# 规范化机构信息时去除的内容
+_EMAIL_PATTERN = re.compile(r"(?:electronic address:\s*)?[\w.+-]+@[\w-]+(?:\.[\w-]+)+", re.IGNORECASE)
+_DEPARTMENT_PATTERN = re.compile(
+    r"^\s*(?:the\s+)?(?:department|dept\.?|division|section|laboratory|lab|unit|unité|service|"
+    r"program(?:me)?|group|center for|centre for|institute for)\b[^,;]*[,;]\s*",
+    re.IGNORECASE
+)
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_affiliation(affiliation: str) -> str:
+    """
+    规范化机构信息，使仅在邮箱、科室等细节上不同的机构共用同一缓存条目
+
+    Args:
+        affiliation: 原始机构信息
+
+    Returns:
+        规范化后的机构信息（小写）
+    """
+    if not affiliation:
+        return ""
+
+    text = _EMAIL_PATTERN.sub(" ", affiliation)
+    text = _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+    # 逐个去掉开头的科室/部门片段，但至少保留一个片段
+    while True:
+        stripped = _DEPARTMENT_PATTERN.sub("", text, count=1)
+        if stripped == text or not stripped.strip():
+            break
+        text = stripped
+
+    return text.lower().strip(" .,;")
+
+
+def affiliation_cache_key(affiliation: str) -> str:
+    """
+    生成稳定的缓存键（与进程无关，可持久化）
+
+    Args:
+        affiliation: 原始机构信息
+
+    Returns:
+        规范化机构信息的SHA-256摘要
+    """
+    normalized = normalize_affiliation(affiliation)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class CountryCache:
+    """
+    线程安全的持久化国家识别缓存
+
+    条目按最近访问顺序保存在OrderedDict中，超出容量时淘汰最久未使用的条目，
+    超过TTL的条目在读取时失效。写入累计到一定次数后自动保存到磁盘，
+    保存时持有跨进程的文件锁，先合并磁盘上其他进程写入的条目，再原子替换文件。
+    """
+
+    def __init__(self, path: Optional[str] = None, max_size: int = 1000, ttl: float = 3600,
+                 autosave_every: int = 20):
+        """
+        初始化缓存
+
+        Args:
+            path: 持久化文件路径，为None时仅使用内存
+            max_size: 最大条目数
+            ttl: 条目有效期（秒）
+            autosave_every: 每累计多少次写入自动保存一次
+        """
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.autosave_every = autosave_every
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._dirty_writes = 0
+        self._loaded_mtime = None
+        self.hits = 0
+        self.misses = 0
+
+        if self.path:
+            self.load()
+            atexit.register(self.save)
+
+    def get(self, affiliation: str) -> Optional[str]:
+        """
+        查询缓存
+
+        Args:
+            affiliation: 原始机构信息
+
+        Returns:
+            缓存的国家名称，未命中或已过期时返回None
+        """
+        key = affiliation_cache_key(affiliation)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None and self._disk_changed():
+                # 其他进程可能已经写入了该条目
+                self.load()
+                entry = self._lookup(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return entry[0]
+
+    def set(self, affiliation: str, country: str):
+        """
+        写入缓存
+
+        Args:
+            affiliation: 原始机构信息
+            country: 国家名称
+        """
+        key = affiliation_cache_key(affiliation)
+        with self._lock:
+            self._entries[key] = (country, time.time())
+            self._entries.move_to_end(key)
+            self._evict()
+            self._dirty_writes += 1
+            should_save = self.path and self._dirty_writes >= self.autosave_every
+
+        if should_save:
+            self.save()
+
+    def _lookup(self, key: str) -> Optional[tuple]:
+        """在持有锁的情况下查找条目并维护LRU顺序"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[1] >= self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _evict(self):
+        """淘汰超出容量的最久未使用条目"""
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _disk_changed(self) -> bool:
+        """检查持久化文件是否被其他进程更新过"""
+        if not self.path:
+            return False
+        try:
+            return os.path.getmtime(self.path) != self._loaded_mtime
+        except OSError:
+            return False
+
+    def _read_disk(self) -> Dict[str, tuple]:
+        """读取持久化文件，文件不存在、损坏或格式不符时返回空字典（格式不符的单个条目被跳过）"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取国家缓存文件失败，忽略: {e}")
+            return {}
+
+        if not isinstance(data, dict):
+            logger.warning("国家缓存文件格式不正确，忽略")
+            return {}
+        entries = {}
+        for key, value in data.items():
+            if (isinstance(value, (list, tuple)) and len(value) == 2 and isinstance(value[0], str)
+                    and isinstance(value[1], (int, float)) and not isinstance(value[1], bool)):
+                entries[key] = (value[0], float(value[1]))
+        if len(entries) < len(data):
+            logger.warning(f"国家缓存文件中有 {len(data) - len(entries)} 个条目格式不正确，已跳过")
+        return entries
+
+    @contextmanager
+    def _file_lock(self):
+        """跨进程的保存锁（Web服务和命令行同时运行时，读取-合并-替换不会互相覆盖对方的条目）"""
+        if fcntl is None:
+            yield
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def load(self):
+        """从磁盘合并条目（保留较新的时间戳）"""
+        if not self.path:
+            return
+        now = time.time()
+        disk_entries = self._read_disk()
+        with self._lock:
+            imported = []
+            for key, (country, timestamp) in disk_entries.items():
+                if now - timestamp >= self.ttl:
+                    continue
+                current = self._entries.get(key)
+                if current is None:
+                    imported.append((key, (country, timestamp)))
+                elif current[1] < timestamp:
+                    self._entries[key] = (country, timestamp)
+            # 新导入的条目视为最久未使用，已有条目保持原有的访问顺序
+            imported.sort(key=lambda item: item[1][1])
+            self._entries = OrderedDict(imported + list(self._entries.items()))
+            self._evict()
+            try:
+                self._loaded_mtime = os.path.getmtime(self.path)
+            except OSError:
+                self._loaded_mtime = None
+        logger.debug("国家缓存已加载，共 %s 条", len(self._entries))
+
+    def save(self):
+        """在文件锁内合并磁盘上的条目后原子写入持久化文件（没有新写入时不做任何事）"""
+        if not self.path:
+            return
+        with self._lock:
+            if self._dirty_writes == 0:
+                return
+        saved_writes = 0
+        try:
+            with self._file_lock():
+                with self._lock:
+                    self.load()
+                    snapshot = {key: list(value) for key, value in self._entries.items()}
+                    saved_writes, self._dirty_writes = self._dirty_writes, 0
+
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".country_cache_", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        json.dump(snapshot, f, ensure_ascii=False)
+                    os.replace(tmp_path, self.path)
+                except BaseException:
+                    # 写入或替换失败时删除临时文件，避免在缓存目录中残留
+                    try:
+                        os.unlink(tmp_path)
+                    except OSError:
+                        pass
+                    raise
+                with self._lock:
+                    self._loaded_mtime = os.path.getmtime(self.path)
+            logger.debug("国家缓存已保存，共 %s 条", len(snapshot))
+        except OSError as e:
+            logger.error(f"保存国家缓存失败: {e}")
+            # 保存失败时保留未写入的计数，下次（包括退出时）重试
+            with self._lock:
+                self._dirty_writes += saved_writes
+
+    def clear(self):
+        """清空内存中的缓存条目和统计"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            包含条目数、命中次数和命中率的字典
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+def create_country_cache() -> CountryCache:
+    """根据配置创建全局国家识别缓存"""
+    cache_config = config_manager.get_cache_config()
+    return CountryCache(
+        path=cache_config["country_cache_path"],
+        max_size=cache_config["country_cache_max_size"],
+        ttl=cache_config["country_cache_ttl"]
+    )
+
+
+# 全局实例
+country_cache = create_country_cache()
@@ -0,0 +1,254 @@
+"""
+离线国家识别模块
+基于内置地名词典构建Aho-Corasick自动机，在机构信息中一次扫描匹配国家、城市、
+省/州、机构名称和邮编格式，只有证据不足或相互冲突的机构才需要交给AI判断
+"""
+
+import re
+import logging
+from collections import deque, defaultdict
+from typing import Dict, List, Optional, Tuple, Any
+
+from src import gazetteer
+
+logger = logging.getLogger(__name__)
+
+# 各类证据的权重
+EVIDENCE_WEIGHTS = {
+    "country": 3.0,
+    "subdivision": 2.0,
+    "institution": 2.0,
+    "postal": 2.0,
+    "city": 1.0,
+}
+
+# 机构信息中越靠后的国家名称越可能是真实国家（通常以国家结尾）
+COUNTRY_POSITION_BONUS = 1.0
+
+
+class AhoCorasickAutomaton:
+    """
+    Aho-Corasick多模式匹配自动机
+
+    模式统一按小写构建，匹配时对文本做一次线性扫描即可找出所有模式的出现位置，
+    结果再经过单词边界检查，避免 "US" 匹配到 "Houston" 之类的误判。
+    """
+
+    def __init__(self):
+        """初始化空自动机"""
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.outputs: List[List[Tuple[int, Any]]] = [[]]
+        self.built = False
+
+    def add(self, pattern: str, payload: Any):
+        """
+        添加一个模式
+
+        Args:
+            pattern: 模式字符串（按小写匹配）
+            payload: 命中时返回的附加数据
+        """
+        pattern = pattern.lower()
+        if not pattern:
+            return
+
+        node = 0
+        for char in pattern:
+            next_node = self.goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+                self.goto[node][char] = next_node
+            node = next_node
+        self.outputs[node].append((len(pattern), payload))
+        self.built = False
+
+    def build(self):
+        """构建失败指针（广度优先）"""
+        queue = deque()
+        for next_node in self.goto[0].values():
+            self.fail[next_node] = 0
+            queue.append(next_node)
+
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self.goto[node].items():
+                queue.append(next_node)
+                fail_node = self.fail[node]
+                while fail_node and char not in self.goto[fail_node]:
+                    fail_node = self.fail[fail_node]
+                self.fail[next_node] = self.goto[fail_node].get(char, 0)
+                if self.fail[next_node] == next_node:
+                    self.fail[next_node] = 0
+                self.outputs[next_node] = self.outputs[next_node] + self.outputs[self.fail[next_node]]
+
+        self.built = True
+
+    def iter_matches(self, text: str):
+        """
+        扫描文本并返回所有命中
+
+        Args:
+            text: 已转为小写的文本
+
+        Yields:
+            (起始位置, 结束位置, payload)
+        """
+        if not self.built:
+            self.build()
+
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for length, payload in self.outputs[node]:
+                yield index - length + 1, index + 1, payload
+
+
+def _is_word_boundary(text: str, start: int, end: int) -> bool:
+    """检查命中两侧是否为单词边界"""
+    before_ok = start == 0 or not text[start - 1].isalnum()
+    after_ok = end >= len(text) or not text[end].isalnum()
+    return before_ok and after_ok
+
+
+class CountryResolver:
+    """离线国家识别器"""
+
+    def __init__(self):
+        """根据内置词典构建自动机"""
+        self.automaton = AhoCorasickAutomaton()
+        self.postal_patterns = [(country, re.compile(pattern)) for country, pattern in gazetteer.POSTAL_PATTERNS]
+
+        for country, names in gazetteer.COUNTRY_NAMES.items():
+            for name in names:
+                self._add(name, "country", [country])
+        for country, names in gazetteer.COUNTRY_ABBREVIATIONS.items():
+            for name in names:
+                self._add(name, "country", [country], case_sensitive=True)
+        for name, countries in gazetteer.AMBIGUOUS_NAMES.items():
+            self._add(name, "country", countries)
+        for country, names in gazetteer.SUBDIVISIONS.items():
+            for name in names:
+                self._add(name, "subdivision", [country])
+        for country, names in gazetteer.CITIES.items():
+            for name in names:
+                self._add(name, "city", [country])
+        for name, countries in gazetteer.AMBIGUOUS_CITIES.items():
+            self._add(name, "city", countries)
+        for country, names in gazetteer.INSTITUTIONS.items():
+            for name in names:
+                self._add(name, "institution", [country], case_sensitive=name in gazetteer.CASE_SENSITIVE_INSTITUTIONS)
+
+        self.automaton.build()
+
+    def _add(self, name: str, kind: str, countries: List[str], case_sensitive: bool = False):
+        """向自动机添加一个词典条目"""
+        self.automaton.add(name, {
+            "name": name,
+            "kind": kind,
+            "countries": countries,
+            "case_sensitive": case_sensitive
+        })
+
+    def _find_matches(self, text: str) -> List[Dict[str, Any]]:
+        """找出所有通过边界检查且互不重叠的词典命中（优先保留最长匹配）"""
+        lowered = text.lower()
+        same_length = len(lowered) == len(text)
+
+        candidates = []
+        for start, end, payload in self.automaton.iter_matches(lowered):
+            if not _is_word_boundary(lowered, start, end):
+                continue
+            if payload["case_sensitive"] and (not same_length or text[start:end] != payload["name"]):
+                continue
+            candidates.append((start, end, payload))
+
+        # 重叠时保留最长的命中，如 "New South Wales" 优先于 "Wales"
+        candidates.sort(key=lambda item: (item[0], -(item[1] - item[0])))
+        matches = []
+        last_end = -1
+        for start, end, payload in candidates:
+            if start < last_end:
+                continue
+            matches.append({"start": start, "end": end, **payload})
+            last_end = end
+        return matches
+
+    def resolve(self, affiliation: str) -> Dict[str, Any]:
+        """
+        从机构信息中识别国家
+
+        Args:
+            affiliation: 机构信息字符串
+
+        Returns:
+            识别结果字典，包括:
+                - country: 得分最高的中文国家名称，无证据时为None
+                - confidence: 0-1之间的置信度
+                - ambiguous: 是否需要交给AI进一步判断
+                - candidates: 各候选国家得分
+                - evidence: 命中的词典条目
+        """
+        if not affiliation:
+            return {"country": None, "confidence": 0.0, "ambiguous": True, "candidates": {}, "evidence": []}
+
+        scores = defaultdict(float)
+        evidence = []
+
+        matches = self._find_matches(affiliation)
+        last_country_start = max((m["start"] for m in matches if m["kind"] == "country" and len(m["countries"]) == 1), default=None)
+
+        for match in matches:
+            weight = EVIDENCE_WEIGHTS[match["kind"]] / len(match["countries"])
+            if match["kind"] == "country" and match["start"] == last_country_start:
+                weight += COUNTRY_POSITION_BONUS
+            for country in match["countries"]:
+                scores[country] += weight
+            evidence.append(f"{match['kind']}:{affiliation[match['start']:match['end']]}")
+
+        for country, pattern in self.postal_patterns:
+            postal_match = pattern.search(affiliation)
+            if postal_match:
+                scores[country] += EVIDENCE_WEIGHTS["postal"]
+                evidence.append(f"postal:{postal_match.group(0)}")
+
+        if not scores:
+            return {"country": None, "confidence": 0.0, "ambiguous": True, "candidates": {}, "evidence": []}
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        top_country, top_score = ranked[0]
+        second_score = ranked[1][1] if len(ranked) > 1 else 0.0
+        confidence = top_score / sum(scores.values())
+
+        # 证据太弱（如只有一个城市名）或前两名相差不大时视为有歧义
+        ambiguous = top_score < 2.0 or (second_score > 0 and top_score < 2 * second_score)
+
+        return {
+            "country": top_country,
+            "confidence": round(confidence, 3),
+            "ambiguous": ambiguous,
+            "candidates": dict(ranked),
+            "evidence": evidence
+        }
+
+
+# 全局实例（首次使用时构建）
+_country_resolver: Optional[CountryResolver] = None
+
+
+def get_country_resolver() -> CountryResolver:
+    """获取全局离线国家识别器"""
+    global _country_resolver
+    if _country_resolver is None:
+        _country_resolver = CountryResolver()
+    return _country_resolver
+
+
+def resolve_country(affiliation: str) -> Dict[str, Any]:
+    """从机构信息中离线识别国家（便捷函数）"""
+    return get_country_resolver().resolve(affiliation)
@@ -3,7 +3,7 @@
 """
 import re
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from collections import defaultdict
 import json
 
@@ -60,6 +60,19 @@ class DataParser:
             r'study\s+(?:with\s+)?(\d+)',
             r'total\s+of\s+(\d+)'
         ]
+        # 各样本量模式的置信度（与 sample_size_patterns 一一对应）：
+        # "120 participants"/"n=120" 基本可靠，"study 2019" 之类的宽松模式容易误匹配
+        self.sample_size_confidence = [0.85, 0.85, 0.9, 0.6, 0.3, 0.7]
+        # 筛选人数、分组人数或存在多个不同人数时的置信度（低于分级提取的默认阈值，仍由模型确认）
+        self.sample_size_partial_confidence = 0.5
+        self._population_noun = re.compile(r'participants|subjects|patients|cases|adults?|men|women', re.IGNORECASE)
+        # "screened 300 patients" / "300 patients were assessed for eligibility"
+        self._screened_before = re.compile(
+            r'\b(?:screened|screening|assessed|invited|approached|contacted)\b[^.;\d]{0,25}$', re.IGNORECASE)
+        self._screened_after = re.compile(
+            r'[^.;\d]{0,25}\b(?:were|was)\s+(?:screened|assessed|invited|approached|contacted)\b', re.IGNORECASE)
+        self._per_group_context = re.compile(
+            r'\s*(?:\)\s*)?(?:per|in\s+each|each|/)\s*(?:group|arm|condition|cohort)', re.IGNORECASE)
         
         # 剂量信息模式
         self.dosage_patterns = [
@@ -223,6 +236,78 @@ class DataParser:
         
         return "未明确说明"
 
+    @staticmethod
+    def _format_sample_size(sample_info: Dict[str, Any]) -> str:
+        """把 extract_sample_size 的结果格式化为与AI提取一致的字符串"""
+        if sample_info.get("extracted"):
+            return f"{sample_info['sample_size']}名参与者"
+        return "未明确说明"
+
+    def _sample_size_with_confidence(self, abstract: str) -> Tuple[str, float]:
+        """
+        提取样本量并评估置信度
+
+        所有模式的匹配都会收集起来：不合理的数字和没有人群名词的年份样式数字被丢弃；
+        筛选人数和分组人数只作为低置信度的候选。出现多个不同的人数时
+        （如筛选与入组、分组与总数）无法确定哪个是样本量，置信度降到分级提取的阈值以下，交给模型判断。
+
+        Returns:
+            (样本量字符串, 置信度)
+        """
+        clean_text = abstract.replace('\n', ' ').replace('\r', ' ')
+        candidates = []
+        for pattern, confidence in zip(self.sample_size_patterns, self.sample_size_confidence):
+            for match in re.finditer(pattern, clean_text, re.IGNORECASE):
+                value = int(match.group(1))
+                if value <= 0 or value > 100000:
+                    continue
+                # "in 2019" 之类的年份只在没有人群名词时丢弃，"2000 participants" 仍是样本量
+                if 1900 <= value <= 2100 and not self._population_noun.search(match.group(0)):
+                    continue
+                before = clean_text[max(0, match.start() - 40):match.start()]
+                after = clean_text[match.end():match.end() + 25]
+                partial = (self._screened_before.search(before) or self._screened_after.match(after)
+                           or self._per_group_context.match(after))
+                candidates.append((value, min(confidence, self.sample_size_partial_confidence) if partial else confidence))
+
+        if not candidates:
+            return "未明确说明", 0.0
+
+        # 同等可信度时取较大的数值（总人数通常大于分组人数）
+        value, confidence = max(candidates, key=lambda candidate: (candidate[1], candidate[0]))
+        if len({other for other, _ in candidates}) > 1:
+            confidence = min(confidence, self.sample_size_partial_confidence)
+        return f"{value}名参与者", confidence
+
+    def extract_with_confidence(self, abstract: str, title: str = "") -> Dict[str, Tuple[str, float]]:
+        """
+        使用正则规则提取字段并给出置信度，供分级提取判断哪些字段无需再交给模型
+
+        剂量/用法只能匹配到零散的数字和单位，无法体现AI提示词要求的用法描述，
+        因此置信度始终低于默认阈值，仍由模型提取。
+
+        Args:
+            abstract: 文献摘要文本
+            title: 文献标题
+
+        Returns:
+            Dict[str, Tuple[str, float]]: 字段名 -> (提取值, 置信度0-1)
+        """
+        try:
+            population = self.extract_population_info(abstract, title)
+            population_parts = 0 if population == "未明确说明" else len(population.split("; "))
+            dosage = self.extract_dosage_info(abstract, title)
+
+            return {
+                '样本量': self._sample_size_with_confidence(abstract),
+                # 年龄、BMI和健康状态中至少有两项时才视为完整的人群描述
+                '研究对象': (population, 0.8 if population_parts >= 2 else 0.4 * population_parts),
+                '推荐补充剂量/用法': (dosage, 0.0 if dosage == "未明确说明" else 0.4)
+            }
+        except Exception as e:
+            logger.error(f"规则提取出错: {e}")
+            return {}
+
     def parse_pubmed_record(self, article_data: Dict[str, Any]) -> Dict[str, Any]:
         """解析PubMed记录数据"""
         try:
@@ -370,7 +455,7 @@ class DataParser:
         try:
             info = {
                 '研究对象': self.extract_population_info(abstract, title),
-                '样本量': self.extract_sample_size(abstract, title),
+                '样本量': self._format_sample_size(self.extract_sample_size(abstract)),
                 '推荐补充剂量/用法': self.extract_dosage_info(abstract, title),
                 '研究持续时间': self.extract_duration(abstract, title),
                 '研究类型': self.extract_research_type(abstract, title)
@@ -6,9 +6,34 @@ import logging
 from typing import Dict, Any, Optional, List
 from bs4 import BeautifulSoup
 from src.config import ConfigManager
+from src.priority_scheduler import http_scheduler
+from src.cancellation import call_cancellable
 
 logger = logging.getLogger(__name__)
 
+# 正文中按段落分行的块级元素
+BODY_BLOCK_TAGS = ["p", "li", "h2", "h3", "h4"]
+
+
+def extract_block_text(body_elem) -> str:
+    """
+    按块级元素提取正文：每个段落/列表项/小标题一行，段内的行内元素（<i>、<sup>、引用链接等）用空格连接，
+    "n = 120<sup>3</sup> patients" 这样的句子不会被拆成多行
+
+    Args:
+        body_elem: 正文所在的BeautifulSoup元素
+
+    Returns:
+        按段落换行的正文文本；没有块级元素时返回整体文本
+    """
+    # 只取不再包含块级元素的最内层块（<li><p>...</p></li> 不重复输出）
+    blocks = [block for block in body_elem.find_all(BODY_BLOCK_TAGS) if not block.find(BODY_BLOCK_TAGS)]
+    lines = [block.get_text(" ", strip=True) for block in blocks]
+    lines = [line for line in lines if line]
+    if not lines:
+        return body_elem.get_text(" ", strip=True)
+    return "\n".join(lines)
+
 
 class FullTextExtractor:
     """全文内容提取器"""
@@ -39,10 +64,11 @@ class FullTextExtractor:
         try:
             # 构建PubMed页面URL
             pubmed_url = f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
-            print(f"🔍 正在检查: {pubmed_url}")
+            logger.debug("🔍 正在检查: %s", pubmed_url)
             
             # 获取页面内容
-            response = requests.get(pubmed_url, headers=self.headers, timeout=15)
+            with http_scheduler.slot():
+                response = call_cancellable(requests.get, pubmed_url, headers=self.headers, timeout=15)
             response.raise_for_status()
             
             # 解析HTML
@@ -89,14 +115,14 @@ class FullTextExtractor:
                     
                     if is_pmc_free:
                         pmc_free_link = link
-                        print(f"✅ 找到PMC免费全文链接: {reason}")
+                        logger.debug("✅ 找到PMC免费全文链接: %s", reason)
                         break
             
             if pmc_free_link:
                 href = pmc_free_link.get('href', '')
                 if href:
                     full_url = href if href.startswith('http') else f"https://pubmed.ncbi.nlm.nih.gov{href}"
-                    print(f"✅ 找到PMC免费全文链接: {full_url}")
+                    logger.debug("✅ 找到PMC免费全文链接: %s", full_url)
                     
                     # 获取更多标识信息
                     title_attr = pmc_free_link.get('title', '')
@@ -128,14 +154,14 @@ class FullTextExtractor:
             
             if full_text_section:
                 link_elements = full_text_section.find_all('a', href=True)
-                print(f"📄 在全文链接部分找到 {len(link_elements)} 个链接")
+                logger.debug("📄 在全文链接部分找到 %s 个链接", len(link_elements))
             else:
                 # 如果没有专门的全文链接部分，查找所有链接
                 link_elements = soup.find_all('a', href=True)
                 # 筛选可能相关的链接
                 link_elements = [link for link in link_elements if any(keyword in link.get('href', '').lower() 
                                    for keyword in ['pmc', 'europepmc', 'full', 'text', 'article'])]
-                print(f"🔗 找到 {len(link_elements)} 个相关链接")
+                logger.debug("🔗 找到 %s 个相关链接", len(link_elements))
             
             # 分析每个链接
             for link in link_elements:
@@ -202,7 +228,7 @@ class FullTextExtractor:
                 all_links.append(link_info)
                 if is_free:
                     free_links.append(link_info)
-                    print(f"✅ 发现免费链接: {text} - {link_info['url']} ({', '.join(free_indicators)})")
+                    logger.debug("✅ 发现免费链接: %s - %s (%s)", text, link_info['url'], ', '.join(free_indicators))
             
             # 确定最终结果
             if free_links:
@@ -228,7 +254,7 @@ class FullTextExtractor:
                 }
             
         except requests.RequestException as e:
-            print(f"❌ 网络请求失败: {str(e)}")
+            logger.warning("❌ 网络请求失败: %s", e)
             return {
                 "is_free": False,
                 "pmid": pmid,
@@ -236,7 +262,7 @@ class FullTextExtractor:
                 "message": "无法获取页面信息"
             }
         except Exception as e:
-            print(f"❌ 解析失败: {str(e)}")
+            logger.warning("❌ 解析失败: %s", e)
             return {
                 "is_free": False,
                 "pmid": pmid,
@@ -258,7 +284,7 @@ class FullTextExtractor:
         try:
             # 如果没有提供链接URL，先检查可用性
             if not link_url:
-                print(f"🔍 自动检测PMID {pmid}的免费全文链接...")
+                logger.debug("🔍 自动检测PMID %s的免费全文链接...", pmid)
                 availability = self.check_full_text_availability(pmid)
                 if not availability['is_free']:
                     return {
@@ -277,12 +303,13 @@ class FullTextExtractor:
                     }
                 
                 link_url = free_links[0]['url']
-                print(f"📄 选择免费全文链接: {link_url}")
+                logger.debug("📄 选择免费全文链接: %s", link_url)
             
-            print(f"📖 正在提取PMID {pmid}的全文内容...")
+            logger.debug("📖 正在提取PMID %s的全文内容...", pmid)
             
             # 获取全文页面
-            response = requests.get(link_url, headers=self.headers, timeout=self.timeout)
+            with http_scheduler.slot():
+                response = call_cancellable(requests.get, link_url, headers=self.headers, timeout=self.timeout)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -304,7 +331,7 @@ class FullTextExtractor:
             title_tag = soup.find('title')
             if title_tag:
                 content['debug_info']['page_title'] = title_tag.get_text(strip=True)
-                print(f"📄 页面标题: {title_tag.get_text(strip=True)[:100]}...")
+                logger.debug("📄 页面标题: %s...", title_tag.get_text(strip=True)[:100])
             
             # 提取标题 - 多种选择器
             title_selectors = [
@@ -324,7 +351,7 @@ class FullTextExtractor:
                     if title_text and len(title_text) > 10:  # 确保标题有意义
                         content['content']['title'] = title_text
                         content['debug_info']['extracted_elements'].append(f"标题: {selector}")
-                        print(f"✅ 提取标题: {title_text[:100]}...")
+                        logger.debug("✅ 提取标题: %s...", title_text[:100])
                         break
             
             # 提取摘要 - 多种选择器策略
@@ -350,7 +377,7 @@ class FullTextExtractor:
                     if abstract_text and len(abstract_text) > 50:  # 确保摘要有意义
                         content['content']['abstract'] = abstract_text
                         content['debug_info']['extracted_elements'].append(f"摘要: {selector}")
-                        print(f"✅ 提取摘要: {len(abstract_text)} 字符")
+                        logger.debug("✅ 提取摘要: %s 字符", len(abstract_text))
                         break
             
             # 提取关键词 - 多种位置
@@ -371,7 +398,7 @@ class FullTextExtractor:
                     if keywords_text and len(keywords_text) > 5:
                         content['content']['keywords'] = keywords_text
                         content['debug_info']['extracted_elements'].append(f"关键词: {selector}")
-                        print(f"✅ 提取关键词: {keywords_text[:100]}...")
+                        logger.debug("✅ 提取关键词: %s...", keywords_text[:100])
                         break
             
             # 提取作者信息
@@ -391,7 +418,7 @@ class FullTextExtractor:
                     if authors_text and len(authors_text) > 10:
                         content['content']['authors'] = authors_text
                         content['debug_info']['extracted_elements'].append(f"作者: {selector}")
-                        print(f"✅ 提取作者信息: {authors_text[:100]}...")
+                        logger.debug("✅ 提取作者信息: %s...", authors_text[:100])
                         break
             
             # 提取正文内容 - 更智能的策略
@@ -419,12 +446,12 @@ class FullTextExtractor:
                         for unwanted in body_elem.select(unwanted_selector):
                             unwanted.decompose()
                     
-                    # 提取文本
-                    body_text = body_elem.get_text(strip=True)
+                    # 提取文本（按段落换行，便于按段落挑选相关内容）
+                    body_text = extract_block_text(body_elem)
                     if body_text and len(body_text) > 200:  # 确保正文内容有意义
                         content['content']['body_text'] = body_text
                         content['debug_info']['extracted_elements'].append(f"正文: {selector}")
-                        print(f"✅ 提取正文: {len(body_text)} 字符")
+                        logger.debug("✅ 提取正文: %s 字符", len(body_text))
                         break
             
             # 提取参考文献
@@ -444,7 +471,7 @@ class FullTextExtractor:
                     if refs_text and len(refs_text) > 50:
                         content['content']['references'] = refs_text
                         content['debug_info']['extracted_elements'].append(f"参考文献: {selector}")
-                        print(f"✅ 提取参考文献: {len(refs_text)} 字符")
+                        logger.debug("✅ 提取参考文献: %s 字符", len(refs_text))
                         break
             
             # 统计提取的元素
@@ -454,23 +481,23 @@ class FullTextExtractor:
             if len(content['content']) >= 2:  # 至少提取到标题和摘要
                 content['extraction_success'] = True
                 content['message'] = f"成功提取{len(content['content'])}个部分的内容"
-                print(f"✅ 全文提取完成，共提取{len(content['content'])}个部分")
+                logger.debug("✅ 全文提取完成，共提取%s个部分", len(content['content']))
             else:
                 content['extraction_success'] = False
                 content['message'] = f"提取内容不完整，仅获取到{len(content['content'])}个部分"
-                print(f"⚠️ 提取内容不完整，仅获取到{len(content['content'])}个部分")
+                logger.debug("⚠️ 提取内容不完整，仅获取到%s个部分", len(content['content']))
             
             # 如果完全没有提取到内容，提供调试信息
             if not content['content']:
                 content['extraction_success'] = False
                 content['message'] = "未能提取到任何有效内容"
                 content['debug_info']['no_content_reason'] = "页面可能需要特殊处理或链接无效"
-                print(f"❌ 未能提取到任何有效内容")
+                logger.debug("❌ 未能提取到任何有效内容")
             
             return content
             
         except requests.RequestException as e:
-            print(f"❌ 网络请求失败: {str(e)}")
+            logger.warning("❌ 网络请求失败: %s", e)
             return {
                 "success": False,
                 "pmid": pmid,
@@ -479,7 +506,7 @@ class FullTextExtractor:
                 "debug_info": {"error_type": "network_error"}
             }
         except Exception as e:
-            print(f"❌ 提取失败: {str(e)}")
+            logger.warning("❌ 提取失败: %s", e)
             return {
                 "success": False,
                 "pmid": pmid,
@@ -498,11 +525,10 @@ class FullTextExtractor:
         Returns:
             完整的分析结果
         """
-        print(f"\n🔍 开始分析PMID: {pmid}")
-        print("=" * 60)
+        logger.debug("🔍 开始分析PMID: %s", pmid)
         
         # 步骤1：检查全文可用性
-        print("步骤1: 检查全文可用性...")
+        logger.debug("步骤1: 检查全文可用性...")
         availability = self.check_full_text_availability(pmid)
         
         # 初始化结果
@@ -523,16 +549,16 @@ class FullTextExtractor:
         }
         
         if not availability.get('is_free', False):
-            print(f"❌ PMID {pmid} 无免费全文: {availability.get('message', '未知原因')}")
+            logger.debug("❌ PMID %s 无免费全文: %s", pmid, availability.get('message', '未知原因'))
             result['debug_info']['no_free_reason'] = availability.get('message', '未知原因')
             result['debug_info']['availability_source'] = availability.get('source', 'unknown')
             return result
         
-        print(f"✅ PMID {pmid} 提供免费全文 (来源: {availability.get('source', 'unknown')})")
+        logger.debug("✅ PMID %s 提供免费全文 (来源: %s)", pmid, availability.get('source', 'unknown'))
         result['debug_info']['extraction_attempted'] = True
         
         # 步骤2：提取全文内容
-        print("\n步骤2: 提取全文内容...")
+        logger.debug("步骤2: 提取全文内容...")
         try:
             full_text = self.extract_full_text_content(pmid)
             result['full_text_extraction'] = full_text
@@ -542,50 +568,49 @@ class FullTextExtractor:
                 result['debug_info']['extraction_details'] = full_text['debug_info']
             
             if full_text.get('extraction_success', False):
-                print(f"✅ 成功提取PMID {pmid}的全文内容")
+                logger.debug("✅ 成功提取PMID %s的全文内容", pmid)
                 content_info = full_text.get('content', {})
                 result['extraction_success'] = True
                 result['extracted_content'] = content_info
                 
                 # 详细输出提取的内容信息
-                print(f"   📄 标题: {content_info.get('title', 'N/A')[:100]}...")
+                logger.debug("📄 标题: %s...", content_info.get('title', 'N/A')[:100])
                 if 'abstract' in content_info:
-                    print(f"   📝 摘要: {len(content_info['abstract'])} 字符")
+                    logger.debug("📝 摘要: %s 字符", len(content_info['abstract']))
                 if 'body_text' in content_info:
-                    print(f"   📖 正文: {len(content_info['body_text'])} 字符")
+                    logger.debug("📖 正文: %s 字符", len(content_info['body_text']))
                 if 'keywords' in content_info:
-                    print(f"   🔑 关键词: {len(content_info['keywords'])} 字符")
+                    logger.debug("🔑 关键词: %s 字符", len(content_info['keywords']))
                 if 'authors' in content_info:
-                    print(f"   👥 作者信息: {len(content_info['authors'])} 字符")
+                    logger.debug("👥 作者信息: %s 字符", len(content_info['authors']))
                 if 'references' in content_info:
-                    print(f"   📚 参考文献: {len(content_info['references'])} 字符")
+                    logger.debug("📚 参考文献: %s 字符", len(content_info['references']))
                 
                 # 统计提取的内容部分数
                 content_parts = len([k for k, v in content_info.items() if v])
-                print(f"   📊 总计提取了 {content_parts} 个内容部分")
+                logger.debug("📊 总计提取了 %s 个内容部分", content_parts)
                 
             else:
-                print(f"❌ PMID {pmid} 全文内容提取失败: {full_text.get('message', '未知错误')}")
+                logger.debug("❌ PMID %s 全文内容提取失败: %s", pmid, full_text.get('message', '未知错误'))
                 result['message'] = full_text.get('message', '提取失败')
                 
                 # 添加错误调试信息
                 if 'error' in full_text:
                     result['debug_info']['extraction_error'] = full_text['error']
-                    print(f"   🔍 错误详情: {full_text['error']}")
+                    logger.debug("🔍 错误详情: %s", full_text['error'])
                 
                 if 'debug_info' in full_text and 'no_content_reason' in full_text['debug_info']:
                     result['debug_info']['no_content_reason'] = full_text['debug_info']['no_content_reason']
-                    print(f"   🔍 失败原因: {full_text['debug_info']['no_content_reason']}")
+                    logger.debug("🔍 失败原因: %s", full_text['debug_info']['no_content_reason'])
         
         except Exception as e:
-            print(f"❌ 全文提取过程出错: {str(e)}")
+            logger.warning("❌ 全文提取过程出错: %s", e)
             result['message'] = f"全文提取过程出错: {str(e)}"
             result['debug_info']['extraction_error'] = str(e)
         
-        print(f"\n📊 PMID {pmid} 分析完成")
-        print(f"   - 免费全文: {'是' if result['is_free'] else '否'}")
-        print(f"   - 提取成功: {'是' if result['extraction_success'] else '否'}")
-        print("=" * 60)
+        logger.debug("📊 PMID %s 分析完成", pmid)
+        logger.debug("- 免费全文: %s", '是' if result['is_free'] else '否')
+        logger.debug("- 提取成功: %s", '是' if result['extraction_success'] else '否')
         
         return result
 
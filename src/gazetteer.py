@@ -0,0 +1,289 @@
+"""
+离线国家地名词典
+为国家识别提供国家名称、主要城市、省/州、知名机构和邮编格式等数据，
+输出统一使用标准中文国家名称
+"""
+
+# ================= 国家名称及常见写法 =================
+# 中文国家名称 -> 英文名称、别名、形容词形式（匹配时不区分大小写）
+COUNTRY_NAMES = {
+    "美国": ["United States", "United States of America", "U.S.A.", "U.S.", "America"],
+    "中国": ["China", "P.R. China", "PR China", "People's Republic of China", "Peoples Republic of China"],
+    "英国": ["United Kingdom", "Great Britain", "England", "Scotland", "Wales", "Northern Ireland"],
+    "德国": ["Germany", "Deutschland"],
+    "日本": ["Japan"],
+    "澳大利亚": ["Australia"],
+    "加拿大": ["Canada"],
+    "法国": ["France"],
+    "意大利": ["Italy", "Italia"],
+    "西班牙": ["Spain", "España"],
+    "荷兰": ["Netherlands", "The Netherlands", "Holland"],
+    "韩国": ["South Korea", "Republic of Korea", "Korea"],
+    "朝鲜": ["North Korea", "Democratic People's Republic of Korea"],
+    "印度": ["India"],
+    "新加坡": ["Singapore"],
+    "台湾": ["Taiwan", "Republic of China"],
+    "香港": ["Hong Kong", "Hong Kong SAR"],
+    "澳门": ["Macau", "Macao"],
+    "巴西": ["Brazil", "Brasil"],
+    "墨西哥": ["Mexico", "México"],
+    "阿根廷": ["Argentina"],
+    "智利": ["Chile"],
+    "哥伦比亚": ["Colombia"],
+    "秘鲁": ["Peru"],
+    "委内瑞拉": ["Venezuela"],
+    "厄瓜多尔": ["Ecuador"],
+    "乌拉圭": ["Uruguay"],
+    "古巴": ["Cuba"],
+    "瑞士": ["Switzerland", "Schweiz", "Suisse"],
+    "奥地利": ["Austria", "Österreich"],
+    "比利时": ["Belgium", "Belgique"],
+    "瑞典": ["Sweden", "Sverige"],
+    "挪威": ["Norway", "Norge"],
+    "丹麦": ["Denmark", "Danmark"],
+    "芬兰": ["Finland", "Suomi"],
+    "冰岛": ["Iceland"],
+    "爱尔兰": ["Ireland", "Republic of Ireland", "Eire"],
+    "葡萄牙": ["Portugal"],
+    "希腊": ["Greece", "Hellas"],
+    "波兰": ["Poland", "Polska"],
+    "捷克": ["Czech Republic", "Czechia"],
+    "斯洛伐克": ["Slovakia", "Slovak Republic"],
+    "匈牙利": ["Hungary"],
+    "罗马尼亚": ["Romania"],
+    "保加利亚": ["Bulgaria"],
+    "塞尔维亚": ["Serbia"],
+    "克罗地亚": ["Croatia"],
+    "斯洛文尼亚": ["Slovenia"],
+    "乌克兰": ["Ukraine"],
+    "俄罗斯": ["Russia", "Russian Federation"],
+    "白俄罗斯": ["Belarus"],
+    "立陶宛": ["Lithuania"],
+    "拉脱维亚": ["Latvia"],
+    "爱沙尼亚": ["Estonia"],
+    "卢森堡": ["Luxembourg"],
+    "马耳他": ["Malta"],
+    "塞浦路斯": ["Cyprus"],
+    "土耳其": ["Turkey", "Türkiye", "Turkiye"],
+    "以色列": ["Israel"],
+    "伊朗": ["Iran", "Islamic Republic of Iran"],
+    "伊拉克": ["Iraq"],
+    "沙特阿拉伯": ["Saudi Arabia", "Kingdom of Saudi Arabia"],
+    "阿联酋": ["United Arab Emirates", "UAE"],
+    "卡塔尔": ["Qatar"],
+    "科威特": ["Kuwait"],
+    "阿曼": ["Oman"],
+    "巴林": ["Bahrain"],
+    "约旦": ["Jordan"],
+    "黎巴嫩": ["Lebanon"],
+    "叙利亚": ["Syria"],
+    "埃及": ["Egypt"],
+    "南非": ["South Africa"],
+    "尼日利亚": ["Nigeria"],
+    "肯尼亚": ["Kenya"],
+    "埃塞俄比亚": ["Ethiopia"],
+    "加纳": ["Ghana"],
+    "坦桑尼亚": ["Tanzania"],
+    "乌干达": ["Uganda"],
+    "摩洛哥": ["Morocco"],
+    "阿尔及利亚": ["Algeria"],
+    "突尼斯": ["Tunisia"],
+    "喀麦隆": ["Cameroon"],
+    "苏丹": ["Sudan"],
+    "巴基斯坦": ["Pakistan"],
+    "孟加拉国": ["Bangladesh"],
+    "斯里兰卡": ["Sri Lanka"],
+    "尼泊尔": ["Nepal"],
+    "泰国": ["Thailand"],
+    "越南": ["Vietnam", "Viet Nam"],
+    "马来西亚": ["Malaysia"],
+    "印度尼西亚": ["Indonesia"],
+    "菲律宾": ["Philippines"],
+    "缅甸": ["Myanmar"],
+    "柬埔寨": ["Cambodia"],
+    "蒙古": ["Mongolia"],
+    "哈萨克斯坦": ["Kazakhstan"],
+    "新西兰": ["New Zealand"],
+}
+
+# 只能按原样大小写匹配的缩写（避免 "us"、"uk" 等普通单词误匹配）
+COUNTRY_ABBREVIATIONS = {
+    "美国": ["USA", "US"],
+    "英国": ["UK"],
+    "中国": ["PRC"],
+}
+
+# 同名地区，出现时需结合其他证据判断
+AMBIGUOUS_NAMES = {
+    "Georgia": ["美国", "格鲁吉亚"],
+}
+
+# ================= 省/州 =================
+SUBDIVISIONS = {
+    "美国": [
+        "Alabama", "Alaska", "Arizona", "Arkansas", "California", "Colorado", "Connecticut",
+        "Delaware", "Florida", "Hawaii", "Idaho", "Illinois", "Indiana", "Iowa", "Kansas",
+        "Kentucky", "Louisiana", "Maine", "Maryland", "Massachusetts", "Michigan", "Minnesota",
+        "Mississippi", "Missouri", "Montana", "Nebraska", "Nevada", "New Hampshire", "New Jersey",
+        "New Mexico", "New York", "North Carolina", "North Dakota", "Ohio", "Oklahoma", "Oregon",
+        "Pennsylvania", "Rhode Island", "South Carolina", "South Dakota", "Tennessee", "Texas",
+        "Utah", "Vermont", "Virginia", "Washington", "West Virginia", "Wisconsin", "Wyoming",
+        "District of Columbia", "New England",
+    ],
+    "中国": [
+        "Anhui", "Fujian", "Gansu", "Guangdong", "Guangxi", "Guizhou", "Hainan", "Hebei",
+        "Heilongjiang", "Henan", "Hubei", "Hunan", "Inner Mongolia", "Jiangsu", "Jiangxi",
+        "Jilin", "Liaoning", "Ningxia", "Qinghai", "Shaanxi", "Shandong", "Shanxi", "Sichuan",
+        "Xinjiang", "Yunnan", "Zhejiang",
+    ],
+    "加拿大": [
+        "Alberta", "British Columbia", "Manitoba", "New Brunswick", "Newfoundland",
+        "Nova Scotia", "Ontario", "Quebec", "Québec", "Saskatchewan",
+    ],
+    "澳大利亚": [
+        "New South Wales", "Queensland", "South Australia", "Tasmania", "Western Australia",
+        "Australian Capital Territory", "Northern Territory",
+    ],
+    "印度": ["Karnataka", "Kerala", "Tamil Nadu", "Maharashtra", "Uttar Pradesh", "West Bengal", "Gujarat", "Punjab"],
+}
+
+# ================= 主要城市 =================
+CITIES = {
+    "美国": [
+        "New York City", "Los Angeles", "Chicago", "Houston", "Philadelphia", "Phoenix",
+        "San Antonio", "San Diego", "Dallas", "San Francisco", "Seattle", "Boston",
+        "Baltimore", "Atlanta", "Miami", "Denver", "Minneapolis", "Pittsburgh", "Cleveland",
+        "Nashville", "St. Louis", "Ann Arbor", "New Haven", "Palo Alto", "Stanford",
+        "Rochester, MN", "Bethesda", "Chapel Hill", "Salt Lake City", "Portland",
+        "Sacramento", "Detroit", "Cincinnati", "Indianapolis", "Madison", "Omaha",
+        "Gainesville", "Tampa", "Orlando", "Irvine", "Berkeley", "La Jolla",
+        "Baton Rouge", "New Orleans", "Birmingham, AL", "Charlottesville", "Richmond, VA",
+    ],
+    "中国": [
+        "Beijing", "Shanghai", "Guangzhou", "Shenzhen", "Tianjin", "Chongqing", "Wuhan",
+        "Chengdu", "Hangzhou", "Nanjing", "Xi'an", "Xian", "Changsha", "Shenyang", "Harbin",
+        "Jinan", "Qingdao", "Zhengzhou", "Kunming", "Fuzhou", "Xiamen", "Suzhou", "Dalian",
+        "Hefei", "Nanchang", "Nanning", "Lanzhou", "Taiyuan", "Shijiazhuang", "Changchun",
+        "Urumqi", "Guiyang", "Hohhot", "Wenzhou", "Ningbo", "Wuxi", "Zhuhai", "Shantou",
+    ],
+    "英国": [
+        "London", "Oxford", "Cambridge", "Manchester", "Edinburgh", "Glasgow", "Liverpool",
+        "Leeds", "Sheffield", "Bristol", "Newcastle upon Tyne", "Nottingham", "Leicester",
+        "Southampton", "Cardiff", "Belfast", "Aberdeen", "Dundee", "Exeter", "Norwich",
+    ],
+    "德国": [
+        "Berlin", "Munich", "München", "Hamburg", "Cologne", "Köln", "Frankfurt", "Heidelberg",
+        "Stuttgart", "Düsseldorf", "Dusseldorf", "Leipzig", "Dresden", "Hannover", "Hanover",
+        "Freiburg", "Tübingen", "Tubingen", "Bonn", "Mainz", "Würzburg", "Göttingen", "Kiel",
+    ],
+    "日本": [
+        "Tokyo", "Osaka", "Kyoto", "Yokohama", "Nagoya", "Sapporo", "Kobe", "Fukuoka",
+        "Sendai", "Hiroshima", "Chiba", "Tsukuba", "Okayama", "Kumamoto", "Niigata", "Nagasaki",
+    ],
+    "澳大利亚": ["Sydney", "Melbourne", "Brisbane", "Adelaide", "Canberra", "Hobart", "Darwin"],
+    "加拿大": [
+        "Toronto", "Montreal", "Montréal", "Vancouver", "Ottawa", "Calgary", "Edmonton",
+        "Winnipeg", "Halifax", "Hamilton, Ontario", "Quebec City", "Saskatoon",
+    ],
+    "法国": [
+        "Paris", "Lyon", "Marseille", "Toulouse", "Bordeaux", "Lille", "Nantes", "Strasbourg",
+        "Montpellier", "Rennes", "Grenoble", "Nice", "Dijon", "Clermont-Ferrand",
+    ],
+    "意大利": [
+        "Rome", "Roma", "Milan", "Milano", "Naples", "Napoli", "Turin", "Torino", "Florence",
+        "Firenze", "Bologna", "Padua", "Padova", "Genoa", "Genova", "Pisa", "Verona", "Palermo",
+    ],
+    "西班牙": ["Madrid", "Barcelona", "Valencia", "Seville", "Sevilla", "Bilbao", "Granada", "Zaragoza", "Malaga", "Málaga"],
+    "荷兰": ["Amsterdam", "Rotterdam", "Utrecht", "Leiden", "Groningen", "Nijmegen", "Maastricht", "Eindhoven", "The Hague"],
+    "韩国": ["Seoul", "Busan", "Incheon", "Daegu", "Daejeon", "Gwangju", "Suwon"],
+    "印度": ["Mumbai", "New Delhi", "Delhi", "Bangalore", "Bengaluru", "Chennai", "Kolkata", "Hyderabad", "Pune", "Chandigarh"],
+    "台湾": ["Taipei", "Kaohsiung", "Taichung", "Tainan", "Hsinchu"],
+    "巴西": ["São Paulo", "Sao Paulo", "Rio de Janeiro", "Belo Horizonte", "Porto Alegre", "Brasília", "Curitiba"],
+    "墨西哥": ["Mexico City", "Guadalajara", "Monterrey"],
+    "瑞士": ["Zurich", "Zürich", "Geneva", "Genève", "Basel", "Bern", "Lausanne"],
+    "奥地利": ["Vienna", "Wien", "Graz", "Innsbruck", "Salzburg"],
+    "比利时": ["Brussels", "Leuven", "Ghent", "Gent", "Antwerp", "Liège"],
+    "瑞典": ["Stockholm", "Gothenburg", "Göteborg", "Uppsala", "Lund", "Umeå", "Linköping"],
+    "挪威": ["Oslo", "Bergen", "Trondheim", "Tromsø"],
+    "丹麦": ["Copenhagen", "Aarhus", "Odense"],
+    "芬兰": ["Helsinki", "Turku", "Tampere", "Oulu"],
+    "爱尔兰": ["Dublin", "Galway"],
+    "葡萄牙": ["Lisbon", "Lisboa", "Porto", "Coimbra"],
+    "希腊": ["Athens", "Thessaloniki"],
+    "波兰": ["Warsaw", "Krakow", "Kraków", "Wroclaw", "Gdansk", "Poznan"],
+    "以色列": ["Tel Aviv", "Jerusalem", "Haifa", "Beer Sheva"],
+    "伊朗": ["Tehran", "Isfahan", "Shiraz", "Mashhad", "Tabriz"],
+    "土耳其": ["Istanbul", "Ankara", "Izmir"],
+    "新西兰": ["Auckland", "Wellington", "Christchurch", "Dunedin"],
+    "泰国": ["Bangkok", "Chiang Mai"],
+    "马来西亚": ["Kuala Lumpur"],
+    "埃及": ["Cairo", "Alexandria"],
+    "南非": ["Cape Town", "Johannesburg", "Pretoria", "Durban"],
+    "俄罗斯": ["Moscow", "Saint Petersburg", "St. Petersburg", "Novosibirsk"],
+    "格鲁吉亚": ["Tbilisi"],
+}
+
+# 在多个国家都有的城市名（权重会在候选国家之间分摊）
+AMBIGUOUS_CITIES = {
+    "Cambridge": ["英国", "美国"],
+    "Birmingham": ["英国", "美国"],
+    "London": ["英国", "加拿大"],
+    "Hamilton": ["加拿大", "新西兰"],
+    "Richmond": ["美国", "英国"],
+    "Perth": ["澳大利亚", "英国"],
+    "Victoria": ["加拿大", "澳大利亚"],
+    "Durham": ["英国", "美国"],
+}
+
+# ================= 知名机构 =================
+INSTITUTIONS = {
+    "美国": [
+        "Harvard", "Yale", "Stanford University", "Massachusetts Institute of Technology", "MIT",
+        "Johns Hopkins", "Mayo Clinic", "Columbia University", "Cornell", "Duke University",
+        "Princeton", "University of Pennsylvania", "UCLA", "UCSF", "UC Davis", "UC San Diego",
+        "Emory University", "Vanderbilt", "Northwestern University", "Tufts University",
+        "National Institutes of Health", "NIH", "Centers for Disease Control", "CDC",
+        "Cleveland Clinic", "Baylor College of Medicine", "Pennington Biomedical",
+    ],
+    "中国": [
+        "Tsinghua", "Peking University", "Fudan", "Zhejiang University", "Sun Yat-sen",
+        "Shanghai Jiao Tong", "Chinese Academy of Sciences", "Chinese Academy of Medical Sciences",
+        "Sichuan University", "Wuhan University", "Huazhong University", "Nanjing Medical University",
+        "Capital Medical University", "Central South University",
+    ],
+    "英国": [
+        "University of Oxford", "University of Cambridge", "Imperial College", "University College London",
+        "King's College London", "London School of Hygiene", "NHS",
+    ],
+    "德国": ["Charité", "Charite", "Max Planck", "Helmholtz", "Ludwig-Maximilians", "Universitätsklinikum"],
+    "日本": ["University of Tokyo", "Osaka University", "Kyoto University", "Tohoku University", "Keio University"],
+    "澳大利亚": ["Monash", "University of Sydney", "University of Melbourne", "CSIRO"],
+    "加拿大": ["McGill", "University of Toronto", "McMaster", "University of British Columbia"],
+    "法国": ["Sorbonne", "INSERM", "Inserm", "CNRS", "Institut Pasteur", "INRAE"],
+    "意大利": ["University of Bologna", "Sapienza"],
+    "荷兰": ["Wageningen", "Erasmus MC", "Radboud"],
+    "韩国": ["KAIST", "Seoul National University", "Yonsei", "Korea University"],
+    "印度": ["All India Institute of Medical Sciences", "AIIMS", "Indian Institute of Technology"],
+    "新加坡": ["National University of Singapore", "NUS", "Nanyang Technological University", "NTU"],
+    "瑞典": ["Karolinska"],
+    "瑞士": ["ETH Zurich", "EPFL"],
+    "丹麦": ["Rigshospitalet", "Steno Diabetes Center"],
+}
+
+# 只能按原样大小写匹配的机构缩写
+CASE_SENSITIVE_INSTITUTIONS = {"MIT", "NIH", "CDC", "NHS", "KAIST", "AIIMS", "NUS", "NTU", "CNRS", "INSERM", "INRAE", "UCLA", "UCSF", "EPFL", "CSIRO"}
+
+# ================= 邮编格式 =================
+# (中文国家名称, 正则表达式)，在原始大小写文本上匹配
+POSTAL_PATTERNS = [
+    # 美国：州缩写 + 5位邮编，如 "MD 21287"
+    ("美国", r"\b(?:A[KLRZ]|C[AOT]|D[CE]|FL|GA|HI|I[ADLN]|K[SY]|LA|M[ADEINOST]|N[CDEHJMVY]|O[HKR]|PA|RI|S[CD]|T[NX]|UT|V[AT]|W[AIVY])\s+\d{5}(?:-\d{4})?\b"),
+    # 加拿大："A1A 1A1"
+    ("加拿大", r"\b[ABCEGHJ-NPRSTVXY]\d[ABCEGHJ-NPRSTV-Z]\s?\d[ABCEGHJ-NPRSTV-Z]\d\b"),
+    # 英国："SW7 2AZ"
+    ("英国", r"\b[A-Z]{1,2}\d[A-Z\d]?\s\d[ABD-HJLNP-UW-Z]{2}\b"),
+    # 荷兰："1234 AB"
+    ("荷兰", r"\b[1-9]\d{3}\s?[A-Z]{2}\s+[A-Z][a-z]+"),
+    # 巴西："12345-678"
+    ("巴西", r"\b\d{5}-\d{3}\b"),
+]
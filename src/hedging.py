@@ -0,0 +1,196 @@
+"""
+请求对冲模块
+当一次AI请求超过该模型近期的p90延迟仍未返回时，用另一个密钥发出第二个相同请求，
+先返回有效结果的一方胜出，另一方通过取消令牌和关闭HTTP会话立即中止（释放其并发名额和未使用的额度）；
+对冲请求数受预算比例限制，避免token消耗翻倍
+"""
+
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Optional, Any
+
+import requests
+
+from src.config import config_manager
+from src.route_selector import RouteSelector, route_selector
+from src.cancellation import CancellationToken, get_cancellation_token, set_cancellation_token
+
+logger = logging.getLogger(__name__)
+
+
+class HedgedAttempt:
+    """一次（主或对冲）请求的运行句柄：取消令牌 + 独立的HTTP会话"""
+
+    def __init__(self):
+        self.cancel_token = CancellationToken()
+        self.session = requests.Session()
+        self.future = None
+
+    def cancel(self):
+        """中止请求：取消令牌（等待中的请求立即返回）并关闭会话（正在进行的连接会被断开）"""
+        self.cancel_token.cancel()
+        self.session.close()
+
+
+class RequestHedger:
+    """
+    请求对冲执行器（线程安全）
+
+    对冲延迟取 (端点, 模型) 最近成功请求延迟的分位数，样本不足时不对冲；
+    对冲请求数不超过主请求数 × budget_ratio。
+    """
+
+    def __init__(self, config: Optional[dict] = None, selector: Optional[RouteSelector] = None):
+        """
+        初始化对冲执行器
+
+        Args:
+            config: 对冲配置字典（见 src.config.HEDGING_CONFIG）
+            selector: 提供延迟分位数的路由选择器
+        """
+        config = config or {}
+        self.enabled = config.get("enabled", False)
+        self.quantile = config.get("quantile", 0.9)
+        self.min_delay = config.get("min_delay", 2.0)
+        self.min_samples = config.get("min_samples", 20)
+        self.budget_ratio = config.get("budget_ratio", 0.1)
+        self.selector = selector
+        self.primary_count = 0
+        self.hedge_count = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=config.get("max_workers", 16), thread_name_prefix="hedge")
+
+    def hedge_delay(self, endpoint: str, model: str) -> Optional[float]:
+        """
+        计算发出对冲请求前的等待时间
+
+        Args:
+            endpoint: API端点
+            model: 模型名称
+
+        Returns:
+            等待秒数，未启用或样本不足时返回None
+        """
+        if not self.enabled or not self.selector:
+            return None
+        percentile = self.selector.latency_percentile(endpoint, model, self.quantile, self.min_samples)
+        if percentile is None:
+            return None
+        return max(self.min_delay, percentile)
+
+    def _try_consume_budget(self) -> bool:
+        """检查并占用一次对冲预算"""
+        with self._lock:
+            if self.hedge_count + 1 > self.primary_count * self.budget_ratio:
+                return False
+            self.hedge_count += 1
+            return True
+
+    def _launch(self, request_fn: Callable[[CancellationToken, requests.Session], Any]) -> HedgedAttempt:
+        """
+        在线程池中启动一次请求
+
+        请求线程以该请求自己的令牌作为当前取消令牌（任务取消时一并取消），
+        落败后排队、等待额度和进行中的调用都会立即中断。
+        """
+        attempt = HedgedAttempt()
+        unregister = get_cancellation_token().on_cancel(attempt.cancel)
+        context = contextvars.copy_context()
+
+        def run():
+            set_cancellation_token(attempt.cancel_token)
+            return request_fn(attempt.cancel_token, attempt.session)
+
+        attempt.future = self._executor.submit(context.run, run)
+        attempt.future.add_done_callback(lambda _: unregister())
+        return attempt
+
+    @staticmethod
+    def _result(attempt: HedgedAttempt) -> Any:
+        """读取已完成请求的结果，异常视为无结果"""
+        try:
+            return attempt.future.result()
+        except Exception as e:
+            logger.error(f"对冲请求执行出错: {e}")
+            return None
+
+    def run(self, primary_fn: Callable[[CancellationToken, requests.Session], Any], delay: float,
+            start_hedge: Callable[[], Optional[Callable[[CancellationToken, requests.Session], Any]]]) -> Any:
+        """
+        执行主请求，超过等待时间未返回时发出对冲请求
+
+        对冲的单位是一次请求（不含重试），重试由调用方在对冲之外进行。
+
+        Args:
+            primary_fn: 主请求函数，参数为 (取消令牌, HTTP会话)，返回结果或None；
+                令牌取消后应立即返回并释放其占用的并发名额和额度
+            delay: 发出对冲请求前的等待时间（秒）
+            start_hedge: 准备对冲请求的函数（如获取另一个密钥），无法对冲时返回None
+
+        Returns:
+            最先返回的有效结果；都失败时返回None
+        """
+        with self._lock:
+            self.primary_count += 1
+
+        primary = self._launch(primary_fn)
+        done, _ = wait([primary.future], timeout=delay)
+        if done or not self._try_consume_budget():
+            result = self._result(primary)
+            primary.session.close()
+            return result
+
+        hedge_fn = start_hedge()
+        if hedge_fn is None:
+            # 没有可用于对冲的密钥，归还预算
+            with self._lock:
+                self.hedge_count -= 1
+            result = self._result(primary)
+            primary.session.close()
+            return result
+
+        logger.info(f"请求超过 {delay:.1f} 秒未返回，发出对冲请求")
+        hedge = self._launch(hedge_fn)
+        pending = {primary.future: primary, hedge.future: hedge}
+        result = None
+        winner = None
+        while pending and result is None:
+            finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in finished:
+                attempt = pending.pop(future)
+                attempt.session.close()
+                result = self._result(attempt)
+                if result is not None:
+                    winner = attempt
+                    break
+
+        # 中止仍在进行的一方
+        for attempt in pending.values():
+            attempt.cancel()
+
+        if winner is hedge:
+            with self._lock:
+                self.hedge_wins += 1
+        return result
+
+    def get_statistics(self) -> dict:
+        """获取对冲统计"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "primary_count": self.primary_count,
+                "hedge_count": self.hedge_count,
+                "hedge_wins": self.hedge_wins
+            }
+
+
+def create_request_hedger() -> RequestHedger:
+    """根据配置创建全局对冲执行器"""
+    return RequestHedger(config_manager.get_api_config().get("hedging_config"), route_selector)
+
+
+# 全局实例
+request_hedger = create_request_hedger()
@@ -0,0 +1,576 @@
+"""
+搜索任务管理模块
+每次搜索是一个带ID的任务对象，拥有独立的事件日志、状态、取消标志和结果，
+多个用户可以在同一服务器上同时搜索而互不干扰；
+任务由有界线程池执行，生命周期与HTTP连接无关，断线重连后可按事件ID续传；
+并发任务数和排队任务数都有上限，排队任务会收到排队位置和预计开始时间；
+任务线程中的日志通过 contextvars 路由到该任务自己的日志环形缓冲区（有界，无人连接时也不会持续增长），
+完整日志另外顺序写入任务的日志文件，供下载
+"""
+
+import os
+import re
+import glob
+import time
+import uuid
+import heapq
+import bisect
+import logging
+import threading
+import contextvars
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from src.config import config_manager
+from src.priority_scheduler import INTERACTIVE, set_work_priority
+from src.cancellation import CancellationToken, OperationCancelled, set_cancellation_token
+from src.result_store import ResultStore
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_STOPPED = "stopped"
+JOB_FAILED = "failed"
+
+FINISHED_STATES = (JOB_COMPLETED, JOB_STOPPED, JOB_FAILED)
+
+# 前端日志级别的严重程度，用于按客户端订阅的级别过滤日志
+LOG_LEVELS = {'debug': 10, 'info': 20, 'success': 20, 'warning': 30, 'error': 40}
+
+
+def log_level_value(level: Optional[str]) -> int:
+    """日志级别名称对应的严重程度，未知级别按 info 处理"""
+    return LOG_LEVELS.get((level or 'info').lower(), LOG_LEVELS['info'])
+
+
+def format_log_line(content: Dict[str, Any]) -> str:
+    """把一条任务日志格式化为文本行（多行消息的后续行缩进）"""
+    message = str(content.get('message', '')).replace('\n', '\n    ')
+    return f"{content.get('timestamp', '')} [{content.get('level', 'info')}] {message}\n"
+
+
+# 日志文件中每条日志首行的级别标记
+_LOG_LINE_LEVEL = re.compile(r'^\S* \[(\w+)\] ')
+
+# 当前线程（及其派生的上下文）所属的任务，用于把日志路由到对应任务
+current_job: contextvars.ContextVar[Optional["SearchJob"]] = contextvars.ContextVar("current_job", default=None)
+
+
+class SearchJob:
+    """
+    一次搜索任务（线程安全）
+
+    所有事件共用一个从1开始递增的事件ID，流式连接断开后可从最后收到的事件ID之后继续读取。
+    数据行、行更新、排队和结束/停止信号完整保留在事件日志中；日志只保留在有界的环形缓冲区里，
+    超出容量的最早日志被丢弃，重连时无法重放。
+    结果行同时保存在任务的结果存储中（行更新原地生效），可按需分页、排序读取；
+    任务结束后数据行事件改为引用结果存储中的行，每行只在内存中保留一份。
+    指定日志目录时，全部日志同时顺序写入任务的日志文件，不受环形缓冲区容量限制。
+    """
+
+    def __init__(self, params: Dict[str, Any], job_id: Optional[str] = None, log_buffer_size: int = 2000,
+                 log_spool_dir: Optional[str] = None):
+        """
+        初始化任务
+
+        Args:
+            params: 搜索参数（keyword、max_results、enable_fulltext、model）
+            job_id: 任务ID，默认自动生成
+            log_buffer_size: 日志环形缓冲区容量（条）
+            log_spool_dir: 完整日志文件所在目录，None表示不写日志文件
+        """
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.params = dict(params)
+        self.status = JOB_PENDING
+        self.events: List[Tuple[int, Dict[str, Any]]] = []
+        self.logs: "deque[Tuple[int, Dict[str, Any]]]" = deque(maxlen=max(1, log_buffer_size))
+        self.last_event_id = 0
+        self.results = ResultStore()
+        # 任务进行中的 (数据行事件, 结果存储中的行)，结束时让事件改为引用存储中的行
+        self._row_events: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        self.log_spool_path = os.path.join(log_spool_dir, f"{self.job_id}.log") if log_spool_dir else None
+        self._log_spool = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.cancel_token = CancellationToken()
+        self._lock = threading.Lock()
+        self._new_event = threading.Condition(self._lock)
+
+    def emit(self, event: Dict[str, Any]):
+        """
+        追加一个事件并唤醒等待的流式连接；数据行和行更新同时写入任务的结果存储，日志写入环形缓冲区
+
+        Args:
+            event: 事件字典，包含 type 和 content
+        """
+        with self._new_event:
+            self.last_event_id += 1
+            if event.get('type') == 'log':
+                self.logs.append((self.last_event_id, event))
+                self._spool_log(event['content'])
+            else:
+                if event.get('type') == 'row':
+                    # 事件保存行的浅拷贝：调用方之后修改原始行（如渐进模式补全字段）不会改变已发出的事件
+                    event = {**event, 'content': dict(event['content'])}
+                    self._row_events.append((event, self.results.append(event['content'])))
+                elif event.get('type') == 'row_update':
+                    self.results.update(event['content'].get('PMID'), event['content'].get('fields') or {})
+                self.events.append((self.last_event_id, event))
+            self._new_event.notify_all()
+
+    def _spool_log(self, content: Dict[str, Any]):
+        """把日志追加到任务的日志文件（持有锁时调用）"""
+        if not self.log_spool_path:
+            return
+        try:
+            if self._log_spool is None:
+                os.makedirs(os.path.dirname(self.log_spool_path), exist_ok=True)
+                self._log_spool = open(self.log_spool_path, 'a', encoding='utf-8')
+            self._log_spool.write(format_log_line(content))
+        except OSError:
+            # 写入失败时不再写日志文件（这里不能记录日志：日志会再次路由到本任务），下载时退回环形缓冲区
+            self._close_log_spool()
+            self.log_spool_path = None
+
+    def _close_log_spool(self):
+        """关闭日志文件（持有锁时调用；之后再有日志时重新以追加方式打开）"""
+        if self._log_spool is not None:
+            try:
+                self._log_spool.close()
+            except OSError:
+                pass
+            self._log_spool = None
+
+    def iter_log_lines(self, min_log_level: Optional[str] = None) -> Iterator[str]:
+        """
+        逐行读取任务的完整日志（日志文件不可用时为环形缓冲区中的日志）
+
+        Args:
+            min_log_level: 只返回不低于该级别的日志，None表示全部日志
+
+        Yields:
+            日志文本行
+        """
+        threshold = log_level_value(min_log_level) if min_log_level else None
+        with self._lock:
+            if self._log_spool is not None:
+                self._log_spool.flush()
+            path = self.log_spool_path if self.log_spool_path and os.path.exists(self.log_spool_path) else None
+            buffered = None if path else [event['content'] for _, event in self.logs]
+
+        if buffered is not None:
+            for content in buffered:
+                if threshold is None or log_level_value(content.get('level')) >= threshold:
+                    yield format_log_line(content)
+            return
+
+        include = True
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                match = _LOG_LINE_LEVEL.match(line)
+                if match:
+                    include = threshold is None or log_level_value(match.group(1)) >= threshold
+                if include:
+                    yield line
+
+    def discard_log_spool(self):
+        """删除任务的日志文件（任务被清理时调用）"""
+        with self._lock:
+            self._close_log_spool()
+            path, self.log_spool_path = self.log_spool_path, None
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def wait_events(self, last_event_id: int = 0, timeout: Optional[float] = None,
+                    min_log_level: Optional[str] = None) -> Tuple[int, List[Tuple[int, Dict[str, Any]]]]:
+        """
+        获取指定事件ID之后的事件，暂时没有新事件时阻塞等待
+
+        Args:
+            last_event_id: 客户端最后收到的事件ID，0表示从头读取
+            timeout: 最长等待时间（秒）
+            min_log_level: 只返回不低于该级别的日志，None表示全部日志
+
+        Returns:
+            (已读取到的事件ID, 按事件ID排序的 (事件ID, 事件) 列表)；
+            被级别过滤掉的日志不会返回，但读取位置会越过它们
+        """
+        last_event_id = max(0, last_event_id)
+        threshold = log_level_value(min_log_level) if min_log_level else None
+        with self._new_event:
+            if self.last_event_id <= last_event_id:
+                self._new_event.wait(timeout)
+
+            start = bisect.bisect_right(self.events, last_event_id, key=lambda item: item[0])
+            events = self.events[start:]
+            logs = [
+                (event_id, event) for event_id, event in self.logs
+                if event_id > last_event_id and
+                (threshold is None or log_level_value(event['content'].get('level')) >= threshold)
+            ]
+            return self.last_event_id, list(heapq.merge(events, logs, key=lambda item: item[0]))
+
+    def log(self, message: str, level: str = 'info'):
+        """发送一条任务日志"""
+        self.emit({
+            'type': 'log',
+            'content': {
+                'timestamp': datetime.now().strftime('%H:%M:%S'),
+                'level': level,
+                'message': message
+            }
+        })
+
+    def start(self):
+        """标记任务开始运行"""
+        with self._lock:
+            self.status = JOB_RUNNING
+            self.started_at = time.time()
+
+    def finish(self, error: Optional[str] = None):
+        """
+        标记任务结束并发送结束信号
+
+        Args:
+            error: 出错时的错误信息
+        """
+        with self._lock:
+            if error:
+                self.status = JOB_FAILED
+                self.error = error
+            elif self.cancel_token.is_cancelled:
+                self.status = JOB_STOPPED
+            else:
+                self.status = JOB_COMPLETED
+            self.finished_at = time.time()
+            self._close_log_spool()
+            # 之后不再有行更新，事件中的行副本换成结果存储中的行（重放时行更新事件重复应用结果不变）
+            for event, stored in self._row_events:
+                event['content'] = stored
+            self._row_events.clear()
+        self.emit({'type': 'end'})
+
+    def cancel(self) -> bool:
+        """
+        取消任务，并立即通知流式连接
+
+        取消令牌会中断任务正在进行的网络请求、重试等待和排队，任务很快释放其占用的资源。
+
+        Returns:
+            任务此前是否仍在进行
+        """
+        with self._lock:
+            if self.status in FINISHED_STATES:
+                return False
+        if not self.cancel_token.cancel():
+            return False
+        self.emit({'type': 'stopped', 'content': {'message': '搜索已停止'}})
+        return True
+
+    @property
+    def is_cancelled(self) -> bool:
+        """任务是否已被取消"""
+        return self.cancel_token.is_cancelled
+
+    @property
+    def is_running(self) -> bool:
+        """任务是否仍在进行且未被取消"""
+        return self.status not in FINISHED_STATES and not self.cancel_token.is_cancelled
+
+    def to_dict(self) -> Dict[str, Any]:
+        """任务状态快照（用于 /status 接口）"""
+        with self._lock:
+            return {
+                'job_id': self.job_id,
+                'status': self.status,
+                'is_running': self.status not in FINISHED_STATES and not self.cancel_token.is_cancelled,
+                'current_keyword': self.params.get('keyword', ''),
+                'max_results': self.params.get('max_results'),
+                'enable_fulltext': self.params.get('enable_fulltext'),
+                'model': self.params.get('model'),
+                'result_count': len(self.results),
+                'event_count': self.last_event_id,
+                'buffered_logs': len(self.logs),
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'error': self.error
+            }
+
+
+class JobRegistry:
+    """按ID管理搜索任务；已结束的任务保留一段时间供查询，之后自动清理"""
+
+    def __init__(self, finished_ttl: float = 3600, log_buffer_size: int = 2000,
+                 log_spool_dir: Optional[str] = None):
+        """
+        初始化任务注册表
+
+        Args:
+            finished_ttl: 已结束任务的保留时间（秒）
+            log_buffer_size: 每个任务的日志环形缓冲区容量（条）
+            log_spool_dir: 任务完整日志文件所在目录，None表示不写日志文件
+        """
+        self.finished_ttl = finished_ttl
+        self.log_buffer_size = log_buffer_size
+        self.log_spool_dir = log_spool_dir
+        self._spool_pruned_at = 0.0
+        self._jobs: Dict[str, SearchJob] = {}
+        self._lock = threading.Lock()
+
+    def create(self, params: Dict[str, Any]) -> SearchJob:
+        """
+        创建并登记新任务
+
+        Args:
+            params: 搜索参数
+
+        Returns:
+            新任务
+        """
+        job = SearchJob(params, log_buffer_size=self.log_buffer_size, log_spool_dir=self.log_spool_dir)
+        with self._lock:
+            now = time.time()
+            self._cleanup(now)
+            self._prune_log_spool(now)
+            self._jobs[job.job_id] = job
+        logger.info(f"创建搜索任务 {job.job_id}: {params.get('keyword', '')[:50]}")
+        return job
+
+    def get(self, job_id: str) -> Optional[SearchJob]:
+        """按ID获取任务，不存在时返回None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[SearchJob]:
+        """获取所有任务（按创建时间排序）"""
+        with self._lock:
+            self._cleanup(time.time())
+            return sorted(self._jobs.values(), key=lambda job: job.created_at)
+
+    def _cleanup(self, now: float):
+        """清理过期的已结束任务（持有锁时调用）"""
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and now - job.finished_at > self.finished_ttl]
+        for job_id in expired:
+            self._jobs.pop(job_id).discard_log_spool()
+
+    def _prune_log_spool(self, now: float):
+        """
+        删除日志目录中过期的日志文件（持有锁时调用，最多每分钟一次）
+
+        日志目录由多个进程（多个Web工作进程、命令行）共用，只删除超过 finished_ttl 未被写入、
+        且不属于本进程现有任务的文件：其他进程中仍在运行或仍在保留期内的任务的日志文件不受影响，
+        已退出进程留下的文件在过期后被清理。
+        """
+        if not self.log_spool_dir or now - self._spool_pruned_at < 60:
+            return
+        self._spool_pruned_at = now
+        own = {job.log_spool_path for job in self._jobs.values()}
+        for path in glob.glob(os.path.join(self.log_spool_dir, "*.log")):
+            if path in own:
+                continue
+            try:
+                if now - os.path.getmtime(path) > self.finished_ttl:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+class JobRunner:
+    """
+    搜索任务执行器（带准入控制）
+
+    任务在有界线程池中运行，与发起它的HTTP请求无关：浏览器断线或刷新页面不会中断任务，
+    客户端重新连接后按事件ID续传即可，不必重新执行。
+    同时运行的任务数和排队任务数都有上限：超出并发上限的任务按提交顺序排队，
+    并通过 'queue' 事件得知排队位置和预计开始时间；队列已满时拒绝新任务，
+    过载时表现为可预期的排队，而不是所有任务一起变慢、一起超时。
+    """
+
+    def __init__(self, registry: JobRegistry, max_workers: int = 4, max_pending: int = 20,
+                 default_duration: float = 120.0):
+        """
+        初始化任务执行器
+
+        Args:
+            registry: 登记任务的注册表
+            max_workers: 同时运行的任务数
+            max_pending: 排队任务数上限，超出时拒绝新任务
+            default_duration: 尚无已完成任务时预估的单个任务耗时（秒）
+        """
+        self.registry = registry
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(0, max_pending)
+        self.rejected_count = 0
+        self._avg_duration = default_duration
+        self._pending: "deque[SearchJob]" = deque()
+        self._reported: Dict[str, Tuple[int, int]] = {}
+        self._running: Dict[str, SearchJob] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="search-job")
+
+    def submit(self, target: Callable[[SearchJob], Any], params: Dict[str, Any]) -> Optional[SearchJob]:
+        """
+        创建任务并提交执行；没有空闲名额时排队
+
+        Args:
+            target: 执行任务的函数，参数为任务本身，负责调用 job.start() / job.finish()
+            params: 搜索参数
+
+        Returns:
+            新任务；并发和排队名额都已占满时返回None
+        """
+        with self._lock:
+            self._drop_cancelled()
+            if len(self._running) + len(self._pending) >= self.max_workers + self.max_pending:
+                self.rejected_count += 1
+                logger.warning(f"搜索任务已饱和（运行 {len(self._running)}，排队 {len(self._pending)}），拒绝新任务")
+                return None
+            job = self.registry.create(params)
+            self._pending.append(job)
+            # 在锁内提交，保证线程池的执行顺序与排队顺序一致
+            # 每个任务在全新的上下文中运行，线程复用时不会残留上一个任务的 current_job
+            self._executor.submit(contextvars.Context().run, self._run, target, job)
+        self._report_queue_positions()
+        return job
+
+    def _run(self, target: Callable[[SearchJob], Any], job: SearchJob):
+        """在工作线程中执行任务"""
+        with self._lock:
+            if job in self._pending:
+                self._pending.remove(job)
+            self._running[job.job_id] = job
+            self._reported.pop(job.job_id, None)
+        self._report_queue_positions()
+
+        current_job.set(job)
+        # Web界面的搜索为交互式优先级，同类任务之间按任务ID公平分配请求名额
+        set_work_priority(INTERACTIVE, job.job_id)
+        # 任务的所有阶段（包括派生的线程）都能看到取消令牌
+        set_cancellation_token(job.cancel_token)
+        try:
+            if job.is_cancelled:
+                # 排队期间已被取消
+                job.finish()
+                return
+            target(job)
+        except OperationCancelled:
+            logger.info(f"搜索任务 {job.job_id} 已取消")
+            if job.status not in FINISHED_STATES:
+                job.finish()
+        except Exception as e:
+            logger.error(f"搜索任务 {job.job_id} 执行出错: {e}")
+            if job.status not in FINISHED_STATES:
+                job.finish(str(e))
+        finally:
+            with self._lock:
+                self._running.pop(job.job_id, None)
+                if job.started_at is not None and job.finished_at is not None:
+                    # 平滑更新单个任务的平均耗时，用于估算排队任务的开始时间
+                    self._avg_duration = 0.7 * self._avg_duration + 0.3 * (job.finished_at - job.started_at)
+
+    def _drop_cancelled(self):
+        """从排队队列中移除已取消的任务（持有锁时调用；线程池仍会执行它们并立即结束）"""
+        for job in self._pending:
+            if job.is_cancelled:
+                self._reported.pop(job.job_id, None)
+        self._pending = deque(job for job in self._pending if not job.is_cancelled)
+
+    def _estimate_starts(self, now: float) -> List[Tuple[SearchJob, float]]:
+        """
+        估算每个排队任务的开始等待时间（持有锁时调用）
+
+        每个运行名额在其当前任务预计结束时空出，排队任务依次占用最早空出的名额。
+
+        Returns:
+            (任务, 预计等待秒数) 列表，按排队顺序
+        """
+        slots = [max(0.0, (job.started_at or now) + self._avg_duration - now) for job in self._running.values()]
+        slots += [0.0] * (self.max_workers - len(slots))
+        heapq.heapify(slots)
+        estimates = []
+        for job in self._pending:
+            start = heapq.heappop(slots)
+            estimates.append((job, start))
+            heapq.heappush(slots, start + self._avg_duration)
+        return estimates
+
+    def _report_queue_positions(self):
+        """向排队位置或预计等待时间有变化的排队任务发送 'queue' 事件"""
+        now = time.time()
+        updates = []
+        with self._lock:
+            self._drop_cancelled()
+            free_slots = self.max_workers - len(self._running)
+            for index, (job, wait_seconds) in enumerate(self._estimate_starts(now)):
+                # 有空闲名额、马上就会开始的任务不必通知；其余任务的位置从1开始计
+                position = index + 1 - free_slots
+                if position < 1:
+                    continue
+                report = (position, round(wait_seconds))
+                if self._reported.get(job.job_id) != report:
+                    self._reported[job.job_id] = report
+                    updates.append((position, job, wait_seconds))
+        for position, job, wait_seconds in updates:
+            job.emit({
+                'type': 'queue',
+                'content': {
+                    'position': position,
+                    'eta_seconds': round(wait_seconds),
+                    'estimated_start': datetime.fromtimestamp(now + wait_seconds).strftime('%H:%M:%S')
+                }
+            })
+
+    def retry_after(self) -> int:
+        """队列已满时建议客户端重试的等待时间（秒）"""
+        with self._lock:
+            estimates = self._estimate_starts(time.time())
+            if estimates:
+                return max(1, round(estimates[0][1]))
+            return max(1, round(self._avg_duration / self.max_workers))
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取执行器统计"""
+        with self._lock:
+            return {
+                "running": len(self._running),
+                "pending": len(self._pending),
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "rejected": self.rejected_count,
+                "avg_duration": round(self._avg_duration, 1)
+            }
+
+
+def create_job_registry() -> JobRegistry:
+    """根据配置创建全局任务注册表"""
+    job_config = config_manager.get_job_config()
+    runner_config = job_config.get("job_runner_config") or {}
+    log_config = job_config.get("log_stream_config") or {}
+    return JobRegistry(finished_ttl=runner_config.get("finished_ttl", 3600),
+                       log_buffer_size=log_config.get("buffer_size", 2000),
+                       log_spool_dir=log_config.get("spool_dir"))
+
+
+def create_job_runner() -> JobRunner:
+    """根据配置创建全局任务执行器"""
+    job_config = config_manager.get_job_config().get("job_runner_config") or {}
+    return JobRunner(job_registry, max_workers=job_config.get("max_workers", 4),
+                     max_pending=job_config.get("max_pending", 20),
+                     default_duration=job_config.get("default_duration", 120.0))
+
+
+# 全局实例
+job_registry = create_job_registry()
+job_runner = create_job_runner()
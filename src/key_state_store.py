@@ -0,0 +1,357 @@
+"""
+密钥状态共享存储模块
+将API密钥的健康状态（失败次数、禁用/冷却时间）和RPM/TPM额度保存在本地SQLite数据库中，
+所有修改都在 BEGIN IMMEDIATE 事务内完成，使CLI、多个Web工作进程和批处理任务
+共同协调同一组密钥的额度，而不是各自从零开始
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = (
+    "key_hash", "failure_count", "success_count", "is_disabled", "disabled_until", "cooldown_until",
+    "rpm_limit", "rpm_tokens", "rpm_updated", "tpm_limit", "tpm_tokens", "tpm_updated",
+    "total_requests", "total_successes", "total_tokens", "rate_limited_count", "last_used"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS key_state (
+    key_hash TEXT PRIMARY KEY,
+    failure_count INTEGER NOT NULL DEFAULT 0,
+    success_count INTEGER NOT NULL DEFAULT 0,
+    is_disabled INTEGER NOT NULL DEFAULT 0,
+    disabled_until REAL,
+    cooldown_until REAL,
+    rpm_limit REAL NOT NULL DEFAULT 0,
+    rpm_tokens REAL NOT NULL DEFAULT 0,
+    rpm_updated REAL NOT NULL DEFAULT 0,
+    tpm_limit REAL NOT NULL DEFAULT 0,
+    tpm_tokens REAL NOT NULL DEFAULT 0,
+    tpm_updated REAL NOT NULL DEFAULT 0,
+    total_requests INTEGER NOT NULL DEFAULT 0,
+    total_successes INTEGER NOT NULL DEFAULT 0,
+    total_tokens INTEGER NOT NULL DEFAULT 0,
+    rate_limited_count INTEGER NOT NULL DEFAULT 0,
+    last_used REAL
+)
+"""
+
+
+def hash_api_key(key: str) -> str:
+    """
+    生成密钥的存储标识（不在磁盘上保存密钥原文）
+
+    Args:
+        key: API密钥
+
+    Returns:
+        密钥SHA-256摘要的前16位
+    """
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _refill(limit: float, tokens: float, updated: float, now: float) -> float:
+    """按流逝时间补充令牌桶额度（limit<=0表示不限制）"""
+    if limit <= 0:
+        return tokens
+    return min(limit, tokens + max(0.0, now - updated) * limit / 60.0)
+
+
+def _wait_for(limit: float, tokens: float, amount: float, reserve_ratio: float = 0.0) -> float:
+    """计算令牌桶获得指定额度需要等待的秒数（reserve_ratio 为不能动用的保留容量比例）"""
+    if limit <= 0:
+        return 0.0
+    amount = min(amount + limit * reserve_ratio, limit)
+    if tokens >= amount:
+        return 0.0
+    return (amount - tokens) * 60.0 / limit
+
+
+class KeyStateStore:
+    """
+    基于SQLite的跨进程密钥状态存储
+
+    每个线程使用独立的连接；时间统一使用墙上时钟(time.time)，以便在进程之间比较。
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 10.0):
+        """
+        初始化存储并创建数据表
+
+        Args:
+            path: SQLite数据库文件路径
+            busy_timeout: 等待其他进程释放写锁的最长时间（秒）
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """写事务：BEGIN IMMEDIATE 在读取前即获得写锁，保证读-改-写的原子性"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _row(self, conn: sqlite3.Connection, key_hash: str) -> Dict[str, Any]:
+        """读取一行状态（在事务内调用）"""
+        row = conn.execute("SELECT * FROM key_state WHERE key_hash = ?", (key_hash,)).fetchone()
+        if row is None:
+            raise KeyError(key_hash)
+        return dict(row)
+
+    def _save(self, conn: sqlite3.Connection, row: Dict[str, Any]):
+        """写回一行状态（在事务内调用）"""
+        columns = [column for column in _COLUMNS if column != "key_hash"]
+        conn.execute(
+            f"UPDATE key_state SET {', '.join(f'{column} = ?' for column in columns)} WHERE key_hash = ?",
+            [row[column] for column in columns] + [row["key_hash"]]
+        )
+
+    def ensure_keys(self, key_hashes: Iterable[str], rpm_limit: float, tpm_limit: float):
+        """
+        为尚不存在的密钥创建初始状态（额度为满）；已存在的密钥更新为配置的上限
+
+        上限调低时剩余额度截断到新上限；原来不限制、现在设置了上限时额度从满开始。
+
+        Args:
+            key_hashes: 密钥标识列表
+            rpm_limit: 每分钟请求数上限（0或None表示不限制）
+            tpm_limit: 每分钟token数上限（0或None表示不限制）
+        """
+        rpm_limit = float(rpm_limit or 0)
+        tpm_limit = float(tpm_limit or 0)
+        updates = ", ".join(
+            f"{kind}_tokens = CASE WHEN excluded.{kind}_limit <= 0 THEN {kind}_tokens "
+            f"WHEN {kind}_limit <= 0 THEN excluded.{kind}_limit "
+            f"ELSE MIN({kind}_tokens, excluded.{kind}_limit) END, "
+            f"{kind}_updated = CASE WHEN {kind}_limit <= 0 AND excluded.{kind}_limit > 0 "
+            f"THEN excluded.{kind}_updated ELSE {kind}_updated END, "
+            f"{kind}_limit = excluded.{kind}_limit"
+            for kind in ("rpm", "tpm")
+        )
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT INTO key_state (key_hash, rpm_limit, rpm_tokens, rpm_updated, tpm_limit, tpm_tokens, tpm_updated) "
+                f"VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(key_hash) DO UPDATE SET {updates}",
+                [(key_hash, rpm_limit, rpm_limit, now, tpm_limit, tpm_limit, now) for key_hash in key_hashes]
+            )
+
+    def try_reserve(self, key_hash: str, estimated_tokens: int = 0, reserve_ratio: float = 0.0) -> Optional[float]:
+        """
+        原子地检查密钥是否可用，可用时预留一次请求的RPM/TPM额度
+
+        Args:
+            key_hash: 密钥标识
+            estimated_tokens: 本次请求预计消耗的token数
+            reserve_ratio: 为高优先级请求保留、本次请求不能动用的容量比例（跨进程生效，
+                如命令行批量任务为Web界面的交互式搜索留出额度）
+
+        Returns:
+            0表示已预留成功；正数表示还需等待的秒数；None表示密钥被无限期禁用
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = self._row(conn, key_hash)
+
+            if row["is_disabled"]:
+                if not row["disabled_until"]:
+                    return None
+                if row["disabled_until"] > now:
+                    return row["disabled_until"] - now
+                # 禁用期已过，重新启用
+                row["is_disabled"] = 0
+                row["disabled_until"] = None
+
+            rpm_tokens = _refill(row["rpm_limit"], row["rpm_tokens"], row["rpm_updated"], now)
+            tpm_tokens = _refill(row["tpm_limit"], row["tpm_tokens"], row["tpm_updated"], now)
+            wait = max(
+                _wait_for(row["rpm_limit"], rpm_tokens, 1, reserve_ratio),
+                _wait_for(row["tpm_limit"], tpm_tokens, estimated_tokens, reserve_ratio),
+                (row["cooldown_until"] or 0.0) - now,
+                0.0
+            )
+
+            if wait == 0:
+                row.update({
+                    "rpm_tokens": rpm_tokens - 1 if row["rpm_limit"] > 0 else rpm_tokens,
+                    "tpm_tokens": tpm_tokens - estimated_tokens if row["tpm_limit"] > 0 else tpm_tokens,
+                    "rpm_updated": now,
+                    "tpm_updated": now,
+                    "cooldown_until": None,
+                    "total_requests": row["total_requests"] + 1,
+                    "last_used": now
+                })
+            self._save(conn, row)
+            return wait
+
+    def record_success(self, key_hash: str, tokens_used: Optional[int] = None, estimated_tokens: int = 0) -> Dict[str, Any]:
+        """
+        记录请求成功，并按实际用量校正TPM额度
+
+        Args:
+            key_hash: 密钥标识
+            tokens_used: 实际消耗的token数
+            estimated_tokens: 预留时的估计token数
+
+        Returns:
+            更新后的状态
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = self._row(conn, key_hash)
+            row["success_count"] += 1
+            row["total_successes"] += 1
+            row["failure_count"] = max(0, row["failure_count"] - 1)
+            row["last_used"] = now
+            if tokens_used is not None:
+                row["total_tokens"] += tokens_used
+                if row["tpm_limit"] > 0:
+                    row["tpm_tokens"] = _refill(row["tpm_limit"], row["tpm_tokens"], row["tpm_updated"], now) - (tokens_used - estimated_tokens)
+                    row["tpm_updated"] = now
+            self._save(conn, row)
+            return row
+
+    def record_failure(self, key_hash: str, max_failures: int, disable_duration: float) -> Dict[str, Any]:
+        """
+        记录请求失败，失败次数达到上限时禁用密钥
+
+        Args:
+            key_hash: 密钥标识
+            max_failures: 最大失败次数
+            disable_duration: 禁用时长（秒）
+
+        Returns:
+            更新后的状态
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = self._row(conn, key_hash)
+            row["failure_count"] += 1
+            row["last_used"] = now
+            if row["failure_count"] >= max_failures:
+                row["is_disabled"] = 1
+                row["disabled_until"] = now + disable_duration
+            self._save(conn, row)
+            return row
+
+    def set_cooldown(self, key_hash: str, cooldown: float) -> Dict[str, Any]:
+        """
+        让密钥冷却（收到429时调用），同时清空其RPM额度
+
+        Args:
+            key_hash: 密钥标识
+            cooldown: 冷却时长（秒）
+
+        Returns:
+            更新后的状态
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = self._row(conn, key_hash)
+            row["rate_limited_count"] += 1
+            row["cooldown_until"] = max(row["cooldown_until"] or 0.0, now + cooldown)
+            if row["rpm_limit"] > 0:
+                row["rpm_tokens"] = min(0.0, _refill(row["rpm_limit"], row["rpm_tokens"], row["rpm_updated"], now))
+                row["rpm_updated"] = now
+            self._save(conn, row)
+            return row
+
+    def sync_bucket(self, key_hash: str, kind: str, remaining: float, limit: Optional[float] = None):
+        """
+        根据服务端返回的剩余额度校准令牌桶
+
+        Args:
+            key_hash: 密钥标识
+            kind: "rpm" 或 "tpm"
+            remaining: 服务端报告的剩余额度
+            limit: 服务端报告的每分钟上限（可选）
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = self._row(conn, key_hash)
+            if limit and limit > 0:
+                row[f"{kind}_limit"] = float(limit)
+            if row[f"{kind}_limit"] > 0:
+                tokens = _refill(row[f"{kind}_limit"], row[f"{kind}_tokens"], row[f"{kind}_updated"], now)
+                row[f"{kind}_tokens"] = min(tokens, float(remaining))
+                row[f"{kind}_updated"] = now
+            self._save(conn, row)
+
+    def refund(self, key_hash: str, requests: int = 0, tokens: int = 0):
+        """
+        归还预留但未使用的额度（如被取消的对冲请求），归还后不超过上限
+
+        Args:
+            key_hash: 密钥标识
+            requests: 归还的请求数
+            tokens: 归还的token数
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = self._row(conn, key_hash)
+            for kind, amount in (("rpm", requests), ("tpm", tokens)):
+                if amount and row[f"{kind}_limit"] > 0:
+                    tokens_now = _refill(row[f"{kind}_limit"], row[f"{kind}_tokens"], row[f"{kind}_updated"], now)
+                    row[f"{kind}_tokens"] = min(row[f"{kind}_limit"], tokens_now + amount)
+                    row[f"{kind}_updated"] = now
+            self._save(conn, row)
+
+    def get_states(self, key_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        读取多个密钥的状态
+
+        Args:
+            key_hashes: 密钥标识列表
+
+        Returns:
+            以密钥标识为键的状态字典
+        """
+        conn = self._connect()
+        placeholders = ", ".join("?" for _ in key_hashes)
+        rows = conn.execute(f"SELECT * FROM key_state WHERE key_hash IN ({placeholders})", list(key_hashes)).fetchall()
+        return {row["key_hash"]: dict(row) for row in rows}
+
+    def enable_all(self, key_hashes: List[str]):
+        """重新启用指定的密钥"""
+        with self._transaction() as conn:
+            conn.executemany(
+                "UPDATE key_state SET is_disabled = 0, disabled_until = NULL WHERE key_hash = ?",
+                [(key_hash,) for key_hash in key_hashes]
+            )
+
+    def reset(self, key_hashes: List[str], rpm_limit: float, tpm_limit: float):
+        """重置指定密钥的全部状态"""
+        with self._transaction() as conn:
+            conn.executemany("DELETE FROM key_state WHERE key_hash = ?", [(key_hash,) for key_hash in key_hashes])
+        self.ensure_keys(key_hashes, rpm_limit, tpm_limit)
@@ -0,0 +1,186 @@
+"""
+异步日志模块
+工作线程只把日志记录放入队列，由单独的监听线程完成格式化和输出（控制台、推送给前端的任务日志），
+控制台写入和消息格式化不再占用搜索任务的执行时间；日志产生时的 contextvars（如所属的搜索任务）
+随记录一起传给监听线程，任务级的日志路由不受影响
+"""
+
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    把日志记录放入队列的处理器
+
+    与标准 QueueHandler 不同，入队时不格式化消息（格式化推迟到监听线程），
+    只记录产生日志时的上下文；队列满时丢弃 INFO 及以下级别的日志，警告和错误等待入队。
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.log_context = contextvars.copy_context()
+        if record.exc_info and not record.exc_text:
+            # 异常的调用栈在当前线程中格式化，监听线程处理时异常对象可能已被修改
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record)
+            else:
+                self.dropped += 1
+
+
+class ContextQueueListener(QueueListener):
+    """在日志产生时的上下文中把记录交给各处理器的监听器"""
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self._handlers_lock = threading.Lock()
+
+    def handle(self, record: logging.LogRecord):
+        flushed = getattr(record, "flush_event", None)
+        if flushed is not None:
+            flushed.set()
+            return
+        context = getattr(record, "log_context", None)
+        if context is None:
+            super().handle(record)
+        else:
+            context.run(super().handle, record)
+
+    def add_handler(self, handler: logging.Handler):
+        """添加处理器（可在监听线程运行时调用）"""
+        with self._handlers_lock:
+            if handler not in self.handlers:
+                self.handlers = self.handlers + (handler,)
+
+    def remove_handler(self, handler: logging.Handler):
+        """移除处理器"""
+        with self._handlers_lock:
+            self.handlers = tuple(h for h in self.handlers if h is not handler)
+
+
+_listener: Optional[ContextQueueListener] = None
+_queue_handler: Optional[ContextQueueHandler] = None
+_install_lock = threading.Lock()
+
+
+def install_queue_logging(level: str = "DEBUG", log_format: Optional[str] = None,
+                          module_levels: Optional[Dict[str, str]] = None,
+                          queue_size: int = 10000) -> ContextQueueListener:
+    """
+    把根日志记录器的输出改为经由队列异步处理（重复调用时只更新日志级别）
+
+    根记录器原有的处理器（没有时创建控制台处理器）移到监听线程中执行。
+
+    Args:
+        level: 根日志记录器的级别，低于该级别的日志在调用处直接丢弃、不构造记录
+        log_format: 控制台日志格式
+        module_levels: 各模块日志记录器的级别（如降低第三方库的日志噪音）
+        queue_size: 日志队列长度
+
+    Returns:
+        日志监听器
+    """
+    global _listener, _queue_handler
+    root = logging.getLogger()
+    with _install_lock:
+        root.setLevel(level)
+        for name, module_level in (module_levels or {}).items():
+            logging.getLogger(name).setLevel(module_level)
+        if _listener is not None:
+            return _listener
+
+        handlers = [h for h in root.handlers if not isinstance(h, QueueHandler)]
+        if not handlers:
+            console = logging.StreamHandler()
+            console.setFormatter(logging.Formatter(log_format))
+            handlers = [console]
+        for handler in handlers:
+            root.removeHandler(handler)
+
+        log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        _queue_handler = ContextQueueHandler(log_queue)
+        _listener = ContextQueueListener(log_queue, *handlers)
+        root.addHandler(_queue_handler)
+        _listener.start()
+        atexit.register(stop_queue_logging)
+        return _listener
+
+
+def add_log_handler(handler: logging.Handler):
+    """
+    添加在监听线程中执行的日志处理器；未启用异步日志时直接加到根日志记录器
+
+    Args:
+        handler: 日志处理器
+    """
+    if _listener is not None:
+        _listener.add_handler(handler)
+    else:
+        logging.getLogger().addHandler(handler)
+
+
+def flush_logs(timeout: float = 1.0) -> bool:
+    """
+    等待此前放入队列的日志处理完毕（如任务结束前确保其日志已写入任务缓冲区）
+
+    Args:
+        timeout: 最长等待秒数
+
+    Returns:
+        是否已处理完毕
+    """
+    listener, handler = _listener, _queue_handler
+    if listener is None or handler is None:
+        return True
+    marker = logging.makeLogRecord({"flush_event": threading.Event()})
+    try:
+        handler.queue.put(marker, timeout=timeout)
+    except queue.Full:
+        return False
+    return marker.flush_event.wait(timeout)
+
+
+def stop_queue_logging():
+    """处理完队列中剩余的日志后停止监听线程（进程退出时自动调用）"""
+    global _listener
+    with _install_lock:
+        listener, _listener = _listener, None
+        if listener is None:
+            return
+        logging.getLogger().removeHandler(_queue_handler)
+        listener.stop()
+        # 停止后的日志直接由原处理器输出
+        for handler in listener.handlers:
+            logging.getLogger().addHandler(handler)
+        if _queue_handler.dropped:
+            logger.warning(f"日志队列已满，丢弃了 {_queue_handler.dropped} 条日志")
+
+
+def get_log_pipeline_statistics() -> dict:
+    """获取异步日志统计"""
+    if _listener is None or _queue_handler is None:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        "queued": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+        "handlers": len(_listener.handlers)
+    }
@@ -9,18 +9,17 @@ from typing import Dict, Any, Optional
 import os
 
 # 导入配置和工具模块
-from src.config import ConfigManager
+from src.config import ConfigManager, setup_logging
 from src.pubmed_scraper import search_pubmed, fetch_details, PubMedScraper
 from src.data_parser import extract_info_with_regex, parse_record, DataParser
 from src.ai_extractor import extract_info_with_ai, AIExtractor
 from src.fulltext_extractor import check_full_text_availability, extract_full_text_content, analyze_pmid_with_full_text
+from src.task_graph import TaskGraph
 from src.api_key_manager import APIKeyPoolManager
+from src.priority_scheduler import set_work_priority, BATCH
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# 配置日志（异步输出，级别由日志配置档决定）
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -98,24 +97,21 @@ class MainApplication:
             
             print(f"✅ 获取PubMed记录成功")
             
-            # 根据提取类型选择提取方法
-            if extraction_type == "regex" or extraction_type == "auto":
-                # 尝试正则表达式提取
-                abstract = record.get('abstract', '')
-                if abstract:
-                    regex_result = extract_info_with_regex(abstract)
-                    print(f"📝 正则提取完成，提取 {len(regex_result)} 个字段")
-                else:
-                    regex_result = {}
+            # 根据提取类型选择提取方法；auto 模式下正则提取和AI提取互不依赖，并发执行
+            abstract = record.get('abstract', '')
+            graph = TaskGraph()
+            if extraction_type in ["regex", "auto"] and abstract:
+                graph.add("regex", lambda: extract_info_with_regex(abstract))
+            if extraction_type in ["ai", "auto"] and abstract:
+                graph.add("ai", lambda: extract_info_with_ai(abstract))
+            results = graph.run()
             
-            if extraction_type == "ai" or extraction_type == "auto":
-                # 尝试AI提取
-                abstract = record.get('abstract', '')
-                if abstract:
-                    ai_result = extract_info_with_ai(abstract)
-                    print(f"🤖 AI提取完成，提取 {len(ai_result)} 个字段")
-                else:
-                    ai_result = {}
+            regex_result = results.get("regex", {})
+            if "regex" in results:
+                print(f"📝 正则提取完成，提取 {len(regex_result)} 个字段")
+            ai_result = results.get("ai", {})
+            if "ai" in results:
+                print(f"🤖 AI提取完成，提取 {len(ai_result)} 个字段")
             
             if extraction_type == "fulltext":
                 # 尝试全文提取
@@ -354,6 +350,9 @@ def main():
             parser.print_help()
             return
         
+        # 命令行运行的是批量任务，AI和HTTP请求让位于Web界面的交互式搜索
+        set_work_priority(BATCH, f"cli-{os.getpid()}")
+        
         # 创建主应用程序实例
         app = MainApplication()
         
@@ -0,0 +1,277 @@
+"""
+全文预取模块
+提供按内存预算淘汰的全文/免费状态缓存（同一键的并发加载只执行一次），
+以及在提取游标之前预取后续文献的预取器：模型处理第 i 篇时，
+第 i+1..i+k 篇的落地页和全文已在后台线程中获取，输出顺序不变
+"""
+
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from src.config import config_manager
+from src.cancellation import OperationCancelled, check_cancelled
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(value: Any) -> int:
+    """
+    粗略估算缓存值占用的内存（字节），字符串按字符数计
+
+    Args:
+        value: 缓存值（通常是嵌套的dict/list/str）
+
+    Returns:
+        估算的字节数
+    """
+    if isinstance(value, str):
+        return len(value) + 50
+    if isinstance(value, dict):
+        return 64 + sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return 56 + sum(estimate_size(item) for item in value)
+    return 32
+
+
+class _PendingLoad:
+    """正在进行的一次加载，其他请求同一键的线程等待它完成"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class FullTextCache:
+    """
+    全文分析和免费状态检查结果的内存缓存（线程安全）
+
+    按估算的内存占用做LRU淘汰；同一键同时只有一个线程执行加载（single-flight），
+    预取线程和处理线程请求同一篇文献时不会重复抓取。
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        初始化缓存
+
+        Args:
+            max_bytes: 内存预算（字节）
+        """
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared_loads = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._pending: Dict[str, _PendingLoad] = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: str, loader: Callable[[], Any],
+                    cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        获取缓存值，不存在时调用 loader 加载；同一键正在加载时等待其结果
+
+        Args:
+            key: 缓存键
+            loader: 加载函数
+            cacheable: 判断加载结果是否写入缓存（如网络错误导致的失败结果只交给本次等待的调用方，
+                之后的请求重新加载）；None 表示全部缓存
+
+        Returns:
+            缓存值或加载结果；加载异常会传给所有等待该键的调用方
+            （加载方所属任务被取消时，等待方自己重新加载）
+        """
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                pending = self._pending.get(key)
+                owner = pending is None
+                if owner:
+                    pending = _PendingLoad()
+                    self._pending[key] = pending
+                    self.misses += 1
+                else:
+                    self.shared_loads += 1
+
+            if owner:
+                break
+            # 分段等待，以便等待方所属的任务被取消时及时返回
+            while not pending.event.wait(0.5):
+                check_cancelled()
+            if isinstance(pending.error, OperationCancelled):
+                continue
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            pending.value = loader()
+        except BaseException as e:
+            pending.error = e
+            raise
+        else:
+            if cacheable is None or cacheable(pending.value):
+                self._store(key, pending.value)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.event.set()
+        return pending.value
+
+    def _store(self, key: str, value: Any):
+        """写入缓存并按内存预算淘汰最久未使用的条目"""
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self.used_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.used_bytes += size
+            while self.used_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.used_bytes -= evicted_size
+
+    def contains(self, key: str) -> bool:
+        """键是否已缓存或正在加载"""
+        with self._lock:
+            return key in self._entries or key in self._pending
+
+    def clear(self):
+        """清空缓存（正在进行的加载不受影响）"""
+        with self._lock:
+            self._entries.clear()
+            self.used_bytes = 0
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "used_bytes": self.used_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared_loads": self.shared_loads,
+                "loading": len(self._pending)
+            }
+
+
+class Prefetcher:
+    """
+    有界前瞻预取器
+
+    消费方处理第 index 项时调用 advance(index)，预取器在后台加载
+    index+1..index+lookahead 项；任务取消（should_continue 返回False）、
+    调用 stop() 或已预取但尚未被消费的结果超出缓存内存预算的一定比例时不再发起新的预取
+    （缓存中其余条目由LRU淘汰，不影响预取）。
+    """
+
+    def __init__(self, items: List[str], load: Callable[[str], Any], lookahead: int = 3, max_workers: int = 3,
+                 cache: Optional[FullTextCache] = None, should_continue: Optional[Callable[[], bool]] = None,
+                 budget_ratio: float = 0.8):
+        """
+        初始化预取器
+
+        Args:
+            items: 按处理顺序排列的键（如PMID）
+            load: 加载单项的函数（应通过缓存加载，结果由消费方从缓存取用）
+            lookahead: 前瞻窗口大小
+            max_workers: 预取线程数
+            cache: 结果所在的缓存（预取窗口占用的内存不超过其预算的 budget_ratio）
+            should_continue: 任务是否仍在运行
+            budget_ratio: 尚未消费的预取结果可占用的缓存预算比例
+        """
+        self.items = list(items)
+        self.load = load
+        self.lookahead = max(0, lookahead)
+        self.cache = cache
+        self.should_continue = should_continue or (lambda: True)
+        self.budget_ratio = budget_ratio
+        self.scheduled = 0
+        self.completed = 0
+        self._next = 0
+        self._consumed = -1
+        # 位置 -> 已预取、尚未被消费的结果的估算大小
+        self._ahead_bytes: Dict[int, int] = {}
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="prefetch")
+
+    def advance(self, index: int):
+        """
+        消费方开始处理第 index 项，预取其后的 lookahead 项
+
+        Args:
+            index: 当前处理的位置
+        """
+        with self._lock:
+            if self._stopped:
+                return
+            self._consumed = max(self._consumed, index)
+            for position in [position for position in self._ahead_bytes if position <= index]:
+                del self._ahead_bytes[position]
+            self._next = max(self._next, index + 1)
+            end = min(len(self.items), index + 1 + self.lookahead)
+            while self._next < end:
+                if not self.should_continue() or self._over_budget():
+                    break
+                position = self._next
+                self._next += 1
+                self.scheduled += 1
+                # 在提交方的上下文副本中运行，预取中的日志仍归属当前任务
+                self._executor.submit(contextvars.copy_context().run, self._run, position)
+
+    def _over_budget(self) -> bool:
+        """尚未消费的预取结果是否已占满预算（持有锁时调用）"""
+        if self.cache is None:
+            return False
+        return sum(self._ahead_bytes.values()) >= self.cache.max_bytes * self.budget_ratio
+
+    def _run(self, position: int):
+        """在预取线程中加载一项"""
+        if self._stopped or not self.should_continue():
+            return
+        item = self.items[position]
+        try:
+            value = self.load(item)
+        except Exception as e:
+            # 预取失败不影响消费方，消费方会自行重新加载
+            logger.debug("预取 %s 失败: %s", item, e)
+        else:
+            size = estimate_size(value)
+            with self._lock:
+                if position > self._consumed:
+                    self._ahead_bytes[position] = size
+        finally:
+            with self._lock:
+                self.completed += 1
+
+    def stop(self):
+        """停止预取：取消尚未开始的预取，正在进行的请求自然结束"""
+        with self._lock:
+            self._stopped = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def create_fulltext_cache() -> FullTextCache:
+    """根据配置创建全局全文缓存"""
+    prefetch_config = config_manager.get_cache_config().get("prefetch_config") or {}
+    return FullTextCache(max_bytes=int(prefetch_config.get("memory_budget_mb", 64) * 1024 * 1024))
+
+
+# 全局实例
+fulltext_cache = create_fulltext_cache()
@@ -0,0 +1,239 @@
+"""
+优先级调度模块
+把每个工作项标记为交互式（Web界面的搜索）或批量（命令行的批量提取）优先级，
+共享的AI请求和HTTP请求调度器优先服务交互式工作项，同一优先级内按任务公平分配；
+批量任务运行时，用户在Web界面发起的小规模搜索仍能快速完成
+"""
+
+import time
+import logging
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.config import config_manager
+from src.cancellation import cancellable_wait
+
+logger = logging.getLogger(__name__)
+
+# 优先级类别（按服务顺序排列）
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITY_CLASSES = (INTERACTIVE, BATCH)
+
+# 当前工作项的 (优先级类别, 所属任务)；线程池派生的上下文会继承
+_current_priority: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar(
+    "current_priority", default=None)
+
+
+def set_work_priority(priority_class: str, owner: str = "default") -> contextvars.Token:
+    """
+    设置当前上下文中工作项的优先级
+
+    Args:
+        priority_class: 优先级类别（INTERACTIVE 或 BATCH）
+        owner: 所属任务标识，同一优先级内按任务公平分配
+
+    Returns:
+        可用于 reset_work_priority 的令牌
+    """
+    if priority_class not in PRIORITY_CLASSES:
+        raise ValueError(f"未知的优先级类别: {priority_class}")
+    return _current_priority.set((priority_class, owner))
+
+
+def reset_work_priority(token: contextvars.Token):
+    """恢复设置前的优先级"""
+    _current_priority.reset(token)
+
+
+def get_work_priority() -> Tuple[str, str]:
+    """
+    获取当前上下文中工作项的优先级
+
+    Returns:
+        (优先级类别, 所属任务)，未设置时为配置的默认类别
+    """
+    priority = _current_priority.get()
+    if priority is None:
+        default_class = (config_manager.get_feature_config().get("priority_config") or {}).get("default_class", INTERACTIVE)
+        return default_class, "default"
+    return priority
+
+
+@contextmanager
+def work_priority(priority_class: str, owner: str = "default") -> Iterator[None]:
+    """在 with 块内以指定优先级执行工作"""
+    token = set_work_priority(priority_class, owner)
+    try:
+        yield
+    finally:
+        reset_work_priority(token)
+
+
+class _Waiter:
+    """一个等待执行名额的工作项"""
+
+    def __init__(self, rank: int, owner_key: Tuple[str, str], seq: int):
+        self.rank = rank
+        self.owner_key = owner_key
+        self.seq = seq
+
+
+class PriorityScheduler:
+    """
+    优先级并发调度器（线程安全）
+
+    限制同时进行的请求数；名额空出时先分配给交互式工作项，
+    同一优先级内分配给已获得名额最少的任务（新加入的任务从当前最小值开始计数，
+    既不会插到所有任务前面，也不会被长时间运行的任务饿死），同一任务内按先来后到。
+    """
+
+    def __init__(self, name: str, max_concurrent: int = 8):
+        """
+        初始化调度器
+
+        Args:
+            name: 调度器名称（用于日志）
+            max_concurrent: 同时进行的请求数
+        """
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.active = 0
+        self.granted = {priority_class: 0 for priority_class in PRIORITY_CLASSES}
+        self.wait_time = {priority_class: 0.0 for priority_class in PRIORITY_CLASSES}
+        self._waiters: List[_Waiter] = []
+        self._served: Dict[Tuple[str, str], int] = {}
+        self._in_flight: Dict[Tuple[str, str], int] = {}
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """下一个应获得名额的工作项（持有锁时调用）"""
+        if not self._waiters:
+            return None
+        return min(self._waiters, key=lambda w: (w.rank, self._served[w.owner_key], w.seq))
+
+    def _register_owner(self, owner_key: Tuple[str, str]):
+        """登记任务的服务计数，新任务从同类别任务的当前最小值开始（持有锁时调用）"""
+        if owner_key in self._served:
+            return
+        peers = [served for key, served in self._served.items() if key[0] == owner_key[0]]
+        self._served[owner_key] = min(peers) if peers else 0
+
+    def _forget_owner(self, owner_key: Tuple[str, str]):
+        """任务没有进行中和等待中的工作项时删除其计数（持有锁时调用）"""
+        if self._in_flight.get(owner_key):
+            return
+        if any(waiter.owner_key == owner_key for waiter in self._waiters):
+            return
+        self._in_flight.pop(owner_key, None)
+        self._served.pop(owner_key, None)
+
+    def acquire(self, priority_class: Optional[str] = None, owner: Optional[str] = None,
+                timeout: Optional[float] = None) -> Optional[Tuple[str, str]]:
+        """
+        等待并占用一个名额
+
+        Args:
+            priority_class: 优先级类别，默认取当前上下文的优先级
+            owner: 所属任务，默认取当前上下文的任务
+            timeout: 最长等待秒数，None表示一直等待
+
+        Returns:
+            名额凭据（传给 release），超时返回None；所属任务被取消时抛出 OperationCancelled
+        """
+        if priority_class is None or owner is None:
+            context_class, context_owner = get_work_priority()
+            priority_class = priority_class or context_class
+            owner = owner or context_owner
+        owner_key = (priority_class, owner)
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+
+        with self._condition:
+            self._register_owner(owner_key)
+            waiter = _Waiter(PRIORITY_CLASSES.index(priority_class), owner_key, next(self._seq))
+            self._waiters.append(waiter)
+            try:
+                while self.active >= self.max_concurrent or self._next_waiter() is not waiter:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return self._abandon(waiter)
+                    cancellable_wait(self._condition, remaining)
+            except BaseException:
+                self._abandon(waiter)
+                raise
+
+            self._waiters.remove(waiter)
+            self.active += 1
+            self._served[owner_key] += 1
+            self._in_flight[owner_key] = self._in_flight.get(owner_key, 0) + 1
+            self.granted[priority_class] += 1
+            self.wait_time[priority_class] += time.monotonic() - started
+            # 还有空闲名额时下一个工作项可以继续
+            self._condition.notify_all()
+        return owner_key
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """放弃等待（超时或任务被取消，持有锁时调用）"""
+        self._waiters.remove(waiter)
+        self._forget_owner(waiter.owner_key)
+        # 让出队首位置，后面的工作项可能已经可以执行
+        self._condition.notify_all()
+
+    def release(self, ticket: Tuple[str, str]):
+        """
+        归还名额
+
+        Args:
+            ticket: acquire 返回的名额凭据
+        """
+        with self._condition:
+            self.active -= 1
+            self._in_flight[ticket] -= 1
+            self._forget_owner(ticket)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, priority_class: Optional[str] = None, owner: Optional[str] = None) -> Iterator[None]:
+        """在 with 块内占用一个名额（默认使用当前上下文的优先级）"""
+        ticket = self.acquire(priority_class, owner)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def get_statistics(self) -> dict:
+        """获取调度统计"""
+        with self._condition:
+            waiting = {priority_class: 0 for priority_class in PRIORITY_CLASSES}
+            for waiter in self._waiters:
+                waiting[PRIORITY_CLASSES[waiter.rank]] += 1
+            return {
+                "name": self.name,
+                "active": self.active,
+                "max_concurrent": self.max_concurrent,
+                "waiting": waiting,
+                "granted": dict(self.granted),
+                "avg_wait": {
+                    priority_class: round(self.wait_time[priority_class] / self.granted[priority_class], 3)
+                    if self.granted[priority_class] else 0.0
+                    for priority_class in PRIORITY_CLASSES
+                }
+            }
+
+
+def create_priority_schedulers() -> Tuple[PriorityScheduler, PriorityScheduler]:
+    """根据配置创建全局的AI请求调度器和HTTP请求调度器"""
+    priority_config = config_manager.get_feature_config().get("priority_config") or {}
+    return (
+        PriorityScheduler("llm", priority_config.get("llm_max_concurrent", 8)),
+        PriorityScheduler("http", priority_config.get("http_max_concurrent", 4))
+    )
+
+
+# 全局实例：AI接口请求、NCBI及全文页面请求
+llm_scheduler, http_scheduler = create_priority_schedulers()
@@ -5,13 +5,41 @@ PubMed数据获取模块
 
 import logging
 from Bio import Entrez
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List
 
 # 导入配置管理器
 from src.config import config_manager
+from src.priority_scheduler import http_scheduler
+from src.cancellation import call_cancellable
 
 logger = logging.getLogger(__name__)
 
+# 获取文献详情时单次请求的PMID数上限
+EFETCH_BATCH_SIZE = 200
+
+
+def read_entrez(func: Callable[..., Any], **params) -> Any:
+    """
+    调用 Entrez 接口并解析结果；占用一个HTTP请求名额，所属任务被取消时立即返回
+    
+    Args:
+        func: Entrez 接口函数（如 Entrez.esearch、Entrez.efetch）
+        **params: 接口参数
+        
+    Returns:
+        Entrez.read 的解析结果
+    """
+    def fetch():
+        handle = func(**params)
+        try:
+            return Entrez.read(handle)
+        finally:
+            handle.close()
+
+    with http_scheduler.slot():
+        return call_cancellable(fetch)
+
+
 class PubMedScraper:
     """
     PubMed文献搜索和抓取器
@@ -57,14 +85,13 @@ class PubMedScraper:
         """
         logger.info(f"正在搜索: {query.strip()}")
         try:
-            handle = Entrez.esearch(
+            record = read_entrez(
+                Entrez.esearch,
                 db="pubmed", 
                 term=query, 
                 retmax=max_results, 
                 sort="relevance"
             )
-            record = Entrez.read(handle)
-            handle.close()
             
             id_list = record.get("IdList", [])
             logger.info(f"搜索完成，找到 {len(id_list)} 个结果")
@@ -89,24 +116,25 @@ class PubMedScraper:
             return []
             
         logger.info(f"正在获取 {len(id_list)} 篇文献的详细信息")
-        ids = ",".join(id_list)
+        articles = []
         
-        try:
-            handle = Entrez.efetch(
-                db="pubmed", 
-                id=ids, 
-                retmode="xml"
-            )
-            records = Entrez.read(handle)
-            handle.close()
-            
-            articles = records.get('PubmedArticle', [])
-            logger.info(f"成功获取 {len(articles)} 篇文献详情")
-            return articles
-            
-        except Exception as e:
-            logger.error(f"获取文献详情失败: {e}")
-            return []
+        # 结果数较多时分批请求，避免单个请求的URL和响应过大
+        for start in range(0, len(id_list), EFETCH_BATCH_SIZE):
+            ids = ",".join(id_list[start:start + EFETCH_BATCH_SIZE])
+            try:
+                records = read_entrez(
+                    Entrez.efetch,
+                    db="pubmed", 
+                    id=ids, 
+                    retmode="xml"
+                )
+                articles.extend(records.get('PubmedArticle', []))
+                
+            except Exception as e:
+                logger.error(f"获取文献详情失败: {e}")
+        
+        logger.info(f"成功获取 {len(articles)} 篇文献详情")
+        return articles
     
     def search_with_details(self, query: str, max_results: int = 20) -> List[Dict[str, Any]]:
         """
@@ -0,0 +1,158 @@
+"""
+任务结果存储模块
+每个搜索任务的结果行保存在服务端，按需分页读取；排序使用按字段维护的有序索引，
+首次按某字段排序时建立索引，之后新增行和行更新时增量维护，翻页不需要重新排序全部结果
+"""
+
+import re
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# 空值在升序和降序中都排在最后
+_EMPTY_VALUES = ('', '-', 'N/A', None)
+_NUMBER_PATTERN = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def sort_key(value: Any) -> Tuple[int, Any]:
+    """
+    结果字段的排序键：以数字开头的值按数字比较（如样本量、年份），其余按文本比较
+
+    Returns:
+        (类别, 值)，类别 0 为数字、1 为文本、2 为空值
+    """
+    if value in _EMPTY_VALUES:
+        return (2, '')
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, float(value))
+    text = str(value).strip()
+    match = _NUMBER_PATTERN.match(text)
+    if match:
+        return (0, float(match.group()))
+    return (1, text.lower())
+
+
+class ResultStore:
+    """
+    一个任务的结果行（线程安全）
+
+    行按 PMID 标识，row_update 事件原地更新对应行。
+    """
+
+    def __init__(self, id_field: str = 'PMID'):
+        """
+        初始化结果存储
+
+        Args:
+            id_field: 标识结果行的字段
+        """
+        self.id_field = id_field
+        self._rows: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self._fields: Dict[str, None] = {}
+        # 字段 -> 按 (排序键, 行号) 升序排列的索引
+        self._indexes: Dict[str, List[Tuple[Tuple[int, Any], int]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    @property
+    def fields(self) -> List[str]:
+        """结果行中出现过的字段（可用于排序）"""
+        with self._lock:
+            return list(self._fields)
+
+    def append(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        追加一行结果
+
+        Args:
+            row: 结果行
+
+        Returns:
+            保存的结果行副本（事件中的原始行不受之后的更新影响）
+        """
+        row = dict(row)
+        with self._lock:
+            position = len(self._rows)
+            self._rows.append(row)
+            row_id = row.get(self.id_field)
+            if row_id not in (None, ''):
+                self._positions[str(row_id)] = position
+            for field in row:
+                self._fields.setdefault(field, None)
+            for field, index in self._indexes.items():
+                bisect.insort(index, (sort_key(row.get(field)), position))
+            return row
+
+    def update(self, row_id: Any, fields: Dict[str, Any]) -> bool:
+        """
+        更新已有行的字段
+
+        Args:
+            row_id: 行标识（PMID）
+            fields: 要更新的字段
+
+        Returns:
+            是否找到该行
+        """
+        with self._lock:
+            position = self._positions.get(str(row_id))
+            if position is None:
+                return False
+            row = self._rows[position]
+            for field, value in fields.items():
+                index = self._indexes.get(field)
+                if index is not None:
+                    old = (sort_key(row.get(field)), position)
+                    del index[bisect.bisect_left(index, old)]
+                    bisect.insort(index, (sort_key(value), position))
+                row[field] = value
+                self._fields.setdefault(field, None)
+            return True
+
+    def _index(self, field: str) -> List[Tuple[Tuple[int, Any], int]]:
+        """获取字段的有序索引，不存在时建立（持有锁时调用）"""
+        index = self._indexes.get(field)
+        if index is None:
+            index = sorted((sort_key(row.get(field)), position) for position, row in enumerate(self._rows))
+            self._indexes[field] = index
+        return index
+
+    def page(self, offset: int = 0, limit: int = 100, sort: Optional[str] = None) -> Dict[str, Any]:
+        """
+        读取一页结果
+
+        Args:
+            offset: 起始位置
+            limit: 行数
+            sort: 排序字段，前缀 "-" 表示降序；None 表示按产生顺序
+
+        Returns:
+            {total, offset, limit, sort, rows}，rows 为结果行的副本；排序字段不存在时抛出 KeyError
+        """
+        offset = max(0, offset)
+        limit = max(0, limit)
+        with self._lock:
+            total = len(self._rows)
+            if not sort:
+                positions = range(offset, min(total, offset + limit))
+            else:
+                field = sort[1:] if sort.startswith('-') else sort
+                if self._rows and field not in self._fields:
+                    raise KeyError(field)
+                index = self._index(field)
+                if sort.startswith('-'):
+                    # 降序时空值仍排在最后
+                    filled = bisect.bisect_left(index, ((2, ''), -1))
+                    end = offset + limit
+                    positions = [position for _, position in
+                                 reversed(index[max(0, filled - end):max(0, filled - offset)])]
+                    positions.extend(position for _, position in
+                                     index[filled + max(0, offset - filled):filled + max(0, end - filled)])
+                else:
+                    positions = [position for _, position in index[offset:offset + limit]]
+            rows = [dict(self._rows[position]) for position in positions]
+        return {'total': total, 'offset': offset, 'limit': limit, 'sort': sort or None, 'rows': rows}
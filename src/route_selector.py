@@ -0,0 +1,227 @@
+"""
+路由选择模块
+按 (密钥, 端点, 模型) 维护延迟和错误率的指数加权移动平均(EWMA)，
+为每个请求选择预期完成时间最短的模型和密钥，同时根据进行中的请求数在密钥间分散负载
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Any
+
+from src.config import config_manager
+
+logger = logging.getLogger(__name__)
+
+# 错误率上限，避免预期完成时间除以0
+MAX_ERROR_RATE = 0.95
+
+# 每个 (端点, 模型) 保留的最近成功请求延迟样本数（用于计算分位数）
+LATENCY_SAMPLE_SIZE = 200
+
+
+class RouteStats:
+    """单条路径 (密钥, 端点, 模型) 的统计信息，由RouteSelector在持有锁时读写"""
+
+    def __init__(self, default_latency: float):
+        self.latency = default_latency
+        self.error_rate = 0.0
+        self.samples = 0
+        self.in_flight = 0
+        self.updated_at = time.monotonic()
+
+
+class RouteSelector:
+    """
+    延迟感知的路由选择器
+
+    预期完成时间 = EWMA延迟 × (1 + 进行中请求数 × 惩罚系数) / (1 - 错误率)，
+    即一次请求的耗时按需要重试的期望次数放大；错误率随时间衰减，
+    使暂时故障的路径在一段时间后能被重新尝试。
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        """
+        初始化路由选择器
+
+        Args:
+            config: 路由配置字典（见 src.config.ROUTE_SELECTOR_CONFIG）
+        """
+        config = config or {}
+        self.alpha = config.get("ewma_alpha", 0.3)
+        self.default_latency = config.get("default_latency", 5.0)
+        self.in_flight_penalty = config.get("in_flight_penalty", 0.5)
+        self.error_half_life = config.get("error_half_life", 300)
+        self._routes: Dict[Tuple[str, str, str], RouteStats] = {}
+        self._latency_samples: Dict[Tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, route: Tuple[str, str, str]) -> RouteStats:
+        """获取路径统计（持有锁时调用）"""
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = RouteStats(self.default_latency)
+            self._routes[route] = stats
+        return stats
+
+    def _latency_estimate(self, route: Tuple[str, str, str], stats: RouteStats) -> float:
+        """路径的延迟估计：尚无样本时使用同一端点和模型在其他密钥上的平均延迟（持有锁时调用）"""
+        if stats.samples:
+            return stats.latency
+        peers = [other.latency for (_, endpoint, model), other in self._routes.items()
+                 if endpoint == route[1] and model == route[2] and other.samples]
+        return sum(peers) / len(peers) if peers else self.default_latency
+
+    def _expected_time(self, route: Tuple[str, str, str], now: float) -> float:
+        """计算路径的预期完成时间（持有锁时调用）"""
+        stats = self._get(route)
+        decay = 0.5 ** ((now - stats.updated_at) / self.error_half_life) if self.error_half_life > 0 else 1.0
+        error_rate = min(MAX_ERROR_RATE, stats.error_rate * decay)
+        load = 1 + stats.in_flight * self.in_flight_penalty
+        return self._latency_estimate(route, stats) * load / (1 - error_rate)
+
+    def begin(self, key_id: str, endpoint: str, model: str):
+        """
+        记录请求开始
+
+        Args:
+            key_id: 密钥标识符（不使用密钥原文）
+            endpoint: API端点
+            model: 模型名称
+        """
+        with self._lock:
+            self._get((key_id, endpoint, model)).in_flight += 1
+
+    def record(self, key_id: str, endpoint: str, model: str, latency: float, success: bool):
+        """
+        记录请求结果并更新EWMA
+
+        Args:
+            key_id: 密钥标识符
+            endpoint: API端点
+            model: 模型名称
+            latency: 请求耗时（秒），超时请求传入超时时长
+            success: 请求是否成功
+        """
+        with self._lock:
+            stats = self._get((key_id, endpoint, model))
+            stats.in_flight = max(0, stats.in_flight - 1)
+            now = time.monotonic()
+            # 先把错误率衰减到当前时刻，再与新样本加权
+            if self.error_half_life > 0:
+                stats.error_rate *= 0.5 ** ((now - stats.updated_at) / self.error_half_life)
+            if stats.samples == 0:
+                stats.latency = latency
+            else:
+                stats.latency += self.alpha * (latency - stats.latency)
+            stats.error_rate += self.alpha * ((0.0 if success else 1.0) - stats.error_rate)
+            stats.samples += 1
+            stats.updated_at = now
+            if success:
+                samples = self._latency_samples.setdefault((endpoint, model), deque(maxlen=LATENCY_SAMPLE_SIZE))
+                samples.append(latency)
+
+    def cancel(self, key_id: str, endpoint: str, model: str):
+        """
+        记录请求被主动取消（如对冲请求中落败的一方），只减少进行中计数，不计入延迟和错误率
+
+        Args:
+            key_id: 密钥标识符
+            endpoint: API端点
+            model: 模型名称
+        """
+        with self._lock:
+            stats = self._get((key_id, endpoint, model))
+            stats.in_flight = max(0, stats.in_flight - 1)
+
+    def latency_percentile(self, endpoint: str, model: str, quantile: float, min_samples: int = 1) -> Optional[float]:
+        """
+        计算 (端点, 模型) 最近成功请求延迟的分位数
+
+        Args:
+            endpoint: API端点
+            model: 模型名称
+            quantile: 分位数（0-1）
+            min_samples: 样本数少于该值时返回None
+
+        Returns:
+            延迟分位数（秒），样本不足时返回None
+        """
+        with self._lock:
+            samples = sorted(self._latency_samples.get((endpoint, model), ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, int(quantile * len(samples)))
+        return samples[index]
+
+    def rank_keys(self, key_ids: List[str], endpoint: str, model: str) -> List[str]:
+        """
+        按预期完成时间对密钥排序（相同时保持传入顺序，即密钥池的轮换顺序）
+
+        Args:
+            key_ids: 候选密钥标识符
+            endpoint: API端点
+            model: 模型名称
+
+        Returns:
+            排序后的密钥标识符列表
+        """
+        with self._lock:
+            now = time.monotonic()
+            costs = {key_id: self._expected_time((key_id, endpoint, model), now) for key_id in key_ids}
+        return sorted(key_ids, key=lambda key_id: costs[key_id])
+
+    def rank_models(self, model_configs: List[Tuple[str, str]], key_ids: List[str]) -> List[Tuple[str, str]]:
+        """
+        按各模型最快密钥的预期完成时间对模型配置排序（相同时保持原有的回退顺序）
+
+        Args:
+            model_configs: (模型名称, 端点) 列表
+            key_ids: 可用的密钥标识符
+
+        Returns:
+            排序后的模型配置列表
+        """
+        if not key_ids:
+            return list(model_configs)
+
+        with self._lock:
+            now = time.monotonic()
+            costs = {
+                (model, endpoint): min(self._expected_time((key_id, endpoint, model), now) for key_id in key_ids)
+                for model, endpoint in model_configs
+            }
+        ranked = sorted(model_configs, key=lambda config: costs[(config[0], config[1])])
+        if ranked != list(model_configs):
+            logger.debug("路由顺序调整为: %s", [model for model, _ in ranked])
+        return ranked
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        获取所有路径的统计信息
+
+        Returns:
+            以 "密钥|端点|模型" 为键的统计字典
+        """
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "|".join(route): {
+                    "latency": round(self._latency_estimate(route, stats), 3),
+                    "error_rate": round(stats.error_rate, 3),
+                    "samples": stats.samples,
+                    "in_flight": stats.in_flight,
+                    "expected_time": round(self._expected_time(route, now), 3)
+                }
+                for route, stats in self._routes.items()
+            }
+
+
+def create_route_selector() -> RouteSelector:
+    """根据配置创建全局路由选择器"""
+    return RouteSelector(config_manager.get_api_config().get("route_config"))
+
+
+# 全局实例
+route_selector = create_route_selector()
@@ -2,6 +2,44 @@
 let isSearching = false;
 let currentController = null; // 用于取消 fetch 请求
 let currentKeyword = ''; // 当前搜索关键词
+let currentJobId = null; // 服务端搜索任务ID，用于停止当前任务和断线续传
+let lastJobId = null; // 最近一次搜索任务ID（停止后仍可下载完整日志）
+const MAX_STREAM_RETRIES = 8; // 事件流连续重连次数上限
+const STREAM_LOG_LEVEL = 'info'; // 订阅事件流时请求的最低日志级别（debug 日志留在服务端，可下载完整日志查看）
+const LOG_BUFFER_SIZE = 1000; // 日志控制台保留的日志条数（环形缓冲区，超出后丢弃最早的日志）
+const LOG_LEVEL_SEVERITY = { debug: 10, info: 20, success: 20, warning: 30, error: 40, danger: 40 };
+// 日志控制台：固定容量的环形缓冲区、等待渲染的日志和当前的级别过滤
+const logView = {
+    entries: new Array(LOG_BUFFER_SIZE),
+    start: 0,
+    count: 0,
+    pending: [],
+    minLevel: 'debug',
+    rebuild: false,
+    renderScheduled: false
+};
+const RESULT_ROW_HEIGHT = 80; // 结果行固定高度（像素，单元格内容最多显示3行），用于虚拟滚动计算
+const RESULT_OVERSCAN = 10; // 可见区域上下额外渲染的行数
+const RESULT_HIGHLIGHT_MS = 1500; // 行更新后的高亮时长
+const RESULTS_FETCH_SIZE = 200; // 按排序浏览时每次从服务端读取的行数
+const SORTED_REFRESH_DELAY = 1000; // 按排序浏览时有新结果到达后刷新缓存的延迟
+const EXPORT_PAGE_SIZE = 500; // 导出CSV时每次读取的行数（服务端每页上限）
+const resultsView = { jobId: null, sort: null, total: 0 }; // 当前结果表格：所属任务、排序字段、结果总数
+// 结果表格的行存储：表格只渲染可见的行，行数据保存在这里（按排序浏览时为从服务端按需读取的稀疏缓存）
+const resultStore = {
+    rows: [],                 // 位置 -> 结果行
+    indexByPmid: new Map(),   // PMID -> 位置，用于 row_update 原地更新
+    pendingRows: [],          // 等待下一个动画帧加入的行
+    updatedAt: new Map(),     // PMID -> 最近一次更新的时间，用于高亮
+    loadingPages: new Set(),  // 正在从服务端读取的页
+    generation: 0,            // 每次清空缓存时递增，丢弃过期的读取结果
+    refreshTimer: null,
+    renderScheduled: false,
+    renderedRange: null,      // 上次渲染的 [起始行, 结束行, 总行数]
+    dirty: true,
+    rowHeight: RESULT_ROW_HEIGHT,
+    rowHeightMeasured: false
+};
 
 // DOM 元素
 const searchBtn = document.getElementById('search-btn');
@@ -11,12 +49,16 @@ const searchInput = document.getElementById('search-input');
 const searchSection = document.getElementById('search-section');
 const executionSection = document.getElementById('execution-section');
 const logConsole = document.getElementById('log-console');
+const logLevelFilter = document.getElementById('log-level-filter');
+const downloadLogBtn = document.getElementById('download-log-btn');
 const resultsTbody = document.getElementById('results-tbody');
 const statusIndicator = document.getElementById('status-indicator');
 const statusText = document.getElementById('status-text');
 const resultCount = document.getElementById('result-count');
 const stopBtn = document.getElementById('stop-btn');
 const exportCsvBtn = document.getElementById('exportBtn');
+const resultsScroll = document.getElementById('results-scroll');
+const resultsSortHeaders = document.querySelectorAll('#results-table th[data-sort]');
 
 // 模态窗相关DOM元素
 const confirmModal = document.getElementById('confirm-modal');
@@ -38,6 +80,17 @@ searchInput.addEventListener('keypress', function(e) {
 });
 stopBtn.addEventListener('click', stopSearch);
 
+// 日志控制台：级别过滤和完整日志下载
+logLevelFilter.addEventListener('change', () => setLogFilter(logLevelFilter.value));
+downloadLogBtn.addEventListener('click', downloadFullLog);
+
+// 结果表格：滚动时在下一个动画帧渲染可见的行；点击表头排序
+resultsScroll.addEventListener('scroll', scheduleResultsRender, { passive: true });
+window.addEventListener('resize', scheduleResultsRender);
+resultsSortHeaders.forEach(header => {
+    header.addEventListener('click', () => sortResultsBy(header.dataset.sort));
+});
+
 // 模态窗事件监听器
 confirmBtn.addEventListener('click', confirmSearch);
 cancelBtn.addEventListener('click', closeModal);
@@ -217,7 +270,7 @@ function enhanceStatusFeedback() {
 // 确认搜索
 function confirmSearch() {
     if (!validateMaxResults()) {
-        addLog('请输入有效的结果数量 (1-100)', 'error');
+        addLog(`请输入有效的结果数量 (1-${maxResultsInput.max})`, 'error');
         return;
     }
     
@@ -289,6 +342,16 @@ function stopSearch() {
     // 更新停止按钮为重新搜索状态
     updateStopButtonToRestart();
     
+    // 通知服务端停止当前任务（不影响其他用户的搜索）
+    if (currentJobId) {
+        fetch('http://localhost:5001/stop_search', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ job_id: currentJobId })
+        }).catch(error => console.error('停止搜索请求失败:', error));
+        currentJobId = null;
+    }
+    
     // 取消 fetch 请求
     if (currentController) {
         currentController.abort();
@@ -337,20 +400,64 @@ function restartSearch() {
     }, 100);
 }
 
-// 开始流式搜索
+// 开始流式搜索：先创建后台任务，再订阅其事件流
 function startStreamSearch(keyword, maxResults = 20, enableFulltext = true, model) {
     // === 修复：如果没有传入模型参数，使用用户当前选择的模型 ===
     if (!model && aiModelSelect) {
         model = aiModelSelect.value;
     }
     
-    // === 修改 URL，追加 model 参数 ===
-    const url = `http://localhost:5001/stream_search?keyword=${encodeURIComponent(keyword)}&max_results=${maxResults}&enable_fulltext=${enableFulltext}&model=${encodeURIComponent(model)}`;   
     // 创建 AbortController 用于取消请求
     currentController = new AbortController();
     
-    // 使用 fetch API 接收流数据
-    fetch(url, { signal: currentController.signal })
+    // 任务在服务端后台执行，与本页面的连接无关
+    fetch('http://localhost:5001/jobs', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+            keyword: keyword,
+            max_results: maxResults,
+            enable_fulltext: enableFulltext,
+            model: model
+        }),
+        signal: currentController.signal
+    })
+        .then(response => {
+            if (response.status === 429) {
+                // 服务器搜索任务已饱和，提示用户稍后重试
+                return response.json().then(data => {
+                    throw new Error(data.error || '当前搜索任务过多，请稍后重试');
+                });
+            }
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            currentJobId = data.job_id;
+            lastJobId = data.job_id;
+            resultsView.jobId = data.job_id;
+            // 流状态：最后收到的事件ID（断线重连时续传）、结果计数、连续重连次数
+            streamJobEvents(data.job_id, { lastEventId: 0, processedResults: 0, retries: 0 });
+        })
+        .catch(error => {
+            if (error.name === 'AbortError') return;
+            handleStreamFailure(error);
+        });
+}
+
+// 订阅任务事件流；连接中断时按 Last-Event-ID 续传，任务本身不会重新执行
+function streamJobEvents(jobId, state) {
+    if (!isSearching || jobId !== currentJobId) return;
+    
+    currentController = new AbortController();
+    let finished = false;
+    
+    fetch(`http://localhost:5001/jobs/${encodeURIComponent(jobId)}/events?log_level=${STREAM_LOG_LEVEL}`, {
+        headers: { 'Last-Event-ID': String(state.lastEventId) },
+        signal: currentController.signal
+    })
         .then(response => {
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
@@ -359,15 +466,12 @@ function startStreamSearch(keyword, maxResults = 20, enableFulltext = true, mode
             const reader = response.body.getReader();
             const decoder = new TextDecoder();
             let buffer = '';
-            
-            // 状态计数器
-            let processedResults = 0;
+            let pendingEventId = null;
             
             function processData() {
-                reader.read().then(({ done, value }) => {
+                return reader.read().then(({ done, value }) => {
                     if (done) {
                         console.log('流数据读取完成');
-                        // 只做清理工作，状态更新已在接收end/stopped信号时完成
                         return;
                     }
                     
@@ -377,51 +481,24 @@ function startStreamSearch(keyword, maxResults = 20, enableFulltext = true, mode
                     
                     lines.forEach(line => {
                         line = line.trim();
-                        if (line.startsWith('data: ')) {
+                        if (line.startsWith('id: ')) {
+                            pendingEventId = parseInt(line.substring(4), 10);
+                        } else if (line.startsWith('data: ')) {
                             try {
                                 const jsonStr = line.substring(6); // 移除 'data: ' 前缀
                                 const data = JSON.parse(jsonStr);
                                 
                                 if (!isSearching) return;
                                 
-                                if (data.type === 'log' && data.content) {
-                                    // 处理日志消息
-                                    const { timestamp, level, message } = data.content;
-                                    addLog(message, level);
-                                    
-                                    // 更新状态指示器
-                                    if (message.includes('开始搜索')) {
-                                        updateStatus('正在搜索中...', 'running');
-                                    }
-                                    
-                                } else if (data.type === 'row' && data.content) {
-                                    // 处理数据行
-                                    addResultRow(data.content);
-                                    processedResults++;
-                                    resultCount.textContent = `结果: ${processedResults}`;
-                                    
-                                } else if (data.type === 'end') {
-                                    isSearching = false;
-                                    updateSearchButton(false);
-                                    updateStatus('搜索完成', 'completed');
-                                    addLog(`搜索完成，共获取 ${processedResults} 条结果`, 'success');
-                                    
-                                    // 更新导出按钮状态（如果有结果）
-                                    updateExportButtonState(processedResults > 0);
-                                    
-                                    // 更新停止按钮为重新搜索状态
-                                    updateStopButtonToRestart();
-                                } else if (data.type === 'stopped') {
-                                    isSearching = false;
-                                    updateSearchButton(false);
-                                    updateStatus('搜索已停止', 'stopped');
-                                    addLog(`搜索已停止，已获取 ${processedResults} 条结果`, 'warning');
-                                    
-                                    // 更新导出按钮状态（如果有结果）
-                                    updateExportButtonState(processedResults > 0);
-                                    
-                                    // 更新停止按钮为重新搜索状态
-                                    updateStopButtonToRestart();
+                                // 记录已处理的事件ID，重连时从这里续传
+                                if (pendingEventId !== null) {
+                                    state.lastEventId = pendingEventId;
+                                    pendingEventId = null;
+                                }
+                                state.retries = 0;
+                                
+                                if (handleStreamEvent(data, state)) {
+                                    finished = true;
                                 }
                             } catch (parseError) {
                                 console.error('解析数据出错:', parseError, '原始数据:', line);
@@ -429,23 +506,115 @@ function startStreamSearch(keyword, maxResults = 20, enableFulltext = true, mode
                         }
                     });
                     
-                    if (isSearching) {
-                        processData();
+                    if (isSearching && !finished) {
+                        return processData();
                     }
                 });
             }
             
-            processData();
+            return processData();
+        })
+        .then(() => {
+            // 流在任务结束前断开（如代理超时），续传剩余事件
+            if (isSearching && !finished) {
+                reconnectJobEvents(jobId, state, new Error('连接已断开'));
+            }
         })
         .catch(error => {
+            if (error.name === 'AbortError') return;
             console.error('流式搜索错误:', error);
-            isSearching = false;
-            updateSearchButton(false);
-            updateStatus('搜索失败: ' + error.message, 'error');
-            addLog('搜索请求失败: ' + error.message, 'error');
+            if (isSearching && !finished) {
+                reconnectJobEvents(jobId, state, error);
+            }
         });
 }
 
+// 断线后按指数退避重连，连续失败超过上限时放弃
+function reconnectJobEvents(jobId, state, error) {
+    state.retries++;
+    if (state.retries > MAX_STREAM_RETRIES) {
+        handleStreamFailure(error);
+        return;
+    }
+    
+    const delay = Math.min(1000 * Math.pow(2, state.retries - 1), 10000);
+    addLog(`连接中断，${Math.round(delay / 1000)} 秒后重新连接（第 ${state.retries} 次）...`, 'warning');
+    setTimeout(() => streamJobEvents(jobId, state), delay);
+}
+
+// 处理一条任务事件，返回是否为终止事件
+function handleStreamEvent(data, state) {
+    if (data.type === 'logs' && Array.isArray(data.content)) {
+        // 服务端按刷新周期合并发送的一批日志
+        data.content.forEach(handleLogEntry);
+        
+    } else if (data.type === 'log' && data.content) {
+        handleLogEntry(data.content);
+        
+    } else if (data.type === 'queue' && data.content) {
+        // 任务排队中：显示排队位置和预计开始时间
+        const { position, eta_seconds, estimated_start } = data.content;
+        updateStatus(`排队中：第 ${position} 位，预计 ${estimated_start} 开始`, 'loading');
+        addLog(`任务排队中，前面还有 ${position - 1} 个任务，预计约 ${eta_seconds} 秒后开始`, 'info');
+        
+    } else if (data.type === 'row' && data.content) {
+        // 处理数据行：加入行存储，按动画帧批量渲染
+        addResultRow(data.content, state.processedResults);
+        state.processedResults++;
+        resultCount.textContent = `结果: ${state.processedResults}`;
+        
+    } else if (data.type === 'row_update' && data.content) {
+        // 全文分析或补提取完成后原地更新已有的行
+        updateResultRow(data.content.PMID, data.content.fields || {});
+        
+    } else if (data.type === 'end') {
+        isSearching = false;
+        updateSearchButton(false);
+        updateStatus('搜索完成', 'completed');
+        addLog(`搜索完成，共获取 ${state.processedResults} 条结果`, 'success');
+        
+        // 更新导出按钮状态（如果有结果）
+        updateExportButtonState(state.processedResults > 0);
+        
+        // 更新停止按钮为重新搜索状态
+        updateStopButtonToRestart();
+        return true;
+    } else if (data.type === 'stopped') {
+        isSearching = false;
+        updateSearchButton(false);
+        updateStatus('搜索已停止', 'stopped');
+        addLog(`搜索已停止，已获取 ${state.processedResults} 条结果`, 'warning');
+        
+        // 更新导出按钮状态（如果有结果）
+        updateExportButtonState(state.processedResults > 0);
+        
+        // 更新停止按钮为重新搜索状态
+        updateStopButtonToRestart();
+        return true;
+    }
+    return false;
+}
+
+// 处理一条日志消息
+function handleLogEntry(entry) {
+    const { level, message, timestamp } = entry;
+    addLog(message, level, timestamp);
+    
+    // 更新状态指示器
+    if (message.includes('开始搜索')) {
+        updateStatus('正在搜索中...', 'running');
+    }
+}
+
+// 搜索请求失败
+function handleStreamFailure(error) {
+    console.error('流式搜索错误:', error);
+    isSearching = false;
+    updateSearchButton(false);
+    updateStatus('搜索失败: ' + error.message, 'error');
+    addLog('搜索请求失败: ' + error.message, 'error');
+}
+
 // 更新搜索按钮状态
 function updateSearchButton(searching) {
     if (searching) {
@@ -482,9 +651,74 @@ function updateStatus(text, type) {
     }
 }
 
-// 添加日志 (浅色系适配版)
-function addLog(message, level = 'info') {
-    const timestamp = new Date().toLocaleTimeString();
+// 添加日志：写入日志环形缓冲区，在下一个动画帧与同一帧内的其他日志一起渲染
+function addLog(message, level = 'info', timestamp = new Date().toLocaleTimeString()) {
+    const entry = { timestamp, level, message: String(message) };
+    const buffer = logView.entries;
+    if (logView.count < buffer.length) {
+        buffer[(logView.start + logView.count) % buffer.length] = entry;
+        logView.count++;
+    } else {
+        // 缓冲区已满：覆盖最早的日志
+        buffer[logView.start] = entry;
+        logView.start = (logView.start + 1) % buffer.length;
+    }
+    
+    logView.pending.push(entry);
+    if (logView.pending.length > buffer.length) {
+        logView.pending.splice(0, logView.pending.length - buffer.length);
+    }
+    scheduleLogRender();
+}
+
+// 在下一个动画帧渲染待显示的日志（同一帧内的多条日志合并为一次DOM更新）
+function scheduleLogRender() {
+    if (logView.renderScheduled) return;
+    logView.renderScheduled = true;
+    requestAnimationFrame(renderLogs);
+}
+
+// 渲染日志：追加新日志并删除超出缓冲区容量的最早节点；切换级别过滤时从缓冲区重建
+function renderLogs() {
+    logView.renderScheduled = false;
+    
+    // 用户向上翻看历史日志时不自动滚动到底部
+    const stickToBottom = logConsole.scrollHeight - logConsole.scrollTop - logConsole.clientHeight < 40;
+    
+    let entries = logView.pending;
+    if (logView.rebuild) {
+        logConsole.textContent = '';
+        entries = [];
+        for (let i = 0; i < logView.count; i++) {
+            entries.push(logView.entries[(logView.start + i) % logView.entries.length]);
+        }
+        logView.rebuild = false;
+    } else if (logConsole.querySelector('[data-placeholder]')) {
+        logConsole.textContent = '';
+    }
+    logView.pending = [];
+    
+    const threshold = LOG_LEVEL_SEVERITY[logView.minLevel] || 0;
+    const fragment = document.createDocumentFragment();
+    entries.forEach(entry => {
+        if ((LOG_LEVEL_SEVERITY[entry.level] || LOG_LEVEL_SEVERITY.info) >= threshold) {
+            fragment.appendChild(createLogElement(entry));
+        }
+    });
+    logConsole.appendChild(fragment);
+    
+    while (logConsole.childElementCount > logView.entries.length) {
+        logConsole.firstElementChild.remove();
+    }
+    
+    if (stickToBottom) {
+        logConsole.scrollTop = logConsole.scrollHeight;
+    }
+}
+
+// 生成一条日志的DOM节点 (浅色系适配版)
+function createLogElement(entry) {
+    const { timestamp, level, message } = entry;
     const logEntry = document.createElement('div');
     logEntry.className = 'log-entry flex items-start space-x-3 text-sm border-b border-slate-50 pb-1 mb-1 last:border-0';
     
@@ -497,85 +731,96 @@ function addLog(message, level = 'info') {
     
     // 如果是 info 级别，保持 slate 色，但可以加深一点
     if (level === 'info') colorClass = 'text-slate-700';
-
-    logEntry.innerHTML = `
-        <span class="text-slate-400 text-xs mt-0.5 font-mono shrink-0">${timestamp}</span>
-        <span class="${colorClass} break-all">${message}</span>
-    `;
     
-    logConsole.appendChild(logEntry);
-    logConsole.scrollTop = logConsole.scrollHeight;
+    const timeSpan = document.createElement('span');
+    timeSpan.className = 'text-slate-400 text-xs mt-0.5 font-mono shrink-0';
+    timeSpan.textContent = timestamp;
+    const messageSpan = document.createElement('span');
+    messageSpan.className = `${colorClass} break-all`;
+    messageSpan.textContent = message;
+    logEntry.append(timeSpan, messageSpan);
+    return logEntry;
 }
 
-// CSV导出功能
-function exportToCSV() {
-    const table = document.getElementById('results-table');
-    const rows = table.querySelectorAll('tbody tr');
-    
-    // 检查是否有数据可导出
-    if (rows.length === 0 || (rows.length === 1 && rows[0].querySelector('td[colspan]'))) {
+// 按级别过滤日志控制台（只影响显示，缓冲区保留全部收到的日志）
+function setLogFilter(level) {
+    logView.minLevel = level;
+    logView.rebuild = true;
+    scheduleLogRender();
+}
+
+// 下载当前任务的完整日志（由服务端的任务日志文件生成，包括未推送到页面的调试日志）
+function downloadFullLog() {
+    if (!lastJobId) {
+        addLog('⚠️ 暂无可下载的任务日志', 'warning');
+        return;
+    }
+    const link = document.createElement('a');
+    link.href = `http://localhost:5001/jobs/${encodeURIComponent(lastJobId)}/logs`;
+    link.download = `搜索日志_${lastJobId}.log`;
+    link.style.visibility = 'hidden';
+    document.body.appendChild(link);
+    link.click();
+    document.body.removeChild(link);
+}
+
+// CSV导出功能：从服务端分页读取当前任务的全部结果（按当前排序），不依赖表格中显示的行
+async function exportToCSV() {
+    if (!resultsView.jobId || resultsView.total === 0) {
         addLog('⚠️ 暂无搜索结果可供导出', 'warning');
         return;
     }
     
-    // 定义列标题（按表格显示顺序）
-    const headers = [
-        '发表年份',
-        '数据收集年份', 
-        '国家',
-        '研究类型',
-        '研究对象',
-        '样本量',
-        '推荐补充剂量',
-        '作用机理',
-        '证据等级',
-        '结论摘要',
-        '标题',
-        'PMID',
-        '全文状态'
+    // 定义列（按表格显示顺序）：列标题和对应的结果字段
+    const columns = [
+        ['发表年份', result => result.发表年份],
+        ['数据收集年份', result => result.数据收集年份],
+        ['国家', result => result.国家],
+        ['研究类型', result => result.研究类型],
+        ['研究对象', result => result.研究对象],
+        ['样本量', result => result.样本量],
+        ['推荐补充剂量', result => result['推荐补充剂量/用法']],
+        ['作用机理', result => result.作用机理],
+        ['证据等级', result => result.证据等级],
+        ['结论摘要', result => result.结论摘要],
+        ['标题', result => result.标题 || result.原文标题],
+        ['中文标题', result => result.翻译标题],
+        ['PMID', result => result.PMID],
+        ['全文状态', result => getFulltextStatusText(result.免费全文状态)]
     ];
     
-    // 准备CSV数据
-    const csvData = [];
-    
-    // 添加表头
-    csvData.push(headers);
+    // 分页读取全部结果
+    exportCsvBtn.disabled = true;
+    const results = [];
+    try {
+        let offset = 0;
+        while (true) {
+            const page = await fetchResultsPage(resultsView.jobId, offset, EXPORT_PAGE_SIZE, resultsView.sort);
+            results.push(...page.rows);
+            offset += page.rows.length;
+            if (page.rows.length === 0 || offset >= page.total) break;
+        }
+    } catch (error) {
+        addLog(`❌ 读取导出数据失败: ${error.message}`, 'error');
+        return;
+    } finally {
+        updateExportButtonState(resultsView.total > 0);
+    }
     
-    // 添加数据行
-    rows.forEach(row => {
-        // 跳过空状态行
-        if (row.querySelector('td[colspan]')) return;
-        
-        const cells = row.querySelectorAll('td');
-        if (cells.length >= 13) {
-            const rowData = [];
+    // 准备CSV数据
+    const csvData = [columns.map(([header]) => header)];
+    results.forEach(result => {
+        csvData.push(columns.map(([, getValue]) => {
+            // 清理并转义特殊字符
+            let cellContent = String(getValue(result) ?? '').replace(/\s+/g, ' ').trim();
+            if (cellContent === '-') cellContent = '';
             
-            // 按照定义的列顺序提取数据
-            for (let i = 0; i < 13; i++) {
-                let cellContent = cells[i].textContent.trim();
-                
-                // 处理PMID链接 - 只提取PMID数字
-                if (i === 11) { // PMID列（从0开始）
-                    const linkElement = cells[i].querySelector('a');
-                    if (linkElement) {
-                        cellContent = linkElement.textContent.trim();
-                    }
-                }
-                
-                // 清理并转义特殊字符
-                cellContent = cellContent.replace(/\s+/g, ' ').trim();
-                if (cellContent === '-') cellContent = '';
-                
-                // 转义CSV特殊字符（引号、逗号、换行符）
-                if (cellContent.includes('"') || cellContent.includes(',') || cellContent.includes('\n') || cellContent.includes('\r')) {
-                    cellContent = '"' + cellContent.replace(/"/g, '""') + '"';
-                }
-                
-                rowData.push(cellContent);
+            // 转义CSV特殊字符（引号、逗号、换行符）
+            if (cellContent.includes('"') || cellContent.includes(',') || cellContent.includes('\n') || cellContent.includes('\r')) {
+                cellContent = '"' + cellContent.replace(/"/g, '""') + '"';
             }
-            
-            csvData.push(rowData);
-        }
+            return cellContent;
+        }));
     });
     
     // 生成CSV内容
@@ -607,7 +852,95 @@ function exportToCSV() {
     link.click();
     document.body.removeChild(link);
     
-    addLog(`✅ CSV文件导出成功: ${filename}`, 'success');
+    addLog(`✅ CSV文件导出成功: ${filename}（${results.length} 条）`, 'success');
+}
+
+// 读取任务的一页结果
+function fetchResultsPage(jobId, offset, limit, sort) {
+    const params = new URLSearchParams({ offset: String(offset), limit: String(limit) });
+    if (sort) params.set('sort', sort);
+    return fetch(`http://localhost:5001/jobs/${encodeURIComponent(jobId)}/results?${params}`)
+        .then(response => {
+            if (!response.ok) {
+                return response.json().catch(() => ({})).then(data => {
+                    throw new Error(data.error || `HTTP error! status: ${response.status}`);
+                });
+            }
+            return response.json();
+        });
+}
+
+// 从服务端读取可见范围内尚未缓存的结果（按排序浏览，或清空缓存后重新浏览时）
+function ensureResultRowsLoaded(first, last) {
+    if (!resultsView.jobId) return;
+    for (let index = first; index < last; index++) {
+        if (resultStore.rows[index] !== undefined) continue;
+        
+        const offset = Math.floor(index / RESULTS_FETCH_SIZE) * RESULTS_FETCH_SIZE;
+        index = offset + RESULTS_FETCH_SIZE - 1;
+        const key = `${resultsView.sort || ''}|${offset}`;
+        if (resultStore.loadingPages.has(key)) continue;
+        
+        resultStore.loadingPages.add(key);
+        const jobId = resultsView.jobId;
+        const sort = resultsView.sort;
+        const generation = resultStore.generation;
+        fetchResultsPage(jobId, offset, RESULTS_FETCH_SIZE, sort)
+            .then(page => {
+                // 读取期间切换了排序或任务时丢弃这一页
+                if (generation !== resultStore.generation) return;
+                page.rows.forEach((row, i) => storeResultRow(row, page.offset + i));
+                resultsView.total = Math.max(resultsView.total, page.total);
+                markResultsDirty();
+            })
+            .catch(error => addLog(`读取结果失败: ${error.message}`, 'error'))
+            .finally(() => resultStore.loadingPages.delete(key));
+    }
+}
+
+// 把一行结果放到行存储的指定位置
+function storeResultRow(result, index) {
+    resultStore.rows[index] = result;
+    if (result.PMID) {
+        resultStore.indexByPmid.set(String(result.PMID), index);
+    }
+}
+
+// 清空行存储（切换排序或开始新搜索时）；进行中的读取结果会被丢弃
+function resetResultStore() {
+    resultStore.rows = [];
+    resultStore.indexByPmid.clear();
+    resultStore.loadingPages.clear();
+    resultStore.generation++;
+    resultsScroll.scrollTop = 0;
+}
+
+// 按字段排序：再次点击同一列切换为降序，第三次恢复产生顺序；排序后的结果按需从服务端读取
+function sortResultsBy(field) {
+    if (!resultsView.jobId) return;
+    if (resultsView.sort === field) {
+        resultsView.sort = '-' + field;
+    } else if (resultsView.sort === '-' + field) {
+        resultsView.sort = null;
+    } else {
+        resultsView.sort = field;
+    }
+    flushPendingResultRows();
+    updateSortIndicators();
+    resetResultStore();
+    markResultsDirty();
+}
+
+// 在表头显示当前排序方向
+function updateSortIndicators() {
+    resultsSortHeaders.forEach(header => {
+        const label = header.dataset.label || header.textContent.trim();
+        header.dataset.label = label;
+        let indicator = '';
+        if (resultsView.sort === header.dataset.sort) indicator = ' ▲';
+        if (resultsView.sort === '-' + header.dataset.sort) indicator = ' ▼';
+        header.textContent = label + indicator;
+    });
 }
 
 // 更新导出按钮状态
@@ -624,32 +957,172 @@ function updateExportButtonState(hasData) {
 
 // 清空日志 (浅色系适配版)
 function clearLogs() {
-    logConsole.innerHTML = '<div class="text-slate-400 text-center pt-8">等待搜索开始...</div>';
+    logView.entries = new Array(LOG_BUFFER_SIZE);
+    logView.start = 0;
+    logView.count = 0;
+    logView.pending = [];
+    lastJobId = null;
+    logConsole.innerHTML = '<div class="text-slate-400 text-center pt-8" data-placeholder>等待搜索开始...</div>';
 }
 
 // 清空结果
 function clearResults() {
-    resultsTbody.innerHTML = `
-        <tr>
-            <td colspan="14" class="px-6 py-8 text-center text-gray-500">
-                暂无搜索结果
-            </td>
-        </tr>
-    `;
+    resultsView.jobId = null;
+    resultsView.sort = null;
+    resultsView.total = 0;
+    resultStore.pendingRows = [];
+    resultStore.updatedAt.clear();
+    clearTimeout(resultStore.refreshTimer);
+    resultStore.refreshTimer = null;
+    resetResultStore();
+    updateSortIndicators();
+    markResultsDirty();
     updateExportButtonState(false); // 更新导出按钮状态
 }
 
-// 添加单行结果
-function addResultRow(result) {
-    // 如果是第一行结果，清空"暂无搜索结果"提示
-    const emptyRow = resultsTbody.querySelector('tr td[colspan="14"]');
-    if (emptyRow) {
-        resultsTbody.innerHTML = '';
+// 添加单行结果：先放入待处理队列，在下一个动画帧中与同一帧内到达的其他行一起加入行存储
+function addResultRow(result, index = resultsView.total) {
+    resultStore.pendingRows.push({ result: { ...result }, index });
+    resultsView.total = Math.max(resultsView.total, index + 1);
+    scheduleResultsRender();
+}
+
+// 原地更新已有的行（渐进式结果：全文分析完成后替换字段）
+function updateResultRow(pmid, fields) {
+    pmid = String(pmid);
+    const pending = resultStore.pendingRows.find(entry => String(entry.result.PMID) === pmid);
+    if (pending) {
+        Object.assign(pending.result, fields);
+        return;
     }
     
-    const row = document.createElement('tr');
-    row.className = 'hover:bg-gray-50 transition-colors opacity-0';
+    const index = resultStore.indexByPmid.get(pmid);
+    if (index === undefined || !resultStore.rows[index]) return;
+    Object.assign(resultStore.rows[index], fields);
+    
+    // 短暂高亮提示该行已更新
+    resultStore.updatedAt.set(pmid, performance.now());
+    markResultsDirty();
+    setTimeout(markResultsDirty, RESULT_HIGHLIGHT_MS);
+}
+
+// 把待处理的行加入行存储；按排序浏览时新行的位置由服务端决定，稍后刷新缓存
+function flushPendingResultRows() {
+    if (resultStore.pendingRows.length === 0) return;
+    if (!resultsView.sort) {
+        resultStore.pendingRows.forEach(({ result, index }) => storeResultRow(result, index));
+    } else if (!resultStore.refreshTimer) {
+        resultStore.refreshTimer = setTimeout(() => {
+            resultStore.refreshTimer = null;
+            const scrollTop = resultsScroll.scrollTop;
+            resetResultStore();
+            resultsScroll.scrollTop = scrollTop;
+            markResultsDirty();
+        }, SORTED_REFRESH_DELAY);
+    }
+    resultStore.pendingRows = [];
+    updateExportButtonState(resultsView.total > 0);
+}
+
+// 标记表格需要重新渲染
+function markResultsDirty() {
+    resultStore.dirty = true;
+    scheduleResultsRender();
+}
+
+// 在下一个动画帧渲染结果表格（同一帧内的多次请求合并为一次）
+function scheduleResultsRender() {
+    if (resultStore.renderScheduled) return;
+    resultStore.renderScheduled = true;
+    requestAnimationFrame(() => {
+        resultStore.renderScheduled = false;
+        flushPendingResultRows();
+        renderVisibleResultRows();
+    });
+}
+
+// 只渲染滚动区域内可见的行（上下各多渲染若干行），其余位置用占位行撑开滚动高度
+function renderVisibleResultRows() {
+    const total = resultsView.total;
+    if (total === 0) {
+        if (resultStore.renderedRange !== null || resultStore.dirty) {
+            resultsTbody.innerHTML = `
+                <tr>
+                    <td colspan="14" class="px-6 py-8 text-center text-gray-500">
+                        暂无搜索结果
+                    </td>
+                </tr>
+            `;
+        }
+        resultStore.renderedRange = null;
+        resultStore.dirty = false;
+        return;
+    }
+    
+    const rowHeight = resultStore.rowHeight;
+    const scrollTop = resultsScroll.scrollTop;
+    const viewportHeight = resultsScroll.clientHeight || window.innerHeight;
+    const first = Math.max(0, Math.floor(scrollTop / rowHeight) - RESULT_OVERSCAN);
+    const last = Math.min(total, Math.ceil((scrollTop + viewportHeight) / rowHeight) + RESULT_OVERSCAN);
+    
+    const range = resultStore.renderedRange;
+    if (!resultStore.dirty && range && range[0] === first && range[1] === last && range[2] === total) return;
+    resultStore.renderedRange = [first, last, total];
+    resultStore.dirty = false;
     
+    ensureResultRowsLoaded(first, last);
+    
+    const now = performance.now();
+    const spacer = height => height > 0
+        ? `<tr aria-hidden="true"><td colspan="14" style="height:${height}px;padding:0;border:0"></td></tr>`
+        : '';
+    const html = [spacer(first * rowHeight)];
+    for (let index = first; index < last; index++) {
+        const result = resultStore.rows[index];
+        if (!result) {
+            html.push(`<tr style="height:${rowHeight}px"><td colspan="14" class="px-6 text-xs text-gray-400">加载中...</td></tr>`);
+            continue;
+        }
+        const updatedAt = resultStore.updatedAt.get(String(result.PMID));
+        let rowClass = 'hover:bg-gray-50';
+        if (updatedAt !== undefined) {
+            if (now - updatedAt < RESULT_HIGHLIGHT_MS) {
+                rowClass += ' bg-yellow-50';
+            } else {
+                resultStore.updatedAt.delete(String(result.PMID));
+            }
+        }
+        html.push(`<tr class="${rowClass}" style="height:${rowHeight}px" data-index="${index}">${renderResultCells(result)}</tr>`);
+    }
+    html.push(spacer((total - last) * rowHeight));
+    resultsTbody.innerHTML = html.join('');
+    
+    // 按实际渲染的行高校正（首次渲染时）
+    if (!resultStore.rowHeightMeasured) {
+        const row = resultsTbody.querySelector('tr[data-index]');
+        if (row) {
+            resultStore.rowHeightMeasured = true;
+            const measured = row.getBoundingClientRect().height;
+            if (measured > 0 && Math.abs(measured - rowHeight) > 1) {
+                resultStore.rowHeight = measured;
+                markResultsDirty();
+            }
+        }
+    }
+}
+
+// 格式化全文状态显示为免费/付费
+function getFulltextStatusText(status) {
+    if (!status || status === '-') return '-';
+    if (status === '可用' || status === '免费') return '免费';
+    if (status === '付费' || status === '需要订阅') return '付费';
+    if (status === '提取中' || status === '已提取') return '免费'; // 已提取的认为免费
+    if (status === '检查中') return '检查中'; // 渐进模式：全文状态稍后更新
+    return status.includes('免费') ? '免费' : '付费';
+}
+
+// 生成结果行的单元格HTML
+function renderResultCells(result) {
     // 处理可能为空的字段
     const publishedYear = result.发表年份 || '-';
     const dataCollectionYear = result.数据收集年份 || '-';
@@ -691,56 +1164,40 @@ function addResultRow(result) {
         return `<a href="https://pubmed.ncbi.nlm.nih.gov/${pmid}" target="_blank" class="text-blue-600 hover:text-blue-800 underline transition-colors">${pmid}</a>`;
     };
 
-    // 格式化全文状态显示为免费/付费
-    const getFulltextStatusText = (status) => {
-        if (!status || status === '-') return '-';
-        if (status === '可用' || status === '免费') return '免费';
-        if (status === '付费' || status === '需要订阅') return '付费';
-        if (status === '提取中' || status === '已提取') return '免费'; // 已提取的认为免费
-        return status.includes('免费') ? '免费' : '付费';
-    };
+    const fulltextText = getFulltextStatusText(fulltextStatus);
+    const fulltextBadgeClass = fulltextText === '免费' ? 'bg-green-100 text-green-800'
+        : fulltextText === '检查中' ? 'bg-gray-100 text-gray-800' : 'bg-red-100 text-red-800';
 
-    row.innerHTML = `
+    return `
         <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[80px]">${publishedYear}</td>
         <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[100px]">${dataCollectionYear}</td>
-        <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[90px]">${country}</td>
-        <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[100px]">${studyType}</td>
-        <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[120px]">${studySubject}</td>
-        <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[80px]">${sampleSize}</td>
+        <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[90px]"><div class="line-clamp-3">${country}</div></td>
+        <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[100px]"><div class="line-clamp-3">${studyType}</div></td>
+        <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[120px]"><div class="line-clamp-3">${studySubject}</div></td>
+        <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[80px]"><div class="line-clamp-3">${sampleSize}</div></td>
         <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[180px] max-w-[250px]">
-            <div class="break-words" title="${recommendedDose}">${recommendedDose}</div>
+            <div class="line-clamp-3" title="${recommendedDose}">${recommendedDose}</div>
         </td>
         <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[180px] max-w-[250px]">
-            <div class="break-words" title="${mechanism}">${mechanism}</div>
+            <div class="line-clamp-3" title="${mechanism}">${mechanism}</div>
         </td>
-        <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[90px]">${evidenceLevel}</td>
+        <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[90px]"><div class="line-clamp-3">${evidenceLevel}</div></td>
         <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[200px] max-w-[300px]">
-            <div class="break-words" title="${conclusion}">${conclusion}</div>
+            <div class="line-clamp-3" title="${conclusion}">${conclusion}</div>
         </td>
         <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[200px] max-w-[300px]">
-            <div class="break-words" title="${title}">${title}</div>
+            <div class="line-clamp-3" title="${title}">${title}</div>
         </td>
         <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[200px] max-w-[300px]">
-            <div class="break-words" title="${translatedTitle}">${translatedTitle}</div>
+            <div class="line-clamp-3" title="${translatedTitle}">${translatedTitle}</div>
         </td>
         <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[100px]">${getPMIDLink(pmid)}</td>
         <td class="px-3 py-4 text-xs text-gray-900 align-top min-w-[100px]">
-            <span class="px-2 py-1 rounded-full text-xs font-medium ${getFulltextStatusText(fulltextStatus) === '免费' ? 'bg-green-100 text-green-800' : 'bg-red-100 text-red-800'}">
-                ${getFulltextStatusText(fulltextStatus)}
+            <span class="px-2 py-1 rounded-full text-xs font-medium ${fulltextBadgeClass}">
+                ${fulltextText}
             </span>
         </td>
     `;
-    
-    resultsTbody.appendChild(row);
-    
-    // 动画显示新行
-    setTimeout(() => {
-        row.style.transition = 'opacity 0.3s ease';
-        row.classList.remove('opacity-0');
-    }, 10);
-    
-    // 更新导出按钮状态（如果有数据）
-    updateExportButtonState(true);
 }
 
 // 显示结果（兼容性函数）
@@ -751,8 +1208,8 @@ function displayResults(results) {
     }
     
     clearResults();
-    results.forEach(result => {
-        addResultRow(result);
+    results.forEach((result, index) => {
+        addResultRow(result, index);
     });
 }
 
@@ -0,0 +1,54 @@
+"""
+分级提取模型顺序的测试
+"""
+
+import pytest
+
+from src.ai_extractor import AIExtractor, EXTRACTION_FIELDS
+
+
+@pytest.fixture
+def extractor():
+    return AIExtractor()
+
+
+def _record_tiers(extractor, monkeypatch):
+    """让每一级模型都返回"未明确说明"，记录被调用的模型顺序"""
+    called = []
+
+    def fake_extract(model_name, api_base_url, prompt, api_key_pool, estimated_tokens, fields=None):
+        called.append(model_name)
+        return {field: "未明确说明" for field in fields}
+
+    monkeypatch.setattr(extractor, "_extract_with_model", fake_extract)
+    return called
+
+
+def test_selected_model_is_top_tier(extractor, monkeypatch):
+    called = _record_tiers(extractor, monkeypatch)
+    extractor.extract_info_cascade("Some abstract text.", "Title", target_model="gpt-5-mini", rule_results={})
+    assert called == ["gpt-5-nano", "gpt-5-mini"]
+
+
+def test_smallest_model_selected_runs_alone(extractor, monkeypatch):
+    called = _record_tiers(extractor, monkeypatch)
+    extractor.extract_info_cascade("Some abstract text.", "Title", target_model="gpt-5-nano", rule_results={})
+    assert called == ["gpt-5-nano"]
+
+
+def test_unknown_model_runs_after_smallest_tier(extractor):
+    tiers = [model_name for model_name, _ in extractor._cascade_tiers("deepseek-chat")]
+    assert tiers == ["gpt-5-nano", "deepseek-chat"]
+
+
+def test_cascade_stops_when_small_tier_fills_all_fields(extractor, monkeypatch):
+    called = []
+
+    def fake_extract(model_name, api_base_url, prompt, api_key_pool, estimated_tokens, fields=None):
+        called.append(model_name)
+        return {field: "内容" for field in fields}
+
+    monkeypatch.setattr(extractor, "_extract_with_model", fake_extract)
+    data = extractor.extract_info_cascade("Some abstract text.", "Title", target_model="gpt-5-mini", rule_results={})
+    assert called == ["gpt-5-nano"]
+    assert all(data[field] == "内容" for field in EXTRACTION_FIELDS if field != "国家")
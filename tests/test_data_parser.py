@@ -0,0 +1,57 @@
+"""
+规则提取样本量置信度的测试
+"""
+
+import pytest
+
+from src.data_parser import DataParser
+
+# 分级提取的默认阈值（src/config.py 中的 rule_confidence_threshold）
+RULE_CONFIDENCE_THRESHOLD = 0.8
+
+
+@pytest.fixture
+def parser():
+    return DataParser()
+
+
+def test_single_sample_size_is_confident(parser):
+    value, confidence = parser._sample_size_with_confidence("A trial with 120 participants (n = 120).")
+    assert value == "120名参与者"
+    assert confidence >= RULE_CONFIDENCE_THRESHOLD
+
+
+def test_screened_and_randomized_counts_are_ambiguous(parser):
+    value, confidence = parser._sample_size_with_confidence(
+        "We screened 300 patients and randomized 60 subjects to creatine or placebo.")
+    assert value == "60名参与者"
+    assert confidence < RULE_CONFIDENCE_THRESHOLD
+
+
+def test_screened_count_after_number(parser):
+    _, confidence = parser._sample_size_with_confidence("In total, 300 patients were assessed for eligibility.")
+    assert confidence < RULE_CONFIDENCE_THRESHOLD
+
+
+def test_per_group_count_is_not_confident(parser):
+    value, confidence = parser._sample_size_with_confidence("Mice (n = 10 per group) received the supplement.")
+    assert value == "10名参与者"
+    assert confidence < RULE_CONFIDENCE_THRESHOLD
+
+
+def test_group_and_total_counts_are_ambiguous(parser):
+    _, confidence = parser._sample_size_with_confidence(
+        "120 participants were randomized (n = 60 per group).")
+    assert confidence < RULE_CONFIDENCE_THRESHOLD
+
+
+def test_year_like_participant_count_is_kept(parser):
+    value, confidence = parser._sample_size_with_confidence("A cohort of 2000 participants was followed.")
+    assert value == "2000名参与者"
+    assert confidence >= RULE_CONFIDENCE_THRESHOLD
+
+
+def test_year_without_population_noun_is_ignored(parser):
+    value, confidence = parser._sample_size_with_confidence("This study 2019 update reports no new data.")
+    assert value == "未明确说明"
+    assert confidence == 0.0